@@ -0,0 +1,69 @@
+# Benchmark: archive_history (retention) dan history dari arsip
+# Run from backend/: python -m benchmarks.archive_history [days]
+#
+# Seeds one site with 2-second data for `days` days (default 7), archives
+# everything older than 2 days with manage.py archive_history into a
+# temporary ARCHIVE_DIR and reports throughput and compressed bytes per
+# row. Then GET /api/rectifier/history/ is timed for a page in the hot
+# table and a page inside an archived day (first read loads the day file,
+# repeated reads hit the in-process day cache).
+
+import shutil
+import sys
+import tempfile
+
+from benchmarks.common import setup_django, create_test_db, destroy_test_db, seed_rows, timed, print_table
+
+setup_django()
+
+from django.conf import settings
+from django.core.management import call_command
+from rest_framework.test import APIClient
+from monitor import archive
+from monitor.models import RectifierData
+
+DAY = archive.DAY
+
+
+def main():
+    days = float(sys.argv[1]) if len(sys.argv) > 1 else 7
+    settings.ALLOWED_HOSTS = ['*']
+    settings.ARCHIVE_DIR = tempfile.mkdtemp(prefix='rectifier-archive-')
+
+    db = create_test_db()
+    try:
+        total, _ = timed(seed_rows, int(days * 86400 / 2), 1)
+        last = RectifierData.objects.order_by('-timestamp').values_list('timestamp', flat=True).first()
+
+        _, seconds = timed(call_command, 'archive_history', days=2, stdout=open('/dev/null', 'w'))
+        entries = archive.load_manifest()['days'].values()
+        archived = sum(entry['rows'] for entry in entries)
+        size = sum(entry['bytes'] for entry in entries)
+        print(f"Archived {archived:,} of {total:,} rows in {seconds:.1f}s ({archived / seconds:,.0f} rows/s), "
+              f"{len(entries)} day files, {size / archived:.1f} bytes/row compressed")
+
+        client = APIClient()
+        archived_day = last - 4 * DAY
+        cases = [
+            ('hot table', f'/api/rectifier/history/?site=site-0&to={last}&page_size=100'),
+            ('archived day (cold)', f'/api/rectifier/history/?site=site-0&to={archived_day}&page_size=100'),
+            ('archived day (cached)', f'/api/rectifier/history/?site=site-0&to={archived_day}&page_size=100'),
+            ('archived day, 1000 rows', f'/api/rectifier/history/?site=site-0&to={archived_day}&page_size=1000'),
+        ]
+        rows = []
+        for name, url in cases:
+            response, seconds = timed(client.get, url)
+            rows.append((name, len(response.json()['results']), f'{seconds * 1000:.1f}'))
+
+        print_table(
+            f"history over {days:g} days of 2 s data ({db.vendor})",
+            ['page', 'rows', 'ms'],
+            rows,
+        )
+    finally:
+        destroy_test_db(db)
+        shutil.rmtree(settings.ARCHIVE_DIR, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+# Benchmark: chart_data untuk range panjang dengan downsampling
+# Run from backend/: python -m benchmarks.chart_downsample [days]
+#
+# Seeds one site with 2-second data for `days` days (default 7, ~302k
+# rows) and times GET /api/rectifier/chart_data/?from=...&to=...&points=1000
+# for both modes, end to end (query, values_list fetch, NumPy downsampling,
+# JSON rendering). The fetch and downsample steps are also timed separately.
+# After backfill_rollups the same requests are repeated with
+# ?resolution=auto, which reads the coarsest adequate rollup instead.
+
+import sys
+
+from benchmarks.common import setup_django, create_test_db, destroy_test_db, seed_rows, timed, print_table
+
+setup_django()
+
+from django.conf import settings
+from django.core.management import call_command
+from rest_framework.test import APIClient
+from monitor import downsample
+from monitor.models import RectifierData
+from monitor.views import DEFAULT_CHART_FIELDS
+
+POINTS = 1000
+
+
+def main():
+    days = float(sys.argv[1]) if len(sys.argv) > 1 else 7
+    settings.ALLOWED_HOSTS = ['*']
+
+    db = create_test_db()
+    try:
+        total, elapsed = timed(seed_rows, int(days * 86400 / 2), 1)
+        print(f"Seeded {total:,} rows in {elapsed:.1f}s")
+        first = RectifierData.objects.order_by('timestamp').values_list('timestamp', flat=True).first()
+        last = RectifierData.objects.order_by('-timestamp').values_list('timestamp', flat=True).first()
+
+        client = APIClient()
+        queryset = RectifierData.objects.filter(timestamp__gte=first, timestamp__lte=last).order_by('timestamp')
+        (timestamps, values), fetch_seconds = timed(downsample.fetch_series, queryset, DEFAULT_CHART_FIELDS)
+
+        rows = []
+        for mode in downsample.MODES:
+            url = f'/api/rectifier/chart_data/?site=site-0&from={first}&to={last}&points={POINTS}&mode={mode}&resolution=raw'
+            response, request_seconds = timed(client.get, url)
+            (out, _), downsample_seconds = timed(downsample.downsample, timestamps, values, POINTS, mode)
+            rows.append((
+                mode, 'raw', len(response.json()['timestamps']),
+                f'{fetch_seconds * 1000:.0f}', f'{downsample_seconds * 1000:.0f}', f'{request_seconds * 1000:.0f}',
+            ))
+
+        _, backfill_seconds = timed(call_command, 'backfill_rollups', stdout=open('/dev/null', 'w'))
+        print(f"backfill_rollups took {backfill_seconds:.1f}s")
+        for mode in downsample.MODES:
+            url = f'/api/rectifier/chart_data/?site=site-0&from={first}&to={last}&points={POINTS}&mode={mode}'
+            response, request_seconds = timed(client.get, url)
+            rows.append((mode, 'auto (rollup)', len(response.json()['timestamps']), '-', '-', f'{request_seconds * 1000:.0f}'))
+
+        print_table(
+            f"chart_data over {days:g} days of 2 s data, {total:,} rows ({db.vendor}, {len(DEFAULT_CHART_FIELDS)} fields)",
+            ['mode', 'resolution', 'points', 'fetch ms', 'downsample ms', 'request ms'],
+            rows,
+        )
+    finally:
+        destroy_test_db(db)
+
+
+if __name__ == '__main__':
+    main()
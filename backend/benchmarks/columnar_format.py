@@ -0,0 +1,104 @@
+# Benchmark: ukuran dan waktu decode JSON vs format kolumnar
+# Run from backend/: python -m benchmarks.columnar_format [points] [save_dir]
+#
+# Seeds one site with `points` rows (default 100k) and compares the JSON and
+# columnar (monitor/columnar.py) encodings of:
+# - the whole range as chart series (timestamps + 4 fields), rendered with
+#   the same renderers as chart_data;
+# - GET chart_data with ?points=10000 (the endpoint maximum) and a
+#   1000-row history page, end to end through the API.
+# Reports payload size (raw and gzip), server render time and Python decode
+# time (json.loads vs columnar.decode). With save_dir the chart payloads are
+# written to chart.json / chart.columnar so that decodeColumnar() from
+# frontend-nextjs/src/services/api.ts can be timed against JSON.parse.
+
+import gzip
+import json
+import os
+import sys
+
+from benchmarks.common import setup_django, create_test_db, destroy_test_db, seed_rows, timed, print_table
+
+setup_django()
+
+from django.conf import settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from monitor import columnar, downsample
+from monitor.models import RectifierData
+from monitor.views import DEFAULT_CHART_FIELDS
+
+REPEAT = 5
+
+
+def best_of(fn, *args, **kwargs):
+    """(hasil, waktu tercepat dalam ms) dari REPEAT kali"""
+    runs = [timed(fn, *args, **kwargs) for _ in range(REPEAT)]
+    return runs[0][0], min(seconds for _, seconds in runs) * 1000
+
+
+def compare(label, json_body, columnar_body, json_ms, columnar_ms):
+    _, json_decode = best_of(json.loads, json_body)
+    _, columnar_decode = best_of(columnar.decode, columnar_body)
+    return [
+        (label, 'json', f'{len(json_body) / 1e3:,.0f}', f'{len(gzip.compress(json_body, 6)) / 1e3:,.0f}',
+         f'{json_ms:.1f}', f'{json_decode:.2f}'),
+        (label, 'columnar', f'{len(columnar_body) / 1e3:,.0f}', f'{len(gzip.compress(columnar_body, 6)) / 1e3:,.0f}',
+         f'{columnar_ms:.1f}', f'{columnar_decode:.2f}'),
+    ]
+
+
+def main():
+    points = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    save_dir = sys.argv[2] if len(sys.argv) > 2 else None
+    settings.ALLOWED_HOSTS = ['*']
+    client = APIClient()
+    fields = list(DEFAULT_CHART_FIELDS)
+
+    rows = []
+    db = create_test_db()
+    try:
+        total, seed_seconds = timed(seed_rows, points, 1)
+        print(f"{total:,} rows seeded in {seed_seconds:.1f}s")
+
+        # Whole range, same rendering as chart_data
+        timestamps, values = downsample.fetch_series(RectifierData.objects.order_by('timestamp'), fields)
+
+        def render_json():
+            data = {'timestamps': downsample.to_json_list(timestamps)}
+            for i, name in enumerate(fields):
+                data[name] = downsample.to_json_list(values[:, i])
+            return JSONRenderer().render(data)
+
+        json_body, json_ms = best_of(render_json)
+        columnar_body, columnar_ms = best_of(lambda: columnar.encode(columnar.chart_table(timestamps, fields, values)))
+        rows += compare(f'chart series, {len(timestamps):,} points', json_body, columnar_body, json_ms, columnar_ms)
+
+        first = int(timestamps[0])
+        for label, url in (
+            ('chart_data ?points=10000', f'/api/rectifier/chart_data/?from={first}&points=10000&resolution=raw'),
+            ('history page_size=1000', '/api/rectifier/history/?page_size=1000'),
+        ):
+            json_response, json_ms = best_of(client.get, url)
+            columnar_response, columnar_ms = best_of(client.get, url, HTTP_ACCEPT=columnar.MEDIA_TYPE)
+            assert columnar_response['Content-Type'] == columnar.MEDIA_TYPE
+            rows += compare(label, json_response.content, columnar_response.content, json_ms, columnar_ms)
+    finally:
+        destroy_test_db(db)
+
+    print_table(
+        f"JSON vs columnar, best of {REPEAT} ({db.vendor})",
+        ['payload', 'format', 'KB', 'KB gzip', 'server ms', 'python decode ms'],
+        rows,
+    )
+    if save_dir:
+        # For timing decodeColumnar() / JSON.parse in a browser or node
+        os.makedirs(save_dir, exist_ok=True)
+        for name, body in (('chart.json', json_body), ('chart.columnar', columnar_body)):
+            with open(os.path.join(save_dir, name), 'wb') as f:
+                f.write(body)
+        print(f"Chart payloads written to {save_dir}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+# Shared helpers untuk benchmark scripts
+# Run from backend/: python -m benchmarks.<name>
+#
+# Benchmarks run against a throw-away test database created from the
+# configured settings (SQLite in-memory for rectifier_monitor.settings,
+# a test_<name> database for PostgreSQL). Set DJANGO_SETTINGS_MODULE to
+# rectifier_monitor.settings_production to benchmark on PostgreSQL.
+
+import os
+import sys
+import time
+import django
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+
+def setup_django():
+    """Setup Django dengan settings development (default)"""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'rectifier_monitor.settings')
+    django.setup()
+
+
+def create_test_db():
+    """Buat test database kosong dan jalankan migrations"""
+    from django.db import connection
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=False)
+    return connection
+
+
+def destroy_test_db(connection):
+    connection.creation.destroy_test_db(connection.settings_dict['NAME'], verbosity=0)
+
+
+def sample_payloads(count, site_name=None, start_ts=None, step_ms=2000):
+    """Generate payload MQTT realistis dengan timestamp berurutan"""
+    from mqtt_complete_publisher import generate_complete_data
+
+    ts = start_ts if start_ts is not None else int(time.time() * 1000) - count * step_ms
+    payloads = []
+    for i in range(count):
+        data = generate_complete_data()
+        data['ts'] = ts + i * step_ms
+        if site_name is not None:
+            data['site_name'] = site_name
+        payloads.append(data)
+    return payloads
+
+
+VARIED_FIELDS = ('vdc_output', 'load_current', 'temperature', 'humidity')
+
+
+def seed_rows(rows, sites=1, step_ms=2000, chunk=50000):
+    """
+    Insert rows (dibagi rata ke site-0..site-N) lewat executemany, jauh lebih
+    cepat dari ORM untuk jutaan row. Timestamp berakhir sekitar sekarang,
+    field di VARIED_FIELDS diberi noise +/- 2% supaya series tidak datar.
+    """
+    import random
+    from django.db import connection, transaction
+    from monitor.decoder import decode_row
+    from monitor.models import RectifierData
+    from monitor.sites import site_cache
+
+    template = sample_payloads(1)[0]
+    site_ids = [site_cache.resolve(f'site-{i}', template).pk for i in range(sites)]
+    fields = [f for f in RectifierData._meta.concrete_fields if not f.primary_key]
+    names = [f.name for f in fields]
+    columns = [f.column for f in fields]
+    # decode_row() returns concrete_fields order, [0] is the primary key
+    row = [f.get_db_prep_save(value, connection) for f, value in zip(fields, decode_row(template, site_ids[0])[1:])]
+    ts_index = names.index('timestamp')
+    site_index = names.index('site')
+    varied = [(names.index(name), row[names.index(name)]) for name in VARIED_FIELDS]
+
+    sql = (
+        f'INSERT INTO {RectifierData._meta.db_table} ({", ".join(columns)}) '
+        f'VALUES ({", ".join(["%s"] * len(columns))})'
+    )
+    per_site = rows // sites
+    start_ts = template['ts'] - per_site * step_ms
+    with connection.cursor() as cursor:
+        for start in range(0, per_site, chunk):
+            batch = []
+            for i in range(start, min(start + chunk, per_site)):
+                for site_id in site_ids:
+                    row[ts_index] = start_ts + i * step_ms
+                    row[site_index] = site_id
+                    for index, base in varied:
+                        row[index] = base * (0.98 + 0.04 * random.random())
+                    batch.append(tuple(row))
+            with transaction.atomic():
+                cursor.executemany(sql, batch)
+    return per_site * sites
+
+
+def timed(fn, *args, **kwargs):
+    """Jalankan fn dan return (result, elapsed_seconds)"""
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+def print_table(title, headers, rows):
+    widths = [max(len(str(h)), *(len(str(r[i])) for r in rows)) for i, h in enumerate(headers)]
+    print("\n" + "=" * 60)
+    print(title)
+    print("=" * 60)
+    print("  ".join(str(h).ljust(w) for h, w in zip(headers, widths)))
+    for row in rows:
+        print("  ".join(str(c).ljust(w) for c, w in zip(row, widths)))
+    print()
@@ -0,0 +1,103 @@
+# Benchmark: requests/second untuk GET /api/rectifier/dashboard/
+# Run from backend/: python -m benchmarks.dashboard_endpoint [requests] [sites]
+#
+# "query + serializer" is the original view: ORM query for the newest row
+# and DashboardDataSerializer (five SerializerMethodFields) per request.
+# "cached row + serializer" reads the row from the latest-state cache but
+# still serializes per request. "pre-rendered" is the current view, which
+# returns the JSON bytes rendered once at ingest time (monitor/latest.py).
+# Requests go through the full Django/DRF stack with the test client.
+
+import sys
+
+from benchmarks.common import setup_django, create_test_db, destroy_test_db, sample_payloads, timed, print_table
+
+setup_django()
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import Client, RequestFactory
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from monitor.decoder import build_record
+from monitor.latest import get_latest, update_latest
+from monitor.models import RectifierData
+from monitor.serializers import DashboardDataSerializer
+from monitor.views import RectifierDataViewSet
+
+
+class QuerySerializerViewSet(RectifierDataViewSet):
+    @action(detail=False, methods=['get'])
+    def dashboard(self, request):
+        data = self.filter_site(RectifierData.objects.select_related('site')).first()
+        return Response(DashboardDataSerializer(data).data)
+
+
+class CachedSerializerViewSet(RectifierDataViewSet):
+    @action(detail=False, methods=['get'])
+    def dashboard(self, request):
+        data = get_latest(request.query_params.get('site'))
+        return Response(DashboardDataSerializer(data).data)
+
+
+def run(view, requests, sites):
+    rf = RequestFactory()
+    urls = [f'/api/rectifier/dashboard/?site=site-{i % sites}' for i in range(requests)]
+    handler = view.as_view({'get': 'dashboard'})
+
+    def loop():
+        for url in urls:
+            response = handler(rf.get(url))
+            if hasattr(response, 'render'):  # DRF Response, the pre-rendered view returns HttpResponse
+                response.render()
+    _, elapsed = timed(loop)
+    return elapsed
+
+
+def run_client(requests, sites):
+    client = Client()
+    urls = [f'/api/rectifier/dashboard/?site=site-{i % sites}' for i in range(requests)]
+
+    def loop():
+        for url in urls:
+            client.get(url)
+    _, elapsed = timed(loop)
+    return elapsed
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    sites = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    settings.ALLOWED_HOSTS = ['*']
+
+    connection = create_test_db()
+    try:
+        cache.clear()
+        records = []
+        for i in range(sites):
+            records += [build_record(payload, f'site-{i}') for payload in sample_payloads(50)]
+        RectifierData.bulk_insert_ignore_duplicates(records)
+        update_latest(records)
+
+        rows = []
+        for name, view in (('query + serializer', QuerySerializerViewSet),
+                           ('cached row + serializer', CachedSerializerViewSet),
+                           ('pre-rendered', RectifierDataViewSet)):
+            run(view, 100, sites)  # Warm up
+            elapsed = run(view, requests, sites)
+            rows.append((name, 'view', requests, f'{elapsed:.2f}', f'{requests / elapsed:,.0f}'))
+
+        elapsed = run_client(requests, sites)
+        rows.append(('pre-rendered', 'full stack', requests, f'{elapsed:.2f}', f'{requests / elapsed:,.0f}'))
+
+        print_table(
+            f"Dashboard endpoint - {sites} sites ({connection.vendor}, {settings.CACHES['default']['BACKEND'].rsplit('.', 1)[-1]})",
+            ['mode', 'path', 'requests', 'seconds', 'req/s'],
+            rows,
+        )
+    finally:
+        destroy_test_db(connection)
+
+
+if __name__ == '__main__':
+    main()
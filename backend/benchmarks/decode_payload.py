@@ -0,0 +1,98 @@
+# Micro-benchmark: decode cost per MQTT message
+# Run from backend/: python -m benchmarks.decode_payload [messages]
+#
+# "before" is the old ingestion path: json.loads + ~50 payload.get() kwargs
+# into RectifierData(**kwargs) (adapted to the Site foreign key). "after" is monitor.decoder (compiled field
+# spec + positional model __init__), with stdlib json and with orjson
+# when it is installed.
+
+import json
+import sys
+
+from benchmarks.common import setup_django, create_test_db, destroy_test_db, sample_payloads, timed, print_table
+
+setup_django()
+
+from monitor import decoder
+from monitor.models import RectifierData
+from monitor.sites import site_cache, site_code_from_payload
+
+
+def legacy_decode(raw):
+    payload = json.loads(raw.decode())
+    return RectifierData(
+        timestamp=payload.get('ts', 0),
+        site=site_cache.resolve(site_code_from_payload(payload), payload),
+        status_realtime=payload.get('status_realtime', 'Normal'),
+        status_ladder=payload.get('status_ladder', 'Normal'),
+        door_cabinet=payload.get('door_cabinet', 'Close'),
+        battery_stolen=payload.get('battery_stolen', 'Close'),
+        temperature=payload.get('temperature', 0),
+        humidity=payload.get('humidity', 0),
+        vac_input_l1=payload.get('vac_input_l1', 0),
+        vac_input_l2=payload.get('vac_input_l2', 0),
+        vac_input_l3=payload.get('vac_input_l3'),
+        vdc_output=payload.get('vdc_output', 0),
+        battery_current=payload.get('battery_current', 0),
+        iac_input_l1=payload.get('iac_input_l1'),
+        iac_input_l2=payload.get('iac_input_l2'),
+        iac_input_l3=payload.get('iac_input_l3'),
+        load_current=payload.get('load_current', 0),
+        load_power=payload.get('load_power', 0),
+        pac_load_l1=payload.get('pac_load_l1', 0),
+        pac_load_l2=payload.get('pac_load_l2', 0),
+        pac_load_l3=payload.get('pac_load_l3', 0),
+        rectifier_current=payload.get('rectifier_current', 0),
+        total_power=payload.get('total_power', 0),
+        battery_bank_1_voltage=payload.get('battery_bank_1_voltage', 0),
+        battery_bank_1_current=payload.get('battery_bank_1_current', 0),
+        battery_bank_1_soc=payload.get('battery_bank_1_soc', 100),
+        battery_bank_1_soh=payload.get('battery_bank_1_soh', 100),
+        battery_bank_2_voltage=payload.get('battery_bank_2_voltage', 0),
+        battery_bank_2_current=payload.get('battery_bank_2_current', 0),
+        battery_bank_2_soc=payload.get('battery_bank_2_soc', 100),
+        battery_bank_2_soh=payload.get('battery_bank_2_soh', 100),
+        battery_bank_3_voltage=payload.get('battery_bank_3_voltage', 0),
+        battery_bank_3_current=payload.get('battery_bank_3_current', 0),
+        battery_bank_3_soc=payload.get('battery_bank_3_soc', 100),
+        battery_bank_3_soh=payload.get('battery_bank_3_soh', 100),
+        backup_duration=payload.get('backup_duration'),
+        time_remaining=payload.get('time_remaining'),
+        battery_status=payload.get('battery_status', 'Standby'),
+        start_backup=payload.get('start_backup', 'No data'),
+        soc_avg=payload.get('soc_avg', 100),
+        modules_status=payload.get('modules_status', []),
+    )
+
+
+def stdlib_decode(raw):
+    return decoder.build_record(json.loads(raw.decode()))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    messages = [json.dumps(p).encode() for p in sample_payloads(count)]
+    # Sites are created on first sight, then served from the in-memory cache
+    connection = create_test_db()
+
+    cases = [
+        ('before: json + payload.get kwargs', legacy_decode),
+        ('after: json + compiled spec', stdlib_decode),
+    ]
+    if decoder.orjson is not None:
+        cases.append(('after: orjson + compiled spec', decoder.decode_message))
+
+    rows = []
+    baseline = None
+    for label, fn in cases:
+        _, elapsed = timed(lambda: [fn(raw) for raw in messages])
+        per_message = elapsed / count * 1e6
+        baseline = baseline or per_message
+        rows.append((label, f"{per_message:.1f}", f"{baseline / per_message:.2f}x"))
+
+    print_table(f"Payload decode - {count} messages", ['path', 'us/message', 'speedup'], rows)
+    destroy_test_db(connection)
+
+
+if __name__ == '__main__':
+    main()
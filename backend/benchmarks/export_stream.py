@@ -0,0 +1,99 @@
+# Benchmark: throughput /api/rectifier/export/ (CSV, NDJSON, Arrow, gzip)
+# Run from backend/: python -m benchmarks.export_stream [rows,rows,...]
+#
+# For each table size (default 100k and 400k rows over 5 sites) the database
+# is flushed and seeded, then the whole table is exported in every format,
+# with and without gzip and with 6 columns, reading the streamed body chunk
+# by chunk. Reports rows/s, MB/s and the Python heap peak (tracemalloc,
+# separate pass) which should stay flat as the table grows. The baseline is what analysts did
+# before: following history pages (page_size=1000).
+#
+# On PostgreSQL: DJANGO_SETTINGS_MODULE=rectifier_monitor.settings_production
+
+import sys
+import time
+import tracemalloc
+
+from benchmarks.common import setup_django, create_test_db, destroy_test_db, seed_rows, timed, print_table
+
+setup_django()
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from rest_framework.test import APIClient
+from monitor import export
+from monitor.sites import site_cache
+
+SITES = 5
+FORMATS = ['csv', 'ndjson'] + (['arrow'] if export.pyarrow is not None else [])
+# A typical analyst pull next to all 43 columns
+NARROW = 'site,timestamp,vdc_output,load_current,temperature,humidity'
+CASES = [(fmt, gzip, '') for fmt in FORMATS for gzip in (False, True)] + [(fmt, False, NARROW) for fmt in FORMATS]
+
+
+def download(client, url):
+    """Baca seluruh body streaming, return jumlah bytes"""
+    response = client.get(url)
+    assert response.status_code == 200, response
+    return sum(len(chunk) for chunk in response.streaming_content)
+
+
+def peak_memory(client, url):
+    """Peak heap Python (MB) selama satu export"""
+    tracemalloc.start()
+    try:
+        download(client, url)
+        return tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+
+
+def history_pages(client, limit):
+    """Ikuti history page_size=1000 sampai limit row, return (rows, detik)"""
+    url, rows, started = '/api/rectifier/history/?page_size=1000', 0, time.perf_counter()
+    while url and rows < limit:
+        page = client.get(url).json()
+        rows += len(page['results'])
+        url = page['next']
+    return rows, time.perf_counter() - started
+
+
+def main():
+    sizes = [int(n) for n in sys.argv[1].split(',')] if len(sys.argv) > 1 else [100000, 400000]
+    settings.ALLOWED_HOSTS = ['*']
+    client = APIClient()
+
+    rows = []
+    db = create_test_db()
+    try:
+        for size in sizes:
+            call_command('flush', interactive=False, verbosity=0)
+            cache.clear()
+            site_cache.clear()
+            total, seed_seconds = timed(seed_rows, size, SITES)
+            print(f"{total:,} rows seeded in {seed_seconds:.1f}s")
+
+            for fmt, gzip, fields in CASES:
+                url = f"/api/rectifier/export/?format={fmt}{'&gzip=true' if gzip else ''}{'&fields=' + fields if fields else ''}"
+                size_bytes, seconds = timed(download, client, url)
+                label = fmt + (' + gzip' if gzip else '') + (' (6 fields)' if fields else '')
+                rows.append((
+                    f'{total:,}', label, f'{total / seconds:,.0f}',
+                    f'{size_bytes / 1e6:.1f}', f'{size_bytes / 1e6 / seconds:.1f}', f'{peak_memory(client, url):.1f}',
+                ))
+
+            paged, seconds = history_pages(client, min(total, 50000))
+            rows.append((f'{total:,}', 'history pages (old)', f'{paged / seconds:,.0f}', '', '', ''))
+    finally:
+        destroy_test_db(db)
+
+    print_table(
+        f"export throughput ({db.vendor}, {SITES} sites, chunk_size={export.CHUNK_SIZE})",
+        ['table rows', 'format', 'rows/s', 'MB', 'MB/s', 'peak heap MB'],
+        rows,
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+# Benchmark: latency per halaman history, keyset cursor vs OFFSET
+# Run from backend/: python -m benchmarks.history_pagination [rows] [sites]
+#
+# Seeds a table with `rows` rows (default 2,000,000) spread over `sites`
+# sites, then measures one page (page_size 100) at increasing depth:
+# "keyset" is GET /api/rectifier/history/?cursor=... (monitor/pagination.py),
+# "offset" is the same ordering with queryset[offset:offset + 100].
+# The cursor for each depth is looked up beforehand and not timed.
+
+import statistics
+import sys
+
+from benchmarks.common import setup_django, create_test_db, destroy_test_db, seed_rows, timed, print_table
+
+setup_django()
+
+from django.conf import settings
+from rest_framework.test import APIClient
+from monitor.models import RectifierData
+from monitor.pagination import KeysetPagination, encode_position
+from monitor.serializers import RectifierDataSerializer
+
+PAGE_SIZE = 100
+DEPTHS = (1, 10, 100, 1000, 10000)
+REPEAT = 5
+
+
+def cursor_for(offset):
+    """Cursor yang menunjuk ke row sebelum offset (tidak di-timing)"""
+    if offset == 0:
+        return None
+    last = RectifierData.objects.order_by(*KeysetPagination.ordering).values_list('timestamp', 'id')[offset - 1]
+    return encode_position(last)
+
+
+def median_ms(fn):
+    fn()  # Warm up
+    return statistics.median(timed(fn)[1] for _ in range(REPEAT)) * 1000
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 2000000
+    sites = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    settings.ALLOWED_HOSTS = ['*']
+
+    db = create_test_db()
+    try:
+        total, elapsed = timed(seed_rows, rows, sites)
+        print(f"Seeded {total:,} rows in {elapsed:.1f}s")
+
+        client = APIClient()
+        queryset = RectifierData.objects.select_related('site').order_by(*KeysetPagination.ordering)
+        results = []
+        for page in DEPTHS:
+            offset = (page - 1) * PAGE_SIZE
+            if offset >= total:
+                break
+            cursor = cursor_for(offset)
+            url = f'/api/rectifier/history/?page_size={PAGE_SIZE}' + (f'&cursor={cursor}' if cursor else '')
+
+            keyset = median_ms(lambda: client.get(url))
+            offset_ms = median_ms(lambda: RectifierDataSerializer(queryset[offset:offset + PAGE_SIZE], many=True).data)
+            results.append((page, f'{offset:,}', f'{keyset:.1f}', f'{offset_ms:.1f}'))
+
+        print_table(
+            f"History page latency - {total:,} rows, page size {PAGE_SIZE} ({db.vendor}, median of {REPEAT})",
+            ['page', 'offset', 'keyset ms', 'OFFSET ms'],
+            results,
+        )
+    finally:
+        destroy_test_db(db)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+# Benchmark: sustained insert rate of the standalone MQTT listener
+# Run from backend/: python -m benchmarks.ingest_throughput [messages]
+#
+# Compares the per-message path (one INSERT + commit per message) with
+# buffered bulk insert batches, both going through mqtt_listener.on_message
+# and the bounded work queue.
+
+import json
+import sys
+from types import SimpleNamespace
+
+from benchmarks.common import setup_django, create_test_db, destroy_test_db, sample_payloads, timed, print_table
+
+setup_django()
+
+import mqtt_listener
+from monitor.ingest import BatchWriter, IngestQueue
+from monitor.models import RectifierData
+
+
+def run(messages, batch_size):
+    RectifierData.objects.all().delete()
+    mqtt_listener.writer = BatchWriter(batch_size=batch_size, flush_interval=0.25).start()
+    mqtt_listener.ingest_queue = IngestQueue(mqtt_listener.process_payload, maxsize=len(messages), workers=1).start()
+
+    def ingest():
+        for msg in messages:
+            mqtt_listener.on_message(None, None, msg)
+        mqtt_listener.ingest_queue.close()
+        mqtt_listener.writer.close()
+
+    _, elapsed = timed(ingest)
+    written = RectifierData.objects.count()
+    return written, elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    connection = create_test_db()
+    try:
+        messages = [SimpleNamespace(topic='rectifier/data', payload=json.dumps(p).encode()) for p in sample_payloads(count)]
+
+        rows = []
+        for label, batch_size in [('per-message', 1), ('batch 100', 100), ('batch 500', 500)]:
+            written, elapsed = run(messages, batch_size)
+            rows.append((label, written, f"{elapsed:.2f}", f"{written / elapsed:,.0f}"))
+
+        print_table(
+            f"MQTT listener ingest - {count} messages ({connection.vendor})",
+            ['mode', 'rows', 'seconds', 'rows/s'],
+            rows,
+        )
+    finally:
+        destroy_test_db(connection)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,266 @@
+# Benchmark: latency end-to-end MQTT publish -> frame WebSocket
+# Run from backend/: python -m benchmarks.mqtt_latency [sites] [messages per site] [batch interval ms,...]
+#
+# Starts a minimal MQTT 3.1.1 broker (QoS 0, enough for one publisher and one
+# subscriber) on 127.0.0.1 in its own thread, connects one WebSocket client
+# (RectifierConsumer, ?site=) per site, then publishes `messages` samples per
+# site (default 10 sites x 50 messages, one sample per site every 100 ms)
+# from a paho client in another thread. Every rectifier_update frame carries
+# seq = the sample timestamp, so its latency is the time from publish to the
+# frame reaching the client, and the threads the ingestion added. Compares:
+# - "threaded": ThreadedMQTTClient below, the in-process client used before
+#   ingestion moved to the ASGI event loop - paho loop_start() thread, ingest
+#   queue workers, batch writer thread, async_to_sync(group_send) per batch;
+# - "asyncio": mqtt_service.AsyncMQTTService on the ASGI event loop - socket
+#   on the loop, one hop per batch to the writer thread, native group_send.
+# The batch interval (MQTT_BATCH_INTERVAL_MS) bounds the latency of both
+# paths, so each is measured with the given intervals (default 250 and 20).
+# Uses the in-memory channel layer. The threaded client sends from a new
+# event loop per batch (async_to_sync in a plain thread) into the queues of
+# the consumers' loop; those queues are not thread-safe, so the update only
+# reaches a consumer when its loop wakes up for something else (with the
+# old in-process client under runserver, the next unrelated event). The
+# benchmark wakes the loop every TICK_S in threaded mode, as a busy server
+# would, which is the best case for the threaded path.
+
+import asyncio
+import json
+import statistics
+import sys
+import threading
+import time
+
+from benchmarks.common import setup_django, create_test_db, destroy_test_db, sample_payloads, print_table
+
+setup_django()
+
+import paho.mqtt.client as mqtt
+from django.conf import settings
+from channels.testing import WebsocketCommunicator
+from monitor.consumers import RectifierConsumer
+from monitor.decoder import build_record, decode_message
+from monitor.ingest import create_batch_writer, create_ingest_queue, records_saved
+from monitor.mqtt_service import AsyncMQTTService
+
+STEP_S = 0.1
+TICK_S = 0.001
+
+settings.WS_MAX_RATE = 1e6
+settings.MQTT_STATS_INTERVAL = 0
+settings.MQTT_SPOOL_PATH = ''  # No spool files from the benchmark
+
+
+class ThreadedMQTTClient:
+    """Baseline: paho loop_start() thread + IngestQueue workers + BatchWriter thread"""
+
+    def __init__(self):
+        self.client = mqtt.Client(client_id='latency-threaded')
+        self.client.on_connect = lambda client, userdata, flags, rc: client.subscribe(settings.MQTT_TOPIC)
+        # Paho network thread - only enqueue
+        self.client.on_message = lambda client, userdata, msg: self.queue.put((msg.topic, msg.payload))
+        self.writer = create_batch_writer(on_flush=records_saved)
+        self.queue = create_ingest_queue(lambda item: self.writer.add(decode_message(item[1], item[0])))
+
+    def connect(self):
+        self.writer.start()
+        self.queue.start()
+        self.client.connect(settings.MQTT_BROKER, settings.MQTT_PORT, 60)
+        self.client.loop_start()
+
+    def disconnect(self):
+        self.client.loop_stop()
+        self.client.disconnect()
+        self.queue.close()
+        self.writer.close()
+
+
+def remaining_length(length):
+    encoded = bytearray()
+    while True:
+        length, digit = length // 128, length % 128
+        encoded.append(digit | (0x80 if length else 0))
+        if not length:
+            return bytes(encoded)
+
+
+class MiniBroker:
+    """Broker MQTT minimal: CONNECT, SUBSCRIBE (topic persis), PUBLISH QoS 0, PINGREQ, DISCONNECT"""
+
+    def __init__(self):
+        self.subscribers = {}  # topic -> set of writers
+        self.loop = asyncio.new_event_loop()
+        self.ready = threading.Event()
+        self.port = None
+        self.thread = threading.Thread(target=self.loop.run_forever, name='mini-broker', daemon=True)
+
+    def start(self):
+        self.thread.start()
+        server = asyncio.run_coroutine_threadsafe(asyncio.start_server(self.handle, '127.0.0.1', 0), self.loop).result()
+        self.port = server.sockets[0].getsockname()[1]
+        return self
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                header = (await reader.readexactly(1))[0]
+                length, multiplier = 0, 1
+                while True:
+                    digit = (await reader.readexactly(1))[0]
+                    length += (digit & 0x7F) * multiplier
+                    multiplier *= 128
+                    if not digit & 0x80:
+                        break
+                body = await reader.readexactly(length)
+                kind = header >> 4
+                if kind == 1:  # CONNECT
+                    writer.write(b'\x20\x02\x00\x00')
+                elif kind == 8:  # SUBSCRIBE
+                    packet_id, position, granted = body[:2], 2, b''
+                    while position < len(body):
+                        size = int.from_bytes(body[position:position + 2], 'big')
+                        topic = body[position + 2:position + 2 + size].decode()
+                        self.subscribers.setdefault(topic, set()).add(writer)
+                        position += 2 + size + 1
+                        granted += b'\x00'
+                    writer.write(b'\x90' + remaining_length(2 + len(granted)) + packet_id + granted)
+                elif kind == 3:  # PUBLISH, QoS 0
+                    size = int.from_bytes(body[:2], 'big')
+                    topic = body[2:2 + size].decode()
+                    packet = b'\x30' + remaining_length(len(body)) + body
+                    for subscriber in self.subscribers.get(topic, ()):
+                        subscriber.write(packet)
+                elif kind == 12:  # PINGREQ
+                    writer.write(b'\xd0\x00')
+                elif kind == 14:  # DISCONNECT
+                    break
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        for subscribers in self.subscribers.values():
+            subscribers.discard(writer)
+        writer.close()
+
+
+def publish(port, payloads, published):
+    """Publish payload per ronde (satu sample per site setiap STEP_S) dan catat waktu publish per ts"""
+    client = mqtt.Client(client_id='latency-publisher')
+    client.connect('127.0.0.1', port, 60)
+    client.loop_start()
+    started = time.perf_counter()
+    for index, round_payloads in enumerate(payloads):
+        delay = started + index * STEP_S - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        for payload in round_payloads:
+            published[payload['ts']] = time.perf_counter()
+            client.publish(settings.MQTT_TOPIC, json.dumps(payload))
+    client.loop_stop()
+    client.disconnect()
+
+
+async def tick():
+    """Bangunkan event loop setiap TICK_S (lihat catatan channel layer di atas)"""
+    while True:
+        await asyncio.sleep(TICK_S)
+
+
+async def collect(communicator, published, latencies, expected_seq):
+    """Catat latency setiap rectifier_update sampai sample terakhir site ini diterima"""
+    while True:
+        text = await communicator.receive_from(timeout=30)
+        message = json.loads(text)
+        if message['type'] != 'rectifier_update':
+            continue
+        latencies.append((time.perf_counter() - published[message['seq']]) * 1000)
+        if message['seq'] >= expected_seq:
+            return
+
+
+async def run(mode, port, sites, messages, start_ts):
+    payloads = [
+        [
+            {**payload, 'site_id': f'site-{site}', 'ts': payload['ts'] + site}
+            for site, payload in enumerate(sample_payloads(sites, start_ts=start_ts + index * 1000, step_ms=0))
+        ]
+        for index in range(messages)
+    ]
+    communicators = []
+    for site in range(sites):
+        communicator = WebsocketCommunicator(RectifierConsumer.as_asgi(), f'/ws/rectifier/?site=site-{site}')
+        await communicator.connect()
+        await communicator.receive_from(timeout=10)  # initial_data
+        await communicator.receive_output(timeout=10)  # history window
+        communicators.append(communicator)
+
+    threads = threading.active_count()
+    if mode == 'threaded':
+        ticker = asyncio.create_task(tick())
+        client = ThreadedMQTTClient()
+        client.connect()
+    else:
+        service = AsyncMQTTService()
+        await service.start()
+    await asyncio.sleep(1)  # Connected and subscribed
+    threads = threading.active_count() - threads
+
+    published, latencies = {}, []
+    collectors = [
+        asyncio.create_task(collect(communicator, published, latencies, payloads[-1][site]['ts']))
+        for site, communicator in enumerate(communicators)
+    ]
+    publisher = threading.Thread(target=publish, args=(port, payloads, published))
+    publisher.start()
+    await asyncio.gather(*collectors)
+    publisher.join()
+
+    if mode == 'threaded':
+        client.disconnect()
+        ticker.cancel()
+    else:
+        await service.stop()
+    for communicator in communicators:
+        await communicator.disconnect()
+    return latencies, threads
+
+
+def percentile(values, fraction):
+    return sorted(values)[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def main():
+    sites = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    messages = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    intervals = [int(n) for n in sys.argv[3].split(',')] if len(sys.argv) > 3 else [250, 20]
+
+    broker = MiniBroker().start()
+    settings.MQTT_BROKER, settings.MQTT_PORT = '127.0.0.1', broker.port
+
+    rows = []
+    db = create_test_db()
+    try:
+        start_ts = int(time.time() * 1000)
+        for site in range(sites):
+            payload = sample_payloads(1, start_ts=start_ts)[0]
+            payload['site_id'] = f'site-{site}'
+            build_record(payload).save()  # Known sites, so clients can subscribe before the first sample
+        for interval in intervals:
+            settings.MQTT_BATCH_INTERVAL_MS = interval
+            for mode in ('threaded', 'asyncio'):
+                start_ts += 1_000_000
+                latencies, threads = asyncio.run(run(mode, broker.port, sites, messages, start_ts))
+                rows.append((
+                    interval, mode, threads, len(latencies), f'{statistics.median(latencies):.1f}',
+                    f'{percentile(latencies, 0.95):.1f}', f'{percentile(latencies, 0.99):.1f}', f'{max(latencies):.1f}',
+                ))
+    finally:
+        destroy_test_db(db)
+
+    print_table(
+        f"Publish -> WebSocket frame, {sites} sites x {messages} samples every {STEP_S * 1000:.0f} ms (ms)",
+        ['batch interval ms', 'ingestion', 'ingest threads', 'frames', 'p50', 'p95', 'p99', 'max'],
+        rows,
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+# Benchmark: RectifierData biasa vs range partitioned (PostgreSQL)
+# Run from backend/ with PostgreSQL settings:
+#   DJANGO_SETTINGS_MODULE=rectifier_monitor.settings_production python -m benchmarks.partitioning [rows] [sites]
+#
+# Seeds `rows` rows (default 50M over 100 sites, 10 s apart, ~58 days)
+# server-side with generate_series, then measures on the plain table:
+# - insert: latency of BatchWriter-sized batches (500 rows, ON CONFLICT DO
+#   NOTHING) appended after the newest row, p50/p99
+# - range queries at random points: a 100-row history page for one site,
+#   a one-day count for one site and a one-hour chart fetch over all sites
+# The table is then converted with partition_rectifierdata --convert (timed)
+# and the same measurements are repeated on the partitioned table.
+
+import random
+import statistics
+import sys
+
+from benchmarks.common import setup_django, create_test_db, destroy_test_db, sample_payloads, timed, print_table, VARIED_FIELDS
+
+setup_django()
+
+from django.core.management import call_command
+from django.db import connection, transaction
+from monitor import partitions
+from monitor.decoder import decode_row
+from monitor.downsample import fetch_series
+from monitor.models import RectifierData
+from monitor.sites import site_cache
+
+STEP_MS = 10000
+INSERT_BATCHES = 200
+BATCH = 500
+QUERIES = 50
+HOUR = 60 * 60 * 1000
+
+
+def seed_series(rows, sites):
+    """Insert rows server-side (generate_series x site), return (first_ts, last_ts, site_ids)"""
+    template = sample_payloads(1)[0]
+    site_ids = [site_cache.resolve(f'site-{i}', template).pk for i in range(sites)]
+    fields = [f for f in RectifierData._meta.concrete_fields if not f.primary_key]
+    values = decode_row(template, site_ids[0])[1:]
+
+    per_site = rows // sites
+    first = template['ts'] - per_site * STEP_MS
+    expressions, params = [], []
+    for field, value in zip(fields, values):
+        if field.name == 'timestamp':
+            expressions.append(f'{first} + g * {STEP_MS}')
+        elif field.name == 'site':
+            expressions.append('s')
+        elif field.name in VARIED_FIELDS:
+            expressions.append(f'%s::{field.db_type(connection)} * (0.98 + 0.04 * random())')
+            params.append(field.get_db_prep_save(value, connection))
+        else:
+            expressions.append(f'%s::{field.db_type(connection)}')
+            params.append(field.get_db_prep_save(value, connection))
+
+    sql = (
+        f'INSERT INTO {RectifierData._meta.db_table} ({", ".join(f.column for f in fields)}) '
+        f'SELECT {", ".join(expressions)} FROM generate_series(%s, %s) g, unnest(%s::bigint[]) s'
+    )
+    chunk = max(1, 2_000_000 // sites)
+    with connection.cursor() as cursor:
+        for start in range(0, per_site, chunk):
+            with transaction.atomic():
+                cursor.execute(sql, params + [start, min(start + chunk, per_site) - 1, site_ids])
+            print(f"  seeded {min(start + chunk, per_site) * sites:,} rows", end='\r')
+        cursor.execute(f'VACUUM ANALYZE {RectifierData._meta.db_table}')
+    print()
+    return first, first + (per_site - 1) * STEP_MS, site_ids
+
+
+def insert_latency(site_ids, after):
+    """Latency (ms) BatchWriter-sized batches setelah timestamp after"""
+    template = sample_payloads(1)[0]
+    samples = []
+    ts = after + STEP_MS
+    for _ in range(INSERT_BATCHES):
+        batch = []
+        for i in range(BATCH):
+            template['ts'] = ts
+            batch.append(RectifierData(*decode_row(template, site_ids[i % len(site_ids)])))
+            if i % len(site_ids) == len(site_ids) - 1:
+                ts += STEP_MS
+        ts += STEP_MS
+        samples.append(timed(RectifierData.bulk_insert_ignore_duplicates, batch)[1] * 1000)
+    return samples, ts
+
+
+def range_latency(first, last, site_ids):
+    """{query: [ms]} pada titik acak"""
+    random.seed(1)
+    results = {'history page': [], 'site day count': [], 'all sites hour chart': []}
+    for _ in range(QUERIES):
+        point = random.randint(first + 86400000, last)
+        site = random.choice(site_ids)
+        results['history page'].append(timed(lambda: list(
+            RectifierData.objects.filter(site_id=site, timestamp__lte=point).order_by('-timestamp', '-id')[:100]
+        ))[1] * 1000)
+        results['site day count'].append(timed(lambda: RectifierData.objects.filter(
+            site_id=site, timestamp__gt=point - 86400000, timestamp__lte=point,
+        ).count())[1] * 1000)
+        results['all sites hour chart'].append(timed(fetch_series, RectifierData.objects.filter(
+            timestamp__gt=point - HOUR, timestamp__lte=point,
+        ).order_by('timestamp'), VARIED_FIELDS)[1] * 1000)
+    return results
+
+
+def percentile(samples, q):
+    return statistics.quantiles(samples, n=100)[q - 1]
+
+
+def measure(label, first, last, site_ids, after, rows):
+    inserts, after = insert_latency(site_ids, after)
+    rows.append((label, f'insert {BATCH} rows', f'{statistics.median(inserts):.1f}', f'{percentile(inserts, 99):.1f}'))
+    for name, samples in range_latency(first, last, site_ids).items():
+        rows.append((label, name, f'{statistics.median(samples):.1f}', f'{percentile(samples, 99):.1f}'))
+    return after
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000_000
+    sites = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+    db = create_test_db()
+    try:
+        if db.vendor != 'postgresql':
+            print("Partitioning needs PostgreSQL, run with DJANGO_SETTINGS_MODULE=rectifier_monitor.settings_production")
+            return
+
+        (first, last, site_ids), seconds = timed(seed_series, total, sites)
+        print(f"Seeded {total:,} rows in {seconds:.0f}s")
+
+        rows = []
+        after = measure('plain', first, last, site_ids, last, rows)
+
+        _, seconds = timed(call_command, 'partition_rectifierdata', convert=True, stdout=open('/dev/null', 'w'))
+        with connection.cursor() as cursor:
+            cursor.execute(f'VACUUM ANALYZE {RectifierData._meta.db_table}')
+        print(f"partition_rectifierdata --convert took {seconds:.0f}s, {len(partitions.list_partitions())} partitions")
+
+        measure('partitioned', first, last, site_ids, after, rows)
+        print_table(
+            f"{total:,} rows, {sites} sites, {partitions.interval_ms() // 86400000}-day partitions (PostgreSQL)",
+            ['table', 'operation', 'p50 ms', 'p99 ms'],
+            rows,
+        )
+    finally:
+        destroy_test_db(db)
+
+
+if __name__ == '__main__':
+    main()
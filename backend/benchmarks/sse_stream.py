@@ -0,0 +1,136 @@
+# Benchmark: biaya koneksi Server-Sent Events (/api/stream/rectifier/) di ASGI
+# Run from backend/: python -m benchmarks.sse_stream [clients,clients,...] [updates]
+#
+# Opens N streams for one site on the ASGI application (rectifier_monitor.asgi,
+# channels ApplicationCommunicator, in-memory channel layer), then saves
+# `updates` records through ingest.records_saved and waits until every stream
+# received each update. Reports threads in the process (a WSGI worker would
+# hold one thread / process per open stream), memory allocated per open
+# stream (tracemalloc), connect time and milliseconds per update fan-out.
+# Finally a client reconnects with Last-Event-ID after missing updates and
+# the frames replayed from the ring are counted.
+
+import asyncio
+import sys
+import threading
+import time
+import tracemalloc
+
+from benchmarks.common import setup_django, create_test_db, destroy_test_db, sample_payloads, print_table
+
+setup_django()
+
+from django.conf import settings
+from channels.db import database_sync_to_async
+from channels.testing import ApplicationCommunicator
+from rectifier_monitor.asgi import application
+from monitor import sse
+from monitor.decoder import build_record
+from monitor.ingest import records_saved
+
+# No broker here, the lifespan must not start MQTT ingestion
+settings.MQTT_ASGI_INGEST = False
+
+SITE = 'site-0'
+
+
+def scope(headers=()):
+    return {
+        'type': 'http', 'method': 'GET', 'path': '/api/stream/rectifier/', 'query_string': f'site={SITE}'.encode(),
+        'headers': list(headers), 'http_version': '1.1', 'scheme': 'http', 'server': ('testserver', 80),
+        'client': ('127.0.0.1', 0),
+    }
+
+
+@database_sync_to_async
+def ingest(payload):
+    record = build_record(payload)
+    record.save()
+    records_saved([record])
+
+
+async def open_stream(headers=()):
+    communicator = ApplicationCommunicator(application, scope(headers))
+    await communicator.send_input({'type': 'http.request', 'body': b''})
+    await communicator.receive_output(10)  # http.response.start
+    first = await communicator.receive_output(10)  # retry + snapshot / replay
+    return communicator, first['body']
+
+
+async def run(clients, payloads):
+    sse.ring.clear()
+    await ingest(payloads[0])
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    streams = [(await open_stream())[0] for _ in range(clients)]
+    connect = time.perf_counter() - started
+    per_stream = (tracemalloc.get_traced_memory()[0] - before) / clients
+    tracemalloc.stop()
+    threads = threading.active_count()
+
+    started = time.perf_counter()
+    for payload in payloads[1:]:
+        await ingest(payload)
+        await asyncio.gather(*[stream.receive_output(10) for stream in streams])
+    fan_out = (time.perf_counter() - started) / (len(payloads) - 1)
+
+    for stream in streams:
+        await stream.send_input({'type': 'http.disconnect'})
+        await stream.wait(1)
+    return threads, per_stream, connect / clients, fan_out
+
+
+async def resume(payloads):
+    """Frame yang diterima client yang reconnect dengan Last-Event-ID setelah melewatkan update"""
+    sse.ring.clear()
+    await ingest(payloads[0])
+    stream, _ = await open_stream()
+    await ingest(payloads[1])
+    last_id = payloads[1]['ts']
+    await stream.receive_output(10)
+    await stream.send_input({'type': 'http.disconnect'})
+    await stream.wait(1)
+
+    # Keep the ring filled while the client is away
+    watcher, _ = await open_stream()
+    for payload in payloads[2:]:
+        await ingest(payload)
+        await watcher.receive_output(10)
+
+    stream, body = await open_stream([(b'last-event-id', str(last_id).encode())])
+    replayed = body.count(b'\nid: ') + body.startswith(b'id: ')
+    for communicator in (stream, watcher):
+        await communicator.send_input({'type': 'http.disconnect'})
+        await communicator.wait(1)
+    return len(payloads) - 2, replayed
+
+
+def main():
+    sizes = [int(n) for n in sys.argv[1].split(',')] if len(sys.argv) > 1 else [100, 1000]
+    updates = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    rows = []
+    db = create_test_db()
+    try:
+        start_ts = int(time.time() * 1000)
+        for clients in sizes:
+            payloads = sample_payloads(updates + 1, site_name=SITE, start_ts=start_ts)
+            start_ts += (updates + 1) * 2000
+            threads, per_stream, connect, fan_out = asyncio.run(run(clients, payloads))
+            rows.append((clients, threads, f'{per_stream / 1024:.1f}', f'{connect * 1000:.2f}', f'{fan_out * 1000:.1f}'))
+        missed, replayed = asyncio.run(resume(sample_payloads(12, site_name=SITE, start_ts=start_ts)))
+    finally:
+        destroy_test_db(db)
+
+    print_table(
+        f"SSE streams for one site, {updates} updates (ASGI, in-memory channel layer)",
+        ['streams', 'threads', 'KB/stream', 'ms connect/stream', 'ms/update fan-out'],
+        rows,
+    )
+    print(f"Resume with Last-Event-ID: missed {missed} updates, {replayed} replayed from the ring")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+# Benchmark: /stats/ latency saat table bertambah besar
+# Run from backend/: python -m benchmarks.stats_window [rows,rows,...]
+#
+# For each table size (default 100k, 400k, 1.6M rows of 2-second data over
+# 5 sites) the database is flushed, seeded and rollups are backfilled. Then the
+# old full-table aggregate (RectifierData.get_stats) is compared with
+# GET /api/rectifier/stats/ for window=hour/day/week/all, all sites and one
+# site, plus the exact percentile path for window=day. Windowed stats read
+# whole 1d/1h/1m rollup buckets and only the sub-minute edges from raw rows,
+# so their latency should stay flat while the full-table aggregate grows.
+
+import sys
+
+from benchmarks.common import setup_django, create_test_db, destroy_test_db, seed_rows, timed, print_table
+
+setup_django()
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from rest_framework.test import APIClient
+from monitor.models import RectifierData
+from monitor.sites import site_cache
+
+SITES = 5
+REPEAT = 5
+
+
+def best_of(fn, *args):
+    """Waktu tercepat (ms) dari REPEAT kali"""
+    return min(timed(fn, *args)[1] for _ in range(REPEAT)) * 1000
+
+
+def main():
+    sizes = [int(n) for n in sys.argv[1].split(',')] if len(sys.argv) > 1 else [100000, 400000, 1600000]
+    settings.ALLOWED_HOSTS = ['*']
+    client = APIClient()
+    cases = [
+        ('hour', ''), ('day', ''), ('week', ''), ('all', ''),
+        ('day', '&site=site-0'), ('day', '&percentiles=true'), ('day', '&site=site-0&percentiles=true'),
+    ]
+
+    rows = []
+    db = create_test_db()
+    try:
+        for size in sizes:
+            # Start every size from an empty table
+            call_command('flush', interactive=False, verbosity=0)
+            cache.clear()
+            site_cache.clear()
+            total, seed_seconds = timed(seed_rows, size, SITES)
+            _, backfill_seconds = timed(call_command, 'backfill_rollups', stdout=open('/dev/null', 'w'))
+            print(f"{total:,} rows: seeded in {seed_seconds:.1f}s, backfill_rollups in {backfill_seconds:.1f}s")
+
+            rows.append((f'{total:,}', 'full table (old)', '', f'{best_of(RectifierData.get_stats):.1f}'))
+            for window, extra in cases:
+                url = f'/api/rectifier/stats/?window={window}{extra}'
+                response = client.get(url)
+                assert response.status_code == 200, response.content
+                count = response.json()['count']
+                rows.append((f'{total:,}', f'window={window}{extra}', f'{count:,}', f'{best_of(client.get, url):.1f}'))
+    finally:
+        destroy_test_db(db)
+
+    print_table(
+        f"stats latency, best of {REPEAT} ({db.vendor}, {SITES} sites, 2 s data)",
+        ['table rows', 'query', 'rows covered', 'ms'],
+        rows,
+    )
+
+
+if __name__ == '__main__':
+    main()
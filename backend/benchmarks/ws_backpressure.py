@@ -0,0 +1,128 @@
+# Benchmark: buffer per koneksi WebSocket saat burst 10x
+# Run from backend/: python -m benchmarks.ws_backpressure [seconds]
+#
+# One site normally produces WS_MAX_RATE updates/s (one per ingest flush).
+# This broadcasts 10x that rate for `seconds` (default 3) through the
+# in-memory channel layer to three kinds of clients:
+# - fast: reads every frame and acknowledges it (?ack=1)
+# - stalled, ack=1: never reads (a browser on a dead mobile link)
+# - stalled, no ack: never reads, did not negotiate flow control
+# The frames a stalled client has not read pile up in the communicator's
+# output queue, which stands in for Daphne's send buffer. Compares the old
+# consumer (every event sent immediately) with the current one (rate limit,
+# conflation, unacked limit). WS_MAX_UNACKED_BYTES is lowered to 16 KB and
+# WS_SLOW_CLIENT_TIMEOUT to 2 s so the stalled ack=1 client hits the limit
+# and is disconnected within the run.
+
+import asyncio
+import json
+import sys
+
+from benchmarks.common import setup_django, create_test_db, destroy_test_db, seed_rows, print_table
+
+setup_django()
+
+from django.conf import settings
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from monitor import broadcast
+from monitor.consumers import RectifierConsumer
+from monitor.latest import get_dashboard
+
+settings.WS_MAX_UNACKED_BYTES = 16384
+settings.WS_SLOW_CLIENT_TIMEOUT = 2
+
+
+class ForwardEverything(RectifierConsumer):
+    """rectifier_update sebelum flow control: setiap event langsung dikirim"""
+
+    async def rectifier_update(self, event):
+        if event['site'] == self.site_code:
+            await self.send(text_data=event['text'])
+
+
+async def fast_client(communicator, stop, received):
+    while not stop.is_set() or not communicator.output_queue.empty():
+        try:
+            # receive_output(timeout=) would cancel the application on timeout
+            frame = await asyncio.wait_for(communicator.output_queue.get(), 0.2)
+        except asyncio.TimeoutError:
+            continue
+        if frame['type'] != 'websocket.send':
+            return
+        received[0] += 1
+        received[1] = frame.get('text') or received[1]
+        await communicator.send_to(text_data=json.dumps({'type': 'ack', 'seq': received[0]}))
+
+
+def buffered(communicator):
+    """(frames, KB) yang belum dibaca client, closed jika server menutup koneksi"""
+    frames = list(communicator.output_queue._queue)
+    sent = [frame for frame in frames if frame['type'] == 'websocket.send']
+    size = sum(len(frame.get('text') or frame.get('bytes') or '') for frame in sent)
+    closed = next((frame.get('code') for frame in frames if frame['type'] == 'websocket.close'), None)
+    return len(sent), size / 1e3, closed
+
+
+async def run(consumer, seconds):
+    rate = settings.WS_MAX_RATE * 10
+    application = consumer.as_asgi()
+    fast = WebsocketCommunicator(application, '/ws/rectifier/?ack=1')
+    stalled_ack = WebsocketCommunicator(application, '/ws/rectifier/?ack=1')
+    stalled = WebsocketCommunicator(application, '/ws/rectifier/')
+    for communicator in (fast, stalled_ack, stalled):
+        await communicator.connect()
+    received = [2, None]  # initial_data + history were sent, not counted as updates below
+    for _ in range(2):
+        await fast.receive_output()
+
+    stop = asyncio.Event()
+    reader = asyncio.create_task(fast_client(fast, stop, received))
+    channel_layer = get_channel_layer()
+    dashboard = get_dashboard()
+    updates = int(rate * seconds)
+    last = None
+    for i in range(updates):
+        # Same dashboard body, distinct message so the newest one can be recognized
+        last = broadcast.update_event(None, dashboard)
+        last['text'] = last['text'][:-1] + f', "n": {i}}}'
+        await channel_layer.group_send(broadcast.ALL_GROUP, last)
+        await asyncio.sleep(1 / rate)
+    # Let the rate limiter deliver what is pending
+    await asyncio.sleep(settings.WS_SLOW_CLIENT_TIMEOUT + 0.5)
+    stop.set()
+    await reader
+
+    results = [
+        ('fast, ack', received[0] - 2, '', '', received[1] == last['text']),
+        ('stalled, ack', *buffered(stalled_ack), ''),
+        ('stalled, no ack', *buffered(stalled), ''),
+    ]
+    for communicator in (fast, stalled_ack, stalled):
+        await communicator.disconnect()
+    return updates, results
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 3
+    rows = []
+    db = create_test_db()
+    try:
+        seed_rows(1, 1)
+        size = len(broadcast.update_event(None, get_dashboard())['text'])
+        for label, consumer in (('forward everything', ForwardEverything), ('rate limit + conflation', RectifierConsumer)):
+            updates, results = asyncio.run(run(consumer, seconds))
+            for client, frames, kb, closed, newest in results:
+                rows.append((label, client, frames, f'{kb:.0f}' if kb != '' else '', closed or '', newest))
+    finally:
+        destroy_test_db(db)
+
+    print_table(
+        f"{updates} updates of {size / 1e3:.1f} KB in {seconds:g}s (10x WS_MAX_RATE={settings.WS_MAX_RATE}/s)",
+        ['consumer', 'client', 'frames received / buffered', 'KB buffered', 'closed', 'got newest'],
+        rows,
+    )
+
+
+if __name__ == '__main__':
+    main()
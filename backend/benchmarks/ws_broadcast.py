@@ -0,0 +1,126 @@
+# Benchmark: biaya broadcast WebSocket per update dengan 1, 100, 1000 client
+# Run from backend/: python -m benchmarks.ws_broadcast [updates] [clients,clients,...]
+#
+# Connects N RectifierConsumer instances (channels WebsocketCommunicator) to
+# the in-memory channel layer, then broadcasts `updates` full dashboard
+# updates, one at a time, waiting until every client received each of them
+# (WS_MAX_RATE is raised so the per-connection rate limit does not apply).
+# Compares:
+# - "dict per consumer": the old path - the event carries the data as a dict,
+#   the channel layer deep-copies it for every channel and every consumer
+#   calls json.dumps on it;
+# - "encoded once": the current path (monitor/broadcast.py) - the producer
+#   encodes the message once and consumers forward the text.
+# Reports milliseconds per update (producer + fan-out + delivery) and the
+# time spent encoding (timer around json.dumps / broadcast.update_event).
+
+import asyncio
+import json
+import sys
+import time
+
+from benchmarks.common import setup_django, create_test_db, destroy_test_db, seed_rows, print_table
+
+setup_django()
+
+from django.conf import settings
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from monitor import broadcast
+from monitor.consumers import RectifierConsumer
+from monitor.latest import get_dashboard, get_latest
+from monitor.serializers import DashboardDataSerializer
+
+settings.WS_MAX_RATE = 1e6
+
+encode_seconds = [0.0]
+
+
+def dumps(data):
+    started = time.perf_counter()
+    try:
+        return json.dumps(data)
+    finally:
+        encode_seconds[0] += time.perf_counter() - started
+
+
+class DictPerConsumer(RectifierConsumer):
+    """rectifier_update seperti sebelumnya: json.dumps di setiap consumer"""
+
+    async def rectifier_update(self, event):
+        if event['site'] == self.site_code:
+            text = dumps({'type': 'rectifier_update', 'site': event['site'], 'data': event['data']})
+            await super().rectifier_update({**event, 'text': text})
+
+
+def dict_events(record, updates):
+    return [
+        {'type': 'rectifier_update', 'site': None, 'data': DashboardDataSerializer(record).data}
+        for _ in range(updates)
+    ]
+
+
+def encoded_events(record, updates):
+    events = []
+    for _ in range(updates):
+        started = time.perf_counter()
+        events.append(broadcast.update_event(None, get_dashboard()))
+        encode_seconds[0] += time.perf_counter() - started
+    return events
+
+
+async def drain(communicator, count):
+    for _ in range(count):
+        await communicator.receive_from(timeout=120)
+
+
+async def run(consumer, make_events, clients, updates):
+    application = consumer.as_asgi()
+    communicators = [WebsocketCommunicator(application, '/ws/rectifier/') for _ in range(clients)]
+    for communicator in communicators:
+        await communicator.connect()
+        await drain(communicator, 2)  # initial_data + history window
+
+    record = get_latest()
+    channel_layer = get_channel_layer()
+    encode_seconds[0] = 0.0
+    started = time.perf_counter()
+    # Producer side included: building the events is part of the broadcast cost
+    for event in make_events(record, updates):
+        await broadcast.send_events(channel_layer, [(broadcast.ALL_GROUP, event)])
+        await asyncio.gather(*[drain(communicator, 1) for communicator in communicators])
+    elapsed = time.perf_counter() - started
+
+    for communicator in communicators:
+        await communicator.disconnect()
+    return elapsed / updates * 1000, encode_seconds[0] / updates * 1000
+
+
+def main():
+    updates = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    sizes = [int(n) for n in sys.argv[2].split(',')] if len(sys.argv) > 2 else [1, 100, 1000]
+
+    rows = []
+    db = create_test_db()
+    try:
+        seed_rows(1, 1)
+        get_dashboard()
+        for clients in sizes:
+            for label, consumer, make_events in (
+                ('dict per consumer', DictPerConsumer, dict_events),
+                ('encoded once', RectifierConsumer, encoded_events),
+            ):
+                per_update, encoding = asyncio.run(run(consumer, make_events, clients, updates))
+                rows.append((clients, label, f'{per_update:.2f}', f'{encoding:.3f}', f'{per_update / clients * 1000:.1f}'))
+    finally:
+        destroy_test_db(db)
+
+    print_table(
+        f"Broadcast of {updates} dashboard updates (in-memory channel layer)",
+        ['clients', 'event', 'ms/update', 'encode ms/update', 'µs/update/client'],
+        rows,
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+# Benchmark: bytes WebSocket, dashboard lengkap (v1) vs delta (v2)
+# Run from backend/: python -m benchmarks.ws_delta [sites] [samples]
+#
+# Simulates `samples` 2-second MQTT samples (default 300, 10 minutes) for
+# `sites` sites (default 20) and pushes each through the real path:
+# build_record -> latest.render_dashboard -> broadcast.update_event. A v1
+# client receives the full rectifier_update text of every sample; a v2
+# client receives the delta when it has the base frame and a full keyframe
+# every WS_KEYFRAME_INTERVAL seconds (RectifierConsumer.send_event rules).
+# Every patch is applied to the client's copy and checked against the full
+# dashboard. Two streams:
+# - publisher: mqtt_complete_publisher.generate_complete_data() as is, every
+#   measurement and status re-drawn at random each sample (worst case);
+# - drift: measurements move a little per sample, statuses and module
+#   states change rarely, site info is constant (closer to real sites).
+
+import copy
+import json
+import random
+import sys
+
+from benchmarks.common import setup_django, create_test_db, destroy_test_db, print_table
+
+setup_django()
+
+from django.conf import settings
+from mqtt_complete_publisher import generate_complete_data
+from monitor import broadcast
+from monitor.decoder import build_record
+from monitor.latest import render_dashboard
+
+STEP_MS = 2000
+# Per sample probability that a status / module state changes in the drift stream
+STATUS_CHANGE = 0.01
+
+
+def apply_patch(state, patch):
+    for path, value in patch:
+        if not path:
+            state = value
+            continue
+        node = state
+        for key in path[:-1]:
+            node = node[key]
+        node[path[-1]] = value
+    return state
+
+
+def publisher_stream(start_ts):
+    ts = start_ts
+    while True:
+        data = generate_complete_data()
+        data['ts'] = ts
+        yield data
+        ts += STEP_MS
+
+
+def drift_stream(start_ts):
+    """Sample pertama dari publisher, setelahnya angka bergeser sedikit dan status jarang berubah"""
+    base = generate_complete_data()
+    data = copy.deepcopy(base)
+    ts = start_ts
+    while True:
+        data['ts'] = ts
+        yield copy.deepcopy(data)
+        ts += STEP_MS
+        fresh = generate_complete_data()
+        for key, value in data.items():
+            if isinstance(value, float):
+                data[key] = round(value + (fresh[key] - value) * 0.05, 2)
+            elif isinstance(value, str) and key != 'site_name' and fresh.get(key) != value and random.random() < STATUS_CHANGE:
+                data[key] = fresh[key]
+        for module, fresh_module in zip(data['modules_status'], fresh['modules_status']):
+            if random.random() < STATUS_CHANGE:
+                module.update(fresh_module)
+
+
+def run(stream, sites, samples):
+    keyframe_every = max(int(settings.WS_KEYFRAME_INTERVAL * 1000 / STEP_MS), 1)
+    full_bytes = delta_bytes = deltas = ops = 0
+    clients = {}  # site code -> [seq, data, samples since keyframe]
+    streams = {f'site-{i}': stream(1_700_000_000_000) for i in range(sites)}
+    for _ in range(samples):
+        for code, samples_of_site in streams.items():
+            payload = next(samples_of_site)
+            payload['site_id'] = code
+            event = broadcast.update_event(code, render_dashboard(build_record(payload)))
+            full_bytes += len(event['text'].encode())
+
+            client = clients.get(code)
+            if client is not None and event['delta'] is not None and event['base'] == client[0] and client[2] < keyframe_every:
+                delta_bytes += len(event['delta'].encode())
+                patch = json.loads(event['delta'])['patch']
+                client[1] = apply_patch(client[1], patch)
+                client[0], client[2] = event['seq'], client[2] + 1
+                deltas += 1
+                ops += len(patch)
+            else:
+                delta_bytes += len(event['text'].encode())
+                clients[code] = [event['seq'], json.loads(event['text'])['data'], 1]
+            assert clients[code][1] == json.loads(event['text'])['data'], code
+    updates = sites * samples
+    return updates, full_bytes, delta_bytes, deltas, ops
+
+
+def main():
+    sites = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    samples = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+
+    rows = []
+    db = create_test_db()
+    try:
+        for label, stream in (('publisher', publisher_stream), ('drift', drift_stream)):
+            broadcast._published.clear()
+            updates, full_bytes, delta_bytes, deltas, ops = run(stream, sites, samples)
+            rows.append((
+                label, f'{updates:,}', f'{full_bytes / updates:,.0f}', f'{delta_bytes / updates:,.0f}',
+                f'{ops / max(deltas, 1):.1f}', f'{full_bytes / 1e6:.2f}', f'{delta_bytes / 1e6:.2f}',
+                f'{(1 - delta_bytes / full_bytes) * 100:.0f}%',
+            ))
+    finally:
+        destroy_test_db(db)
+
+    print_table(
+        f"{sites} sites x {samples} samples every {STEP_MS // 1000}s, keyframe every {settings.WS_KEYFRAME_INTERVAL:g}s",
+        ['stream', 'updates', 'v1 B/update', 'v2 B/update', 'fields/delta', 'v1 MB', 'v2 MB', 'saved'],
+        rows,
+    )
+
+
+if __name__ == '__main__':
+    main()
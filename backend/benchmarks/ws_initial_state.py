@@ -0,0 +1,109 @@
+# Benchmark: reconnect storm ke ws/rectifier/ (initial state per koneksi)
+# Run from backend/: python -m benchmarks.ws_initial_state [clients] [sites] [rows]
+#
+# Seeds `rows` rows over `sites` sites, then opens `clients` WebSocket
+# connections at once (channels WebsocketCommunicator, in-memory channel
+# layer, clients spread over the sites) and waits for the initial_data
+# message and the columnar history window of each. Compares:
+# - "query per connection": newest row + last WS_HISTORY_POINTS rows read
+#   with the ORM and serialized for every connection;
+# - the current consumer on a cold cache (first connection per site builds
+#   the cache entries) and on a warm cache (no database access).
+# Reports connections/s and the number of SQL queries over the storm.
+
+import asyncio
+import sys
+
+from benchmarks.common import setup_django, create_test_db, destroy_test_db, seed_rows, timed, print_table
+
+setup_django()
+
+from channels.db import database_sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.core.cache import cache
+from django.db import connection
+from monitor import latest
+from monitor.consumers import RectifierConsumer
+from monitor.models import RectifierData
+from monitor.sites import site_cache
+
+queries = [0]
+
+
+def count_queries(execute, sql, params, many, context):
+    queries[0] += 1
+    return execute(sql, params, many, context)
+
+
+class QueryPerConnectionConsumer(RectifierConsumer):
+    """Initial state dari database untuk setiap koneksi"""
+
+    @database_sync_to_async
+    def get_initial_state(self):
+        record = RectifierData.objects.select_related('site').filter(site__code=self.site_code).first()
+        if record is None:
+            return None, None
+        queryset = RectifierData.objects.filter(site__code=self.site_code).order_by('-timestamp')
+        timestamps, values = latest.downsample.fetch_series(queryset[:latest.window_points()], latest.WINDOW_FIELDS)
+        return latest.render_dashboard(record), latest.render_window(timestamps[::-1], values[::-1])
+
+
+async def client(application, path):
+    communicator = WebsocketCommunicator(application, path)
+    connected, _ = await communicator.connect()
+    assert connected
+    message = await communicator.receive_json_from(timeout=60)
+    assert message['type'] == 'initial_data' and message['data'] is not None, message
+    if message['history'] is not None:
+        await communicator.receive_from(timeout=60)
+    await communicator.disconnect()
+
+
+async def storm(consumer, clients, sites):
+    # Queries run in the thread used by database_sync_to_async
+    await database_sync_to_async(lambda: connection.execute_wrappers.append(count_queries))()
+    try:
+        application = consumer.as_asgi()
+        await asyncio.gather(*[client(application, f'/ws/rectifier/?site=site-{i % sites}') for i in range(clients)])
+    finally:
+        await database_sync_to_async(lambda: connection.execute_wrappers.remove(count_queries))()
+
+
+def run(consumer, clients, sites):
+    queries[0] = 0
+    _, seconds = timed(asyncio.run, storm(consumer, clients, sites))
+    return f'{clients / seconds:,.0f}', f'{queries[0]:,}'
+
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    sites = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    rows = int(sys.argv[3]) if len(sys.argv) > 3 else 200000
+
+    results = []
+    db = create_test_db()
+    try:
+        total, seed_seconds = timed(seed_rows, rows, sites)
+        print(f"{total:,} rows seeded in {seed_seconds:.1f}s")
+
+        for label, consumer in (
+            ('query per connection', QueryPerConnectionConsumer),
+            ('cache, cold', RectifierConsumer),
+            ('cache, warm', RectifierConsumer),
+        ):
+            if label != 'cache, warm':
+                cache.clear()
+                site_cache.clear()
+            results.append((label, *run(consumer, clients, sites)))
+    finally:
+        destroy_test_db(db)
+
+    print_table(
+        f"{clients} WebSocket connects over {sites} sites, {latest.window_points()} history points ({db.vendor})",
+        ['initial state', 'connects/s', 'SQL queries'],
+        results,
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+# Benchmark: volume message channel layer, satu group vs group per site
+# Run from backend/: python -m benchmarks.ws_subscriptions [sites] [clients] [rounds]
+#
+# Creates `sites` sites (default 500, 10 sites per project) and connects
+# `clients` WebSocket clients (default 200), each watching one site with
+# ?site=. Every round all sites publish one dashboard update (one ingest
+# flush with every site changed). Compares:
+# - "single group": the old layout - every consumer is in one group, gets
+#   every site's update from the channel layer and drops the other sites;
+# - "group per site": the current layout (monitor/broadcast.py) - updates go
+#   to the site group (and its project group) only.
+# Counts group_send calls, messages put on consumer channels by the
+# in-memory channel layer (and dropped because a channel was full) and the
+# frames the clients receive (a client whose update was dropped waits 2 s),
+# and times the rounds.
+
+import asyncio
+import sys
+import time
+
+from benchmarks.common import setup_django, create_test_db, destroy_test_db, sample_payloads, print_table
+
+setup_django()
+
+from django.conf import settings
+from channels.exceptions import ChannelFull
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from monitor import broadcast
+from monitor.consumers import RectifierConsumer
+from monitor.decoder import build_record
+from monitor.latest import get_dashboard
+from monitor.sites import site_cache
+
+SITES_PER_PROJECT = 10
+SINGLE_GROUP = 'rectifier_data'
+
+# Deliver every update, the benchmark counts messages, not conflation
+settings.WS_MAX_RATE = 1e6
+
+
+class SingleGroupConsumer(RectifierConsumer):
+    """Layout sebelumnya: semua consumer di satu group, filter site di consumer"""
+
+    async def subscribe(self, sites=(), projects=(), overview=False, snapshot=True):
+        await self.channel_layer.group_add(SINGLE_GROUP, self.channel_name)
+
+    async def unsubscribe(self, sites=(), projects=(), overview=False):
+        await self.channel_layer.group_discard(SINGLE_GROUP, self.channel_name)
+
+    async def rectifier_update(self, event):
+        if event['site'] == self.site_code:
+            await super().rectifier_update(event)
+
+
+def count_channel_messages(channel_layer, counts):
+    """Bungkus channel_layer.send (dipakai group_send) untuk menghitung message per channel"""
+    send, group_send = channel_layer.send, channel_layer.group_send
+
+    async def counting_send(channel, message):
+        try:
+            await send(channel, message)
+            counts['channel messages'] += 1
+        except ChannelFull:
+            counts['dropped (channel full)'] += 1
+            raise
+
+    async def counting_group_send(group, message):
+        counts['group_send'] += 1
+        await group_send(group, message)
+
+    channel_layer.send, channel_layer.group_send = counting_send, counting_group_send
+
+
+async def drain(communicator, count):
+    for _ in range(count):
+        await communicator.receive_from(timeout=120)
+
+
+async def receive_update(communicator, timeout=2):
+    """1 jika update site client diterima, 0 jika hilang (channel penuh) sebelum timeout"""
+    try:
+        # receive_from(timeout=) would cancel the application on timeout
+        await asyncio.wait_for(communicator.output_queue.get(), timeout)
+        return 1
+    except asyncio.TimeoutError:
+        return 0
+
+
+async def run(consumer, events, clients, sites, rounds):
+    channel_layer = get_channel_layer()
+    counts = dict.fromkeys(['group_send', 'channel messages', 'dropped (channel full)', 'frames to clients'], 0)
+    application = consumer.as_asgi()
+    communicators = [WebsocketCommunicator(application, f'/ws/rectifier/?site=site-{i % sites}') for i in range(clients)]
+    for communicator in communicators:
+        await communicator.connect()
+        await drain(communicator, 2)  # initial_data + history window
+
+    count_channel_messages(channel_layer, counts)
+    started = time.perf_counter()
+    for _ in range(rounds):
+        await broadcast.send_events(channel_layer, events)
+        received = await asyncio.gather(*[receive_update(communicator) for communicator in communicators])
+        counts['frames to clients'] += sum(received)
+    elapsed = time.perf_counter() - started
+
+    for communicator in communicators:
+        await communicator.disconnect()
+    return counts, elapsed
+
+
+def main():
+    sites = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    clients = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    rounds = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+
+    rows = []
+    db = create_test_db()
+    try:
+        payload = sample_payloads(1)[0]
+        for i in range(sites):
+            payload.update(site_id=f'site-{i}', project_id=f'project-{i // SITES_PER_PROJECT}')
+            build_record(payload).save()  # Also fills site_cache for update_groups()
+        dashboards = {f'site-{i}': get_dashboard(f'site-{i}') for i in range(sites)}
+
+        for label, consumer, events in (
+            ('single group', SingleGroupConsumer,
+             [(SINGLE_GROUP, broadcast.update_event(code, dashboard)) for code, dashboard in dashboards.items()]),
+            ('group per site', RectifierConsumer, broadcast.dashboard_events(dashboards)),
+        ):
+            counts, elapsed = asyncio.run(run(consumer, events, clients, sites, rounds))
+            rows.append((
+                label, *(f'{value // rounds:,}' for value in counts.values()), f'{elapsed / rounds * 1000:,.0f}',
+            ))
+    finally:
+        site_cache.clear()
+        destroy_test_db(db)
+
+    print_table(
+        f"{sites} sites updating, {clients} clients watching one site each (per round, in-memory layer)",
+        ['layout', 'group_send', 'channel messages', 'dropped (channel full)', 'frames to clients', 'ms/round'],
+        rows,
+    )
+
+
+if __name__ == '__main__':
+    main()
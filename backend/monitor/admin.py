@@ -1,27 +1,46 @@
 from django.contrib import admin
-from .models import RectifierData
+from .models import ALARM_CONDITIONS, RectifierData, RectifierRollup, Site
+
+class AlarmFilter(admin.SimpleListFilter):
+    """Filter row abnormal dengan kondisi yang sama persis dengan partial index-nya"""
+    title = 'alarm'
+    parameter_name = 'alarm'
+
+    def lookups(self, request, model_admin):
+        return [(name, name.capitalize()) for name in ALARM_CONDITIONS]
+
+    def queryset(self, request, queryset):
+        if self.value() in ALARM_CONDITIONS:
+            return queryset.filter(ALARM_CONDITIONS[self.value()])
+        return queryset
+
+@admin.register(Site)
+class SiteAdmin(admin.ModelAdmin):
+    list_display = ['code', 'site_name', 'project_id', 'ladder', 'sla', 'updated_at']
+    search_fields = ['code', 'site_name', 'project_id']
+    readonly_fields = ['created_at', 'updated_at']
 
 @admin.register(RectifierData)
 class RectifierDataAdmin(admin.ModelAdmin):
     list_display = [
         'id', 
         'timestamp', 
-        'site_name',
+        'site',
         'vdc_output', 
         'load_current', 
         'temperature',
         'status_realtime',
         'created_at'
     ]
-    list_filter = ['created_at', 'status_realtime', 'site_name']
-    search_fields = ['site_name', 'project_id']
+    list_filter = [AlarmFilter, 'created_at', 'status_realtime', 'site']
+    search_fields = ['site__code', 'site__site_name', 'site__project_id']
+    list_select_related = ['site']
     ordering = ['-timestamp']
     readonly_fields = ['created_at']
     
     fieldsets = (
         ('Site Information', {
-            'fields': ('timestamp', 'site_name', 'project_id', 'ladder', 'sla', 
-                      'status_realtime', 'status_ladder', 'latitude', 'longitude')
+            'fields': ('timestamp', 'site', 'status_realtime', 'status_ladder')
         }),
         ('Environment', {
             'fields': ('temperature', 'humidity', 'door_cabinet', 'battery_stolen')
@@ -61,3 +80,10 @@ class RectifierDataAdmin(admin.ModelAdmin):
     def has_change_permission(self, request, obj=None):
         # Temporary: allow edit for testing
         return True
+
+@admin.register(RectifierRollup)
+class RectifierRollupAdmin(admin.ModelAdmin):
+    list_display = ['site', 'resolution', 'bucket', 'count', 'vdc_output_min', 'vdc_output_max', 'load_current_max']
+    list_filter = ['resolution', 'site']
+    list_select_related = ['site']
+    ordering = ['-bucket']
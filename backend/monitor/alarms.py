@@ -0,0 +1,46 @@
+"""
+Site yang sedang alarm: row terbaru site memenuhi salah satu
+ALARM_CONDITIONS (status_realtime bukan Normal, pintu cabinet terbuka,
+baterai dicuri).
+
+Per site dua jenis lookup index, tanpa scan table: row terbaru lewat
+unique index (site, timestamp) dan row abnormal terbaru per kondisi lewat
+partial index rectifier_alarm_<kondisi>_idx, yang hanya berisi row
+abnormal sehingga tetap kecil. Site alarm jika keduanya sama.
+"""
+from functools import reduce
+from operator import or_
+from django.db.models import F, OuterRef, Q, Subquery
+from .models import ALARM_CONDITIONS, RectifierData, Site
+
+def newest_timestamp(*conditions):
+    """Subquery timestamp row terbaru site (OuterRef pk) yang memenuhi conditions"""
+    return Subquery(
+        RectifierData.objects.filter(*conditions, site=OuterRef('pk'))
+        .order_by('-timestamp').values('timestamp')[:1]
+    )
+
+def sites_in_alarm():
+    """List (row terbaru, [nama kondisi]) untuk setiap site yang sedang alarm, urut site code"""
+    sites = Site.objects.annotate(latest_timestamp=newest_timestamp()).annotate(**{
+        f'{name}_timestamp': newest_timestamp(condition) for name, condition in ALARM_CONDITIONS.items()
+    }).filter(reduce(or_, (
+        Q(**{f'{name}_timestamp': F('latest_timestamp')}) for name in ALARM_CONDITIONS
+    )))
+
+    alarms = {
+        site.pk: (site.latest_timestamp, [
+            name for name in ALARM_CONDITIONS if getattr(site, f'{name}_timestamp') == site.latest_timestamp
+        ])
+        for site in sites
+    }
+    if not alarms:
+        return []
+
+    records = RectifierData.objects.select_related('site').filter(reduce(or_, (
+        Q(site_id=site_id, timestamp=timestamp) for site_id, (timestamp, _) in alarms.items()
+    )))
+    return sorted(
+        ((record, alarms[record.site_id][1]) for record in records),
+        key=lambda item: item[0].site.code,
+    )
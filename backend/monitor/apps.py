@@ -5,13 +5,8 @@ class MonitorConfig(AppConfig):
     name = 'monitor'
     
     def ready(self):
-        """Start MQTT client ketika aplikasi ready"""
-        import os
-        # Only start in main process, not in migration or other commands
-        if os.environ.get('RUN_MAIN') == 'true':
-            from .mqtt_client import start_mqtt_client
-            try:
-                start_mqtt_client()
-                print("✓ MQTT Client started successfully")
-            except Exception as e:
-                print(f"✗ Failed to start MQTT client: {e}")
+        from django.db.models.signals import post_migrate
+        from .partitions import ensure_after_migrate
+        # Premake partitions on every deploy (no-op unless partitioned)
+        post_migrate.connect(ensure_after_migrate, sender=self)
+        # MQTT ingestion starts from the ASGI lifespan (monitor/lifespan.py), not here
@@ -0,0 +1,288 @@
+"""
+Arsip kolumnar RectifierData lama (retention)
+
+Command archive_history memindahkan row mentah yang lebih tua dari
+RETENTION_DAYS ke file .npz terkompresi, satu file per site per hari UTC
+(ARCHIVE_DIR/<site>/<YYYY-MM-DD>.npz), lalu menghapusnya dari database
+dalam batch kecil. Setiap kolom disimpan sebagai array NumPy: angka apa
+adanya, created_at sebagai epoch mikrodetik, string dan JSON sebagai
+dictionary (kode int32 + daftar nilai unik), field nullable dengan mask.
+
+manifest.json mencatat setiap hari yang diarsip (file, jumlah row,
+timestamp pertama/terakhir) dan ditulis ulang secara atomik setelah file
+hari tersebut selesai ditulis, sebelum row dihapus. read_rows() dan
+iter_days() memakai manifest untuk membaca hari yang sudah diarsip sehingga
+history API dan export tetap bisa menjangkau range di luar table.
+
+Rollup (1m/1h/1d) tidak ikut dihapus, jadi stats dan chart tetap mencakup
+history yang sudah diarsip.
+"""
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from urllib.parse import quote
+import numpy as np
+from django.conf import settings
+from .models import RectifierData
+from .sites import site_cache
+
+logger = logging.getLogger(__name__)
+
+DAY = 24 * 60 * 60 * 1000
+MANIFEST = 'manifest.json'
+
+# Everything except the site, which is implied by the file
+FIELDS = [field for field in RectifierData._meta.concrete_fields if field.name != 'site']
+INTEGER_TYPES = ('AutoField', 'BigAutoField', 'IntegerField', 'BigIntegerField', 'SmallIntegerField')
+
+def archive_dir():
+    return settings.ARCHIVE_DIR
+
+def day_name(day):
+    """Awal hari (epoch ms) -> 'YYYY-MM-DD'"""
+    return datetime.fromtimestamp(day / 1000, tz=timezone.utc).strftime('%Y-%m-%d')
+
+def day_path(site_code, day):
+    """Path file hari relatif terhadap ARCHIVE_DIR"""
+    return os.path.join(quote(site_code, safe=''), f'{day_name(day)}.npz')
+
+def manifest_key(site_code, day):
+    return f'{site_code}/{day_name(day)}'
+
+# Manifest
+
+def load_manifest(directory=None):
+    """Isi manifest.json ({'days': {key: entry}}), kosong jika belum ada"""
+    path = os.path.join(directory or archive_dir(), MANIFEST)
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {'days': {}}
+
+def write_atomic(path, write):
+    """Tulis file lewat file sementara + fsync + rename, sehingga pembaca tidak melihat file setengah jadi"""
+    tmp = f'{path}.tmp'
+    with open(tmp, 'wb') as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def save_manifest(manifest, directory=None):
+    directory = directory or archive_dir()
+    os.makedirs(directory, exist_ok=True)
+    write_atomic(os.path.join(directory, MANIFEST), lambda f: f.write(json.dumps(manifest, indent=1, sort_keys=True).encode()))
+
+# Columnar encoding
+
+def encode_columns(rows):
+    """Row tuple (urutan FIELDS) -> dict nama array untuk np.savez_compressed"""
+    arrays = {}
+    for index, field in enumerate(FIELDS):
+        values = [row[index] for row in rows]
+        kind = field.get_internal_type()
+        if field.null:
+            missing = np.array([value is None for value in values], dtype=bool)
+            arrays[f'{field.name}__null'] = missing
+        if kind == 'FloatField':
+            arrays[field.name] = np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+        elif kind in INTEGER_TYPES:
+            arrays[field.name] = np.array([0 if value is None else value for value in values], dtype=np.int64)
+        elif kind == 'DateTimeField':
+            arrays[field.name] = np.array(
+                [0 if value is None else int(value.timestamp() * 1_000_000) for value in values], dtype=np.int64,
+            )
+        else:
+            if kind == 'JSONField':
+                values = [json.dumps(value) for value in values]
+            uniques, codes = np.unique(np.array(['' if value is None else value for value in values], dtype=str), return_inverse=True)
+            arrays[field.name] = codes.astype(np.int32)
+            arrays[f'{field.name}__values'] = uniques
+    return arrays
+
+def decode_columns(arrays, select):
+    """Kembalikan list nilai per field (urutan FIELDS) untuk index select"""
+    columns = []
+    for field in FIELDS:
+        kind = field.get_internal_type()
+        column = arrays[field.name][select]
+        if f'{field.name}__values' in arrays:
+            values = arrays[f'{field.name}__values'][column].tolist()
+            if kind == 'JSONField':
+                values = [json.loads(value) for value in values]
+        elif kind == 'DateTimeField':
+            values = [datetime.fromtimestamp(value / 1_000_000, tz=timezone.utc) for value in column.tolist()]
+        else:
+            values = column.tolist()
+        if field.null:
+            missing = arrays[f'{field.name}__null'][select].tolist()
+            values = [None if gone else value for value, gone in zip(values, missing)]
+        columns.append(values)
+    return columns
+
+# Read path
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+CACHE_DAYS = 8
+
+def load_day(path):
+    """Semua array dari satu file hari (LRU kecil, key path + mtime)"""
+    key = (path, os.stat(path).st_mtime_ns)
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+    with np.load(path, allow_pickle=False) as npz:
+        arrays = {name: npz[name] for name in npz.files}
+    with _cache_lock:
+        _cache[key] = arrays
+        while len(_cache) > CACHE_DAYS:
+            _cache.popitem(last=False)
+    return arrays
+
+_manifest = {}
+
+def cached_manifest(directory):
+    """load_manifest() yang dibaca ulang hanya jika manifest.json berubah"""
+    path = os.path.join(directory, MANIFEST)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    if _manifest.get('key') != (path, mtime):
+        _manifest.update(key=(path, mtime), value=load_manifest(directory))
+    return _manifest['value']
+
+def read_day_rows(directory, entry):
+    """Semua row satu file hari sebagai list tuple (urutan FIELDS)"""
+    arrays = load_day(os.path.join(directory, entry['file']))
+    return list(zip(*decode_columns(arrays, slice(None))))
+
+def select_entries(directory, site_code, lowest, highest):
+    """Entry manifest untuk site (None = semua) yang overlap dengan [lowest, highest]"""
+    manifest = cached_manifest(directory)
+    if not manifest:
+        return []
+    return [
+        entry for entry in manifest['days'].values()
+        if (site_code is None or entry['site'] == site_code)
+        and entry['last'] >= lowest and entry['first'] <= highest
+    ]
+
+def read_rows(site_code=None, start=None, end=None, before=None, after=None, limit=100):
+    """
+    Row arsip untuk history, urut (-timestamp, -id), maksimal limit.
+    start/end: range timestamp inklusif. before/after: posisi (timestamp, id)
+    eksklusif dari cursor dan dari row terakhir halaman database. Hanya file
+    hari yang bisa berisi row tersebut yang dibaca.
+    """
+    directory = archive_dir()
+    lowest = max(start if start is not None else -np.inf, after[0] if after else -np.inf)
+    highest = min(end if end is not None else np.inf, before[0] if before else np.inf)
+    entries = select_entries(directory, site_code, lowest, highest)
+    if not entries:
+        return []
+
+    rows = []
+    # Days never overlap in time, so stop once the newer days filled the page
+    for day in sorted({entry['day'] for entry in entries}, reverse=True):
+        if len(rows) >= limit:
+            break
+        for entry in (entry for entry in entries if entry['day'] == day):
+            site = site_cache.get(entry['site'])
+            if site is None:
+                continue
+            try:
+                arrays = load_day(os.path.join(directory, entry['file']))
+            except OSError as e:
+                logger.error(f"✗ Archive file {entry['file']} unreadable: {e}")
+                continue
+
+            timestamps, ids = arrays['timestamp'], arrays['id']
+            keep = (timestamps >= lowest) & (timestamps <= highest)
+            if before:
+                keep &= (timestamps < before[0]) | ((timestamps == before[0]) & (ids < before[1]))
+            if after:
+                keep &= (timestamps > after[0]) | ((timestamps == after[0]) & (ids > after[1]))
+            select = np.flatnonzero(keep)
+            # Newest first within the file, no more than limit per file
+            select = select[np.lexsort((-ids[select], -timestamps[select]))][:limit]
+
+            for values in zip(*decode_columns(arrays, select)):
+                record = RectifierData(site=site, **{field.attname: value for field, value in zip(FIELDS, values)})
+                record._state.adding = False
+                rows.append(record)
+
+    rows.sort(key=lambda record: (record.timestamp, record.pk), reverse=True)
+    return rows[:limit]
+
+def iter_days(site_code=None, start=None, end=None):
+    """
+    Row arsip dalam [start, end] (inklusif) untuk export, satu list per hari
+    urut (timestamp, id). Setiap row adalah tuple (site code, nilai FIELDS...)
+    """
+    directory = archive_dir()
+    lowest = start if start is not None else -np.inf
+    highest = end if end is not None else np.inf
+    entries = select_entries(directory, site_code, lowest, highest)
+    names = [field.name for field in FIELDS]
+    # +1 for the site code in front
+    timestamp_index, id_index = names.index('timestamp') + 1, names.index('id') + 1
+
+    for day in sorted({entry['day'] for entry in entries}):
+        rows = []
+        for entry in (entry for entry in entries if entry['day'] == day):
+            try:
+                arrays = load_day(os.path.join(directory, entry['file']))
+            except OSError as e:
+                logger.error(f"✗ Archive file {entry['file']} unreadable: {e}")
+                continue
+            timestamps = arrays['timestamp']
+            select = np.flatnonzero((timestamps >= lowest) & (timestamps <= highest))
+            rows += [(entry['site'], *values) for values in zip(*decode_columns(arrays, select))]
+        rows.sort(key=lambda row: (row[timestamp_index], row[id_index]))
+        if rows:
+            yield rows
+
+# Write path
+
+def archive_day(site, day, rows, directory=None):
+    """
+    Tulis row satu site untuk satu hari ke file .npz dan catat di manifest.
+    Row yang sudah ada di arsip (run sebelumnya berhenti sebelum delete,
+    atau data terlambat) digabung, duplikat timestamp diabaikan.
+    """
+    directory = directory or archive_dir()
+    manifest = load_manifest(directory)
+    key = manifest_key(site.code, day)
+    relative = day_path(site.code, day)
+    path = os.path.join(directory, relative)
+
+    names = [field.name for field in FIELDS]
+    timestamp_index, id_index = names.index('timestamp'), names.index('id')
+    if key in manifest['days'] and os.path.exists(path):
+        existing = read_day_rows(directory, manifest['days'][key])
+        seen = {row[timestamp_index] for row in existing}
+        rows = existing + [row for row in rows if row[timestamp_index] not in seen]
+    rows = sorted(rows, key=lambda row: (row[timestamp_index], row[id_index]))
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    write_atomic(path, lambda f: np.savez_compressed(f, **encode_columns(rows)))
+
+    manifest['days'][key] = {
+        'site': site.code,
+        'day': day,
+        'file': relative,
+        'rows': len(rows),
+        'first': rows[0][timestamp_index],
+        'last': rows[-1][timestamp_index],
+        'bytes': os.path.getsize(path),
+        'archived_at': datetime.now(timezone.utc).isoformat(),
+    }
+    save_manifest(manifest, directory)
+    return manifest['days'][key]
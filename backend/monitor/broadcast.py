@@ -0,0 +1,145 @@
+"""
+Broadcast update dashboard ke client WebSocket
+
+Setelah batch tersimpan, dashboard setiap site yang berubah sudah di-render
+oleh latest.update_latest(); message WebSocket dibentuk sekali per update
+(teks JSON) di producer lalu dikirim lewat channel layer apa adanya.
+RectifierConsumer.rectifier_update hanya meneruskan teks tersebut, jadi biaya
+serialisasi tidak bertambah dengan jumlah client yang terhubung.
+
+Setiap update hanya dikirim ke group yang relevan: group per site, group
+per project site tersebut, dan ALL_GROUP untuk dashboard semua site (row
+terbaru dari seluruh site). Client hanya menerima site yang di-subscribe.
+
+Protocol v2 (?v=2) mengirim delta: selain teks lengkap, setiap event
+membawa patch dari dashboard yang terakhir dipublish untuk site tersebut
+({"type": "rectifier_delta", "site", "seq", "base", "patch": [[path, value], ...]}).
+seq adalah version dashboard (timestamp row), base adalah seq sebelumnya.
+Consumer hanya mengirim delta jika client sudah menerima base, selain itu
+(dan minimal setiap WS_KEYFRAME_INTERVAL detik) dikirim keyframe lengkap.
+
+Dipanggil dari ingest.records_saved, jadi berlaku untuk MQTT client di
+proses Django maupun mqtt_listener.py (lewat Redis channel layer).
+"""
+import hashlib
+import json
+import logging
+import re
+import threading
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from .sites import site_cache
+
+logger = logging.getLogger(__name__)
+
+# Dashboard over all sites (site None)
+ALL_GROUP = 'rectifier.all'
+
+# Channel layer group names: ASCII letters, digits, hyphens, underscores and periods, < 100 chars
+GROUP_NAME = re.compile(r'[a-zA-Z0-9_.-]{1,99}')
+
+def group_name(kind, value):
+    """Nama group untuk site / project, di-hash jika value tidak valid sebagai nama group"""
+    name = f'rectifier.{kind}.{value}'
+    if not GROUP_NAME.fullmatch(name):
+        name = f'rectifier.{kind}.sha1-{hashlib.sha1(str(value).encode()).hexdigest()}'
+    return name
+
+def site_group(site_code):
+    return group_name('site', site_code)
+
+def project_group(project_id):
+    return group_name('project', project_id)
+
+def message(message_type, site_code, dashboard, **extra):
+    """Teks message WebSocket dengan JSON dashboard (bytes) disisipkan tanpa parse ulang"""
+    header = json.dumps({'type': message_type, 'site': site_code, **extra})
+    body = dashboard.body.decode() if dashboard is not None else 'null'
+    return f'{header[:-1]}, "data": {body}}}'
+
+# Last dashboard published per site in this process: {site code: (seq, data)}
+_published = {}
+_published_lock = threading.Lock()
+
+def diff(old, new, path=()):
+    """
+    Patch [[path, value], ...] dari old ke new. Dict dengan key yang sama dan
+    list dengan panjang yang sama di-diff per elemen, selain itu diganti utuh
+    (path kosong = seluruh dashboard)
+    """
+    if isinstance(old, dict) and isinstance(new, dict) and old.keys() == new.keys():
+        return [op for key in new for op in diff(old[key], new[key], (*path, key))]
+    if isinstance(old, list) and isinstance(new, list) and len(old) == len(new):
+        return [op for index, (a, b) in enumerate(zip(old, new)) for op in diff(a, b, (*path, index))]
+    if type(old) is type(new) and old == new:
+        return []
+    return [[list(path), new]]
+
+def delta_message(site_code, seq, base, patch):
+    return json.dumps({'type': 'rectifier_delta', 'site': site_code, 'seq': seq, 'base': base, 'patch': patch},
+                      separators=(',', ':'))
+
+def update_event(site_code, dashboard):
+    """
+    Event channel layer untuk RectifierConsumer.rectifier_update: teks lengkap,
+    dan delta dari dashboard yang terakhir dipublish (None jika tidak ada)
+    """
+    data = json.loads(dashboard.body)
+    with _published_lock:
+        previous = _published.get(site_code)
+        if previous is None or previous[0] < dashboard.version:
+            _published[site_code] = (dashboard.version, data)
+    text = message('rectifier_update', site_code, dashboard, seq=dashboard.version)
+    delta = None
+    if previous is not None and previous[0] < dashboard.version:
+        delta = delta_message(site_code, dashboard.version, previous[0], diff(previous[1], data))
+        if len(delta) >= len(text):
+            # Almost everything changed, the full message is the smaller frame
+            delta = None
+    return {
+        'type': 'rectifier_update', 'site': site_code, 'seq': dashboard.version,
+        'base': previous[0] if delta is not None else None,
+        'text': text,
+        'delta': delta,
+    }
+
+def update_groups(site_code):
+    """Group yang menerima update site (None = semua site)"""
+    if site_code is None:
+        return [ALL_GROUP]
+    groups = [site_group(site_code)]
+    site = site_cache.get(site_code)
+    if site is not None and site.project_id:
+        groups.append(project_group(site.project_id))
+    return groups
+
+def dashboard_events(dashboards):
+    """[(group, event)] untuk {site code: DashboardPayload}"""
+    events = []
+    for code, dashboard in dashboards.items():
+        # Site and project groups share one encoded event
+        event = update_event(code, dashboard)
+        events += [(group, event) for group in update_groups(code)]
+    return events
+
+async def send_events(channel_layer, events):
+    """Kirim [(group, event)]"""
+    for group, event in events:
+        await channel_layer.group_send(group, event)
+
+def broadcast_dashboards(dashboards, channel_layer=None):
+    """Kirim rectifier_update untuk {site code (None = semua site): DashboardPayload}"""
+    if not dashboards:
+        return 0
+    channel_layer = channel_layer or get_channel_layer()
+    if channel_layer is None:
+        logger.debug("WebSocket channel layer not available (OK - using REST API polling)")
+        return 0
+    try:
+        # One event loop round trip per batch, not per site
+        async_to_sync(send_events)(channel_layer, dashboard_events(dashboards))
+    except Exception as e:
+        logger.warning(f"WebSocket broadcast failed (OK - using REST API polling): {e}")
+        return 0
+    logger.debug(f"Dashboard broadcast for {len(dashboards)} sites")
+    return len(dashboards)
@@ -0,0 +1,131 @@
+"""
+Format biner kolumnar untuk chart_data dan history
+
+Alternatif JSON lewat content negotiation (Accept: application/vnd.rectifier.columnar
+atau ?format=columnar). Setiap kolom dikirim sebagai array little-endian
+sehingga browser bisa membuat Float64Array / Float32Array langsung dari
+response tanpa parse angka satu per satu.
+
+Layout:
+    b'RCOL' | uint32 panjang header | header JSON (UTF-8) | padding ke 8 byte | kolom...
+
+Header: {"version", "rows", "columns": [{"name", "type", "offset", "length"}], "meta"}
+offset dihitung dari awal kolom pertama, setiap kolom align 8 byte. type:
+    f64, f32  float, null = NaN
+    i64       integer ("unit": "us" untuk datetime, epoch mikrodetik)
+    dict      uint32 kode ke "values" di header (string atau null)
+    json      seperti dict, "values" berisi teks JSON
+Decoder: decode() di bawah dan decodeColumnar() di frontend-nextjs/src/services/api.ts.
+"""
+import json
+import struct
+import numpy as np
+from rest_framework import serializers
+from rest_framework.renderers import BaseRenderer
+
+MAGIC = b'RCOL'
+VERSION = 1
+MEDIA_TYPE = 'application/vnd.rectifier.columnar'
+FORMAT = 'columnar'
+ALIGN = 8
+
+DTYPES = {'f64': '<f8', 'f32': '<f4', 'i64': '<i8', 'dict': '<u4', 'json': '<u4'}
+
+class Table:
+    """Data response kolumnar: list kolom (name, type, values, extra header) dan meta"""
+
+    def __init__(self, columns, meta=None):
+        self.columns = columns
+        self.meta = meta or {}
+
+def padding(size):
+    return -size % ALIGN
+
+def dictionary(values):
+    """Nilai -> (list nilai unik, kode uint32)"""
+    index = {}
+    codes = np.fromiter((index.setdefault(value, len(index)) for value in values), dtype=DTYPES['dict'], count=len(values))
+    return list(index), codes
+
+def encode(table):
+    """Table -> bytes"""
+    columns, buffers, offset, rows = [], [], 0, None
+    for name, kind, values, extra in table.columns:
+        entry = {'name': name, 'type': kind, 'offset': offset, **extra}
+        if kind in ('dict', 'json'):
+            if kind == 'json':
+                values = [None if value is None else json.dumps(value) for value in values]
+            entry['values'], data = dictionary(values)
+        else:
+            data = np.asarray(values, dtype=DTYPES[kind])
+        entry['length'] = rows = len(data)
+        raw = data.tobytes()
+        buffers.append(raw + b'\0' * padding(len(raw)))
+        offset += len(buffers[-1])
+        columns.append(entry)
+
+    header = json.dumps({
+        'version': VERSION, 'rows': rows or 0, 'columns': columns, 'meta': table.meta,
+    }, separators=(',', ':')).encode()
+    prefix = MAGIC + struct.pack('<I', len(header)) + header
+    return b''.join([prefix, b'\0' * padding(len(prefix)), *buffers])
+
+def decode(data):
+    """bytes -> (meta, {name: numpy array}), untuk benchmark dan client Python"""
+    if data[:4] != MAGIC:
+        raise ValueError('Not a columnar response')
+    (length,) = struct.unpack_from('<I', data, 4)
+    header = json.loads(data[8:8 + length])
+    body = 8 + length + padding(8 + length)
+    columns = {}
+    for column in header['columns']:
+        array = np.frombuffer(data, dtype=DTYPES[column['type']], count=column['length'], offset=body + column['offset'])
+        if column['type'] in ('dict', 'json'):
+            values = column['values']
+            if column['type'] == 'json':
+                values = [None if value is None else json.loads(value) for value in values]
+            # Object array so that JSON lists are not broadcast
+            lookup = np.empty(len(values), dtype=object)
+            lookup[:] = values
+            array = lookup[array]
+        columns[column['name']] = array
+    return header['meta'], columns
+
+def chart_table(timestamps, fields, values):
+    """Series chart_data: timestamps int64 + float32 per field"""
+    return Table([('timestamps', 'i64', timestamps, {})] + [
+        (name, 'f32', values[:, i], {}) for i, name in enumerate(fields)
+    ])
+
+def record_columns(records, serializer):
+    """
+    Kolom untuk list model instance dengan field dan nama yang sama seperti
+    output serializer (misalnya site_code dari source='site.code')
+    """
+    columns = []
+    for name, field in serializer.fields.items():
+        values = [field.get_attribute(record) for record in records]
+        if isinstance(field, serializers.FloatField):
+            columns.append((name, 'f64', [np.nan if value is None else value for value in values], {}))
+        elif isinstance(field, serializers.IntegerField):
+            if any(value is None for value in values):
+                columns.append((name, 'f64', [np.nan if value is None else value for value in values], {}))
+            else:
+                columns.append((name, 'i64', values, {}))
+        elif isinstance(field, serializers.DateTimeField):
+            micros = [0 if value is None else int(value.timestamp() * 1_000_000) for value in values]
+            columns.append((name, 'i64', micros, {'unit': 'us'}))
+        elif isinstance(field, serializers.JSONField):
+            columns.append((name, 'json', values, {}))
+        else:
+            columns.append((name, 'dict', [None if value is None else field.to_representation(value) for value in values], {}))
+    return columns
+
+class ColumnarRenderer(BaseRenderer):
+    """Render Table (error response tetap JSON, lihat RectifierDataViewSet.finalize_response)"""
+    media_type = MEDIA_TYPE
+    format = FORMAT
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return encode(data)
@@ -1,76 +1,395 @@
+import asyncio
 import json
+import logging
+from collections import deque, namedtuple
+from urllib.parse import parse_qs
+from django.conf import settings
+from channels.exceptions import StopConsumer
+from channels.generic.http import AsyncHttpConsumer
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
-from .models import RectifierData
+from . import sse
+from .broadcast import ALL_GROUP, message, project_group, site_group
+from .latest import WINDOW_FIELDS, get_dashboard, get_window
+from .models import Site
+from .sites import site_cache
+
+logger = logging.getLogger(__name__)
+
+# Close code for clients that stop acknowledging (application range 4000-4999)
+CLOSE_SLOW_CLIENT = 4008
+
+SiteSnapshot = namedtuple('SiteSnapshot', ['project', 'payload'])
+
+def as_list(value):
+    """Nilai sites / projects dari client -> list string"""
+    if value is None:
+        return []
+    if isinstance(value, (str, int)):
+        value = [value]
+    return [str(item) for item in value if item not in (None, '')]
 
 class RectifierConsumer(AsyncWebsocketConsumer):
-    """WebSocket consumer untuk real-time data rectifier"""
-    
+    """
+    WebSocket consumer untuk real-time data rectifier
+
+    ws/rectifier/?site=<code> (opsional). Setelah connect dikirim:
+    - text: {"type": "initial_data", "site", "data": <sama dengan /api/rectifier/dashboard/>,
+      "history": {"format": "columnar", "fields", "points"} atau null}
+    - binary (jika history tidak null): window WS_HISTORY_POINTS titik terakhir
+      dalam format kolumnar (decodeColumnar() di frontend)
+    Keduanya diambil dari cache (monitor/latest.py), bukan query per koneksi.
+    Setiap update setelahnya: {"type": "rectifier_update", "site", "data": <dashboard>},
+    di-encode sekali oleh producer (monitor/broadcast.py).
+
+    Subscription: tanpa ?site= koneksi menerima dashboard semua site, dengan
+    ?site= hanya site tersebut. Lewat socket:
+    {"type": "subscribe" | "unsubscribe", "sites": [...], "projects": [...], "all": bool}
+    dibalas {"type": "subscribed", "sites", "projects", "all"}; setiap site
+    baru dikirim snapshot-nya sebagai latest_data. Maksimal
+    WS_MAX_SUBSCRIPTIONS site + project per koneksi. Setiap site / project
+    adalah group channel layer sendiri, jadi client hanya menerima update
+    yang di-subscribe.
+
+    Flow control per koneksi:
+    - ?rate=<update/detik> (atau message {"type": "set_rate", "rate"}), maksimal
+      WS_MAX_RATE. Update di antara dua pengiriman di-conflate: hanya yang
+      terbaru per site yang dikirim
+    - ?ack=1: client mengirim {"type": "ack", "seq": <jumlah frame diterima>}.
+      Jika frame yang belum di-ack melebihi WS_MAX_UNACKED_BYTES pengiriman
+      ditahan (tetap di-conflate); jika tetap begitu selama
+      WS_SLOW_CLIENT_TIMEOUT detik koneksi ditutup dengan code 4008
+    Memori per koneksi dibatasi satu update per site plus frame yang belum di-ack.
+    Tanpa ?ack=1 server tidak tahu frame mana yang sudah dibaca client, jadi
+    by design tidak ada batas byte maupun disconnect: hanya rate dan conflation
+    yang berlaku, dan frame yang sudah dikirim ke client yang berhenti membaca
+    tetap di buffer server ASGI. Client yang perlu batas tersebut memakai ?ack=1.
+
+    Protocol v2 (?v=2): semua dashboard membawa "seq" dan update dikirim sebagai
+    {"type": "rectifier_delta", "site", "seq", "base", "patch"} jika client
+    sudah menerima seq base untuk site tersebut; selain itu, dan minimal setiap
+    WS_KEYFRAME_INTERVAL detik, dikirim rectifier_update lengkap (keyframe).
+    Client yang kehilangan base mengirim {"type": "resync", "site"} dan
+    menerima latest_data lengkap.
+    """
+
     async def connect(self):
         """Handle WebSocket connection"""
-        self.room_group_name = 'rectifier_data'
-        
-        # Join room group
-        await self.channel_layer.group_add(
-            self.room_group_name,
-            self.channel_name
-        )
-        
+        query = parse_qs(self.scope.get('query_string', b'').decode())
+        self.site_code = query.get('site', [None])[0] or None
+
+        self.max_rate = getattr(settings, 'WS_MAX_RATE', 4)
+        self.set_rate(query.get('rate', [None])[0])
+        self.flow_control = query.get('ack', [''])[0] in ('1', 'true')
+        self.deltas = query.get('v', ['1'])[0] == '2'
+        self.seqs = {}  # Site code -> seq of the last dashboard sent
+        self.keyframes = {}  # Site code -> loop time of the last full dashboard sent
+        self.sent = 0  # Frames sent, acknowledged by the client with {"type": "ack", "seq": n}
+        self.unacked = deque()  # (seq, size) of frames not acknowledged yet
+        self.unacked_bytes = 0
+        self.acked = asyncio.Event()
+        self.pending = {}  # Site code -> newest update event not sent yet
+        self.wakeup = asyncio.Event()
+        self.sender = None
+        self.sites, self.projects, self.overview = set(), set(), False
+
         await self.accept()
-        
-        # Send latest data on connection
-        latest_data = await self.get_latest_data()
-        if latest_data:
-            await self.send(text_data=json.dumps({
-                'type': 'initial_data',
-                'data': latest_data
-            }))
-    
+        if self.site_code:
+            await self.subscribe([self.site_code], snapshot=False)
+        else:
+            await self.subscribe(overview=True, snapshot=False)
+
+        # Send dashboard snapshot and recent history on connection
+        dashboard, window = await self.get_initial_state()
+        await self.send_event(self.snapshot_event('initial_data', self.site_code, dashboard, window))
+        if window is not None:
+            await self.send(bytes_data=window.body)
+
+        self.sender = asyncio.create_task(self.send_updates())
+
     async def disconnect(self, close_code):
         """Handle WebSocket disconnection"""
-        # Leave room group
-        await self.channel_layer.group_discard(
-            self.room_group_name,
-            self.channel_name
-        )
-    
-    async def receive(self, text_data):
+        if getattr(self, 'sender', None) is not None:
+            self.sender.cancel()
+        # Leave all subscribed groups
+        if hasattr(self, 'sites'):
+            await self.unsubscribe(self.sites, self.projects, self.overview)
+
+    async def receive(self, text_data=None, bytes_data=None):
         """Handle messages from WebSocket"""
+        if text_data is None:
+            return
         try:
             data = json.loads(text_data)
             message_type = data.get('type', 'unknown')
-            
-            if message_type == 'request_latest':
-                latest_data = await self.get_latest_data()
+
+            if message_type == 'ack':
+                self.acknowledge(int(data.get('seq', 0)))
+            elif message_type == 'set_rate':
+                self.set_rate(data.get('rate'))
+            elif message_type in ('subscribe', 'unsubscribe'):
+                sites, projects = as_list(data.get('sites')), as_list(data.get('projects'))
+                if message_type == 'subscribe':
+                    await self.subscribe(sites, projects, bool(data.get('all')))
+                else:
+                    await self.unsubscribe(sites, projects, bool(data.get('all')))
                 await self.send(text_data=json.dumps({
-                    'type': 'latest_data',
-                    'data': latest_data
+                    'type': 'subscribed', 'sites': sorted(self.sites), 'projects': sorted(self.projects), 'all': self.overview,
                 }))
-        except json.JSONDecodeError:
+            elif message_type == 'request_latest':
+                dashboard = await self.get_dashboard_payload(self.site_code)
+                await self.send_event(self.snapshot_event('latest_data', self.site_code, dashboard))
+            elif message_type == 'resync':
+                code = data.get('site')
+                if code in self.sites or (code is None and self.overview) or code in self.seqs:
+                    # Full dashboard through the rate limited path, replacing a pending delta
+                    dashboard = await self.get_dashboard_payload(code)
+                    if dashboard is not None:
+                        self.pending[code] = self.snapshot_event('latest_data', code, dashboard)
+                        self.wakeup.set()
+        except (json.JSONDecodeError, AttributeError, TypeError, ValueError):
             pass
-    
+
+    async def send(self, text_data=None, bytes_data=None, close=False):
+        """Kirim frame dan catat ukurannya untuk flow control"""
+        await super().send(text_data=text_data, bytes_data=bytes_data, close=close)
+        if self.flow_control and (text_data is not None or bytes_data is not None):
+            self.sent += 1
+            # Characters for text frames - close enough to bytes for a limit
+            size = len(text_data) if text_data is not None else len(bytes_data)
+            self.unacked.append((self.sent, size))
+            self.unacked_bytes += size
+
     async def rectifier_update(self, event):
-        """Handle rectifier update from MQTT"""
-        # Send message to WebSocket
-        await self.send(text_data=json.dumps({
-            'type': 'rectifier_update',
-            'data': event['data']
-        }))
-    
-    @database_sync_to_async
-    def get_latest_data(self):
-        """Get latest data from database"""
+        """Handle rectifier update dari group yang di-subscribe (teks sudah di-encode oleh producer)"""
+        # Conflate: a newer update replaces the one waiting to be sent
+        self.pending[event['site']] = event
+        self.wakeup.set()
+
+    async def subscribe(self, sites=(), projects=(), overview=False, snapshot=True):
+        """Join group site / project yang ada (dibatasi WS_MAX_SUBSCRIPTIONS), snapshot site baru lewat pending"""
+        room = getattr(settings, 'WS_MAX_SUBSCRIPTIONS', 100) - len(self.sites) - len(self.projects)
+        sites = [code for code in dict.fromkeys(sites) if code not in self.sites]
+        projects = [project for project in dict.fromkeys(projects) if project not in self.projects]
+        sites, projects, snapshots = await self.resolve_subscriptions(sites[:max(room, 0)], projects, snapshot)
+        projects = projects[:max(room - len(sites), 0)]
+
+        groups = [site_group(code) for code in sites] + [project_group(project) for project in projects]
+        if overview and not self.overview:
+            groups.append(ALL_GROUP)
+        for group in groups:
+            await self.channel_layer.group_add(group, self.channel_name)
+        self.sites.update(sites)
+        self.projects.update(projects)
+        self.overview = self.overview or overview
+
+        for code, dashboard in snapshots:
+            if code in self.sites or dashboard.project in self.projects:
+                self.pending.setdefault(code, self.snapshot_event('latest_data', code, dashboard.payload))
+        if snapshots:
+            self.wakeup.set()
+
+    async def unsubscribe(self, sites=(), projects=(), overview=False):
+        """Leave group site / project"""
+        sites = [code for code in sites if code in self.sites]
+        projects = [project for project in projects if project in self.projects]
+        groups = [site_group(code) for code in sites] + [project_group(project) for project in projects]
+        if overview and self.overview:
+            groups.append(ALL_GROUP)
+        for group in groups:
+            await self.channel_layer.group_discard(group, self.channel_name)
+        self.sites.difference_update(sites)
+        self.projects.difference_update(projects)
+        self.overview = self.overview and not overview
+        for code in sites:
+            self.pending.pop(code, None)
+
+    def set_rate(self, rate):
+        """Interval minimal antar pengiriman dari rate (update/detik), dibatasi WS_MAX_RATE"""
         try:
-            latest = RectifierData.objects.first()
-            if latest:
-                return {
-                    'timestamp': latest.timestamp,
-                    'host': latest.host,
-                    'bus_volt': latest.bus_volt,
-                    'load_curr': latest.load_curr,
-                    'ac_volt_l1': latest.ac_volt_l1,
-                    'ac_curr_l1': latest.ac_curr_l1,
-                }
-        except RectifierData.DoesNotExist:
-            pass
-        return None
+            rate = float(rate)
+        except (TypeError, ValueError):
+            rate = self.max_rate
+        if not rate > 0:
+            rate = self.max_rate
+        self.interval = 1 / min(rate, self.max_rate)
+
+    def acknowledge(self, seq):
+        """Lepaskan frame sampai seq dari hitungan unacked"""
+        while self.unacked and self.unacked[0][0] <= seq:
+            self.unacked_bytes -= self.unacked.popleft()[1]
+        self.acked.set()
+
+    async def wait_for_acks(self):
+        """Tunggu sampai unacked di bawah WS_MAX_UNACKED_BYTES, False jika timeout"""
+        limit = getattr(settings, 'WS_MAX_UNACKED_BYTES', 131072)
+        timeout = getattr(settings, 'WS_SLOW_CLIENT_TIMEOUT', 30)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while self.unacked_bytes > limit:
+            self.acked.clear()
+            try:
+                await asyncio.wait_for(self.acked.wait(), deadline - loop.time())
+            except asyncio.TimeoutError:
+                return False
+        return True
+
+    async def send_updates(self):
+        """Kirim update yang menunggu, paling sering sekali per interval"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await self.wakeup.wait()
+            if self.flow_control and not await self.wait_for_acks():
+                logger.warning(f"✗ Closing slow WebSocket client: {self.unacked_bytes} bytes unacknowledged")
+                await self.close(code=CLOSE_SLOW_CLIENT)
+                return
+            self.wakeup.clear()
+            pending, self.pending = self.pending, {}
+            started = loop.time()
+            for event in pending.values():
+                await self.send_event(event)
+            await asyncio.sleep(self.interval - (loop.time() - started))
+
+    async def send_event(self, event):
+        """Kirim delta jika client punya base dan keyframe belum jatuh tempo, selain itu teks lengkap"""
+        code = event['site']
+        now = asyncio.get_running_loop().time()
+        keyframe_due = now - self.keyframes.get(code, now) >= getattr(settings, 'WS_KEYFRAME_INTERVAL', 60)
+        if (self.deltas and event.get('delta') is not None
+                and event.get('base') == self.seqs.get(code) and not keyframe_due):
+            await self.send(text_data=event['delta'])
+        else:
+            await self.send(text_data=event['text'])
+            self.keyframes[code] = now
+        if event.get('seq') is not None:
+            self.seqs[code] = event['seq']
+
+    def snapshot_event(self, message_type, site_code, dashboard, window=None):
+        """Event dashboard lengkap (initial_data / latest_data) dalam bentuk yang sama dengan update"""
+        extra = {}
+        if message_type == 'initial_data':
+            extra['history'] = None if window is None else {
+                'format': 'columnar', 'fields': list(WINDOW_FIELDS), 'points': window.rows,
+            }
+        seq = dashboard.version if dashboard is not None else None
+        return {'site': site_code, 'seq': seq, 'text': message(message_type, site_code, dashboard, seq=seq, **extra)}
+
+    @database_sync_to_async
+    def resolve_subscriptions(self, sites, projects, snapshot):
+        """(site yang ada, project yang ada, [(site code, SiteSnapshot)] jika snapshot)"""
+        sites = [code for code in sites if site_cache.get(code) is not None]
+        project_sites = {}
+        for code, project in Site.objects.filter(project_id__in=projects).values_list('code', 'project_id'):
+            project_sites.setdefault(project, []).append(code)
+        projects = [project for project in projects if project in project_sites]
+        snapshots = []
+        if snapshot:
+            codes = {code: None for code in sites}
+            codes.update((code, project) for project in projects for code in project_sites[project])
+            for code, project in codes.items():
+                dashboard = get_dashboard(code)
+                if dashboard is not None:
+                    snapshots.append((code, SiteSnapshot(project, dashboard)))
+        return sites, projects, snapshots
+
+    @database_sync_to_async
+    def get_dashboard_payload(self, site_code):
+        """DashboardPayload dari cache (database on cold start), None untuk site yang tidak dikenal"""
+        if site_code and site_cache.get(site_code) is None:
+            return None
+        return get_dashboard(site_code)
+
+    @database_sync_to_async
+    def get_initial_state(self):
+        """(DashboardPayload, WindowPayload) dari cache, None jika tidak ada"""
+        if self.site_code and site_cache.get(self.site_code) is None:
+            return None, None
+        dashboard = get_dashboard(self.site_code)
+        if dashboard is None:
+            return None, None
+        return dashboard, get_window(self.site_code)
+
+class DashboardStreamConsumer(AsyncHttpConsumer):
+    """
+    Server-Sent Events untuk update dashboard (alternatif ringan polling)
+
+    GET /api/stream/rectifier/?site=<code> (opsional, tanpa site = semua site).
+    Setiap event: "id: <seq>" dan "data: <message yang sama dengan WebSocket>"
+    (latest_data saat connect, rectifier_update setelahnya). Client yang
+    reconnect dengan Last-Event-ID (header, atau ?last_event_id=) menerima
+    event setelah id tersebut dari ring di proses ini (monitor/sse.py), atau
+    snapshot lengkap jika id tidak ada di ring.
+
+    Hanya di ASGI: setiap koneksi adalah satu consumer (asyncio), bukan worker thread.
+    """
+
+    async def http_request(self, message):
+        """Seperti AsyncHttpConsumer, tetapi response tetap terbuka setelah handle() - update datang dari channel layer"""
+        if 'body' in message:
+            self.body.append(message['body'])
+        if not message.get('more_body'):
+            await self.handle(b''.join(self.body))
+
+    async def handle(self, body):
+        query = parse_qs(self.scope.get('query_string', b'').decode())
+        self.site_code = query.get('site', [None])[0] or None
+        self.seq = None  # seq of the last event sent
+        self.group = None
+
+        dashboard = await self.get_dashboard_payload()
+        if dashboard is False:
+            await self.send_response(
+                404, b'{"detail": "Site not found"}',
+                headers=[(b'Content-Type', b'application/json'), *sse.cors_headers(self.scope)],
+            )
+            raise StopConsumer()
+
+        # Join before the snapshot so no update falls in between (duplicates are skipped by seq)
+        if self.channel_layer is not None:
+            self.group = site_group(self.site_code) if self.site_code else ALL_GROUP
+            await self.channel_layer.group_add(self.group, self.channel_name)
+
+        await self.send_headers(headers=[
+            (b'Content-Type', b'text/event-stream'),
+            (b'Cache-Control', b'no-cache'),
+            # nginx: do not buffer this response
+            (b'X-Accel-Buffering', b'no'),
+            *sse.cors_headers(self.scope),
+        ])
+        frames = [f'retry: {sse.RETRY_MS}\n\n'.encode()]
+        headers = dict(self.scope.get('headers', []))
+        last_id = sse.parse_event_id(headers.get(b'last-event-id', b'').decode() or query.get('last_event_id', [None])[0])
+        replay = sse.ring.since(self.site_code, last_id) if last_id is not None else None
+        if replay is not None:
+            frames += [event_frame for _, event_frame in replay]
+            self.seq = replay[-1][0] if replay else last_id
+        if dashboard is not None and (self.seq is None or self.seq < dashboard.version):
+            frames.append(sse.frame(dashboard.version, message('latest_data', self.site_code, dashboard, seq=dashboard.version)))
+            self.seq = dashboard.version
+        await self.send_body(b''.join(frames), more_body=True)
+        sse.register(self)
+
+    async def disconnect(self):
+        sse.unregister(self)
+        if getattr(self, 'group', None) is not None:
+            await self.channel_layer.group_discard(self.group, self.channel_name)
+
+    async def rectifier_update(self, event):
+        """Teruskan frame update (di-encode sekali per proses lewat sse.ring)"""
+        seq = event.get('seq')
+        if seq is None:
+            await self.send_body(sse.frame(None, event['text']), more_body=True)
+            return
+        # Ring first, so resume works for events this connection already had through the snapshot
+        body = sse.ring.add(event['site'], seq, event['text'])
+        if body is None or (self.seq is not None and seq <= self.seq):
+            return
+        self.seq = seq
+        await self.send_body(body, more_body=True)
+
+    @database_sync_to_async
+    def get_dashboard_payload(self):
+        """DashboardPayload dari cache (None jika belum ada data), False untuk site yang tidak dikenal"""
+        if self.site_code and site_cache.get(self.site_code) is None:
+            return False
+        return get_dashboard(self.site_code)
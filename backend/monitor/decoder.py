@@ -0,0 +1,164 @@
+"""
+Decoder payload MQTT -> RectifierData
+
+FIELD_SPEC adalah satu-satunya mapping antara key payload MQTT dan field
+model. Dari spec ini dibuat (sekali, saat import) fungsi decode_row() yang
+mengubah payload menjadi tuple dengan urutan concrete fields model dalam
+satu pass, sehingga RectifierData(*row) bisa memakai jalur positional
+__init__ yang murah. Atribut site dipetakan oleh monitor.sites (SITE_SPEC).
+"""
+import json
+from collections import namedtuple
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from .models import RectifierData
+from .sites import SITE_SPEC, site_cache, site_code_from_payload, site_code_from_topic
+
+try:
+    import orjson
+except ImportError:  # Optional - faster JSON parser
+    orjson = None
+
+# orjson.JSONDecodeError is a subclass of json.JSONDecodeError
+JSONDecodeError = json.JSONDecodeError
+
+Field = namedtuple('Field', ['name', 'key', 'coerce', 'default'])
+
+FIELD_SPEC = (
+    Field('timestamp', 'ts', int, 0),
+
+    # Site Status (static site attributes live in Site, see SITE_SPEC)
+    Field('status_realtime', 'status_realtime', str, 'Normal'),
+    Field('status_ladder', 'status_ladder', str, 'Normal'),
+
+    # Environment
+    Field('door_cabinet', 'door_cabinet', str, 'Close'),
+    Field('battery_stolen', 'battery_stolen', str, 'Close'),
+    Field('temperature', 'temperature', float, 0.0),
+    Field('humidity', 'humidity', float, 0.0),
+
+    # Rectifier Status
+    Field('vac_input_l1', 'vac_input_l1', float, 0.0),
+    Field('vac_input_l2', 'vac_input_l2', float, 0.0),
+    Field('vac_input_l3', 'vac_input_l3', float, None),
+    Field('vdc_output', 'vdc_output', float, 0.0),
+    Field('battery_current', 'battery_current', float, 0.0),
+    Field('iac_input_l1', 'iac_input_l1', float, None),
+    Field('iac_input_l2', 'iac_input_l2', float, None),
+    Field('iac_input_l3', 'iac_input_l3', float, None),
+    Field('load_current', 'load_current', float, 0.0),
+    Field('load_power', 'load_power', float, 0.0),
+    Field('pac_load_l1', 'pac_load_l1', float, 0.0),
+    Field('pac_load_l2', 'pac_load_l2', float, 0.0),
+    Field('pac_load_l3', 'pac_load_l3', float, 0.0),
+    Field('rectifier_current', 'rectifier_current', float, 0.0),
+    Field('total_power', 'total_power', float, 0.0),
+
+    # Battery Banks
+    Field('battery_bank_1_voltage', 'battery_bank_1_voltage', float, 0.0),
+    Field('battery_bank_1_current', 'battery_bank_1_current', float, 0.0),
+    Field('battery_bank_1_soc', 'battery_bank_1_soc', float, 100.0),
+    Field('battery_bank_1_soh', 'battery_bank_1_soh', float, 100.0),
+
+    Field('battery_bank_2_voltage', 'battery_bank_2_voltage', float, 0.0),
+    Field('battery_bank_2_current', 'battery_bank_2_current', float, 0.0),
+    Field('battery_bank_2_soc', 'battery_bank_2_soc', float, 100.0),
+    Field('battery_bank_2_soh', 'battery_bank_2_soh', float, 100.0),
+
+    Field('battery_bank_3_voltage', 'battery_bank_3_voltage', float, 0.0),
+    Field('battery_bank_3_current', 'battery_bank_3_current', float, 0.0),
+    Field('battery_bank_3_soc', 'battery_bank_3_soc', float, 100.0),
+    Field('battery_bank_3_soh', 'battery_bank_3_soh', float, 100.0),
+
+    # Battery Status
+    Field('backup_duration', 'backup_duration', int, None),
+    Field('time_remaining', 'time_remaining', int, None),
+    Field('battery_status', 'battery_status', str, 'Standby'),
+    Field('start_backup', 'start_backup', str, 'No data'),
+    Field('soc_avg', 'soc_avg', float, 100.0),
+
+    # Modules Status
+    Field('modules_status', 'modules_status', None, []),
+)
+
+# Fields filled by the decoder itself instead of the payload
+GENERATED_FIELDS = {
+    'site': 'site_id',
+    'created_at': 'now()',
+}
+
+def compile_decoder(spec=FIELD_SPEC, model=RectifierData):
+    """
+    Buat fungsi decode_row(payload, site_id) dari field spec.
+
+    Fungsi yang dihasilkan mengembalikan tuple dengan urutan
+    model._meta.concrete_fields (primary key = None). Key yang tidak ada
+    atau bernilai null memakai default dari spec.
+    """
+    by_name = {field.name: field for field in spec}
+    namespace = {'now': timezone.now}
+    items = []
+    names = []
+
+    for model_field in model._meta.concrete_fields:
+        names.append(model_field.attname)
+        if model_field.primary_key:
+            items.append('None')
+            continue
+        if model_field.name in GENERATED_FIELDS:
+            items.append(GENERATED_FIELDS[model_field.name])
+            continue
+
+        field = by_name.pop(model_field.name, None)
+        if field is None:
+            raise ImproperlyConfigured(f"FIELD_SPEC has no entry for {model.__name__}.{model_field.name}")
+
+        if field.coerce is None:
+            value = 'v'
+        else:
+            coerce_name = f'_coerce_{model_field.name}'
+            namespace[coerce_name] = field.coerce
+            value = f'{coerce_name}(v)'
+        items.append(f'{value} if (v := get({field.key!r})) is not None else {field.default!r}')
+
+    if by_name:
+        raise ImproperlyConfigured(f"FIELD_SPEC entries without model field: {', '.join(by_name)}")
+
+    source = 'def decode_row(payload, site_id):\n    get = payload.get\n    return (\n'
+    source += ''.join(f'        {item},\n' for item in items)
+    source += '    )\n'
+    exec(compile(source, f'<decoder {model.__name__}>', 'exec'), namespace)
+
+    decode_row = namespace['decode_row']
+    decode_row.field_names = tuple(names)
+    return decode_row
+
+decode_row = compile_decoder()
+
+def loads(raw):
+    """Parse JSON payload (bytes/str), pakai orjson jika tersedia"""
+    if orjson is not None:
+        return orjson.loads(raw)
+    if isinstance(raw, (bytes, bytearray)):
+        raw = raw.decode()
+    return json.loads(raw)
+
+def build_record(payload, site_code=None):
+    """Buat RectifierData (belum disimpan) dari payload yang sudah di-parse"""
+    site = site_cache.resolve(site_code or site_code_from_payload(payload), payload)
+    record = RectifierData(*decode_row(payload, site.pk))
+    # Cache the Site on the record so later access doesn't query it
+    record.site = site
+    return record
+
+def decode_message(raw, topic=None):
+    """Parse payload MQTT mentah menjadi RectifierData (belum disimpan)"""
+    return build_record(loads(raw), site_code_from_topic(topic))
+
+def encode_payload(record):
+    """Kebalikan dari build_record: RectifierData -> payload MQTT (dict)"""
+    payload = {field.key: getattr(record, field.name) for field in FIELD_SPEC}
+    payload['site_id'] = record.site.code
+    for name, key, _ in SITE_SPEC:
+        payload[key] = getattr(record.site, name)
+    return payload
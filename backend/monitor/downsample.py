@@ -0,0 +1,112 @@
+"""
+Downsampling time series untuk chart (NumPy, vectorized)
+
+Input: timestamps (int64, urut naik) dan values (float64, shape (n, k)
+untuk k field; NaN untuk nilai null). Semua field berbagi timestamps yang
+sama sehingga response chart tetap {timestamps, field: [...]}.
+
+- minmax: data dibagi menjadi bucket dengan lebar waktu sama. Setiap bucket
+  menjadi dua titik (timestamp row pertama dan terakhir di bucket) berisi
+  min dan max setiap field, diurutkan sesuai urutan kemunculannya, sehingga
+  spike tidak hilang.
+- lttb: Largest-Triangle-Three-Buckets dengan bucket berjumlah row sama.
+  Luas segitiga dijumlahkan dari semua field (setiap field di-normalisasi
+  ke range 0..1) sehingga satu set titik mewakili semua series.
+"""
+import numpy as np
+
+MINMAX = 'minmax'
+LTTB = 'lttb'
+MODES = (MINMAX, LTTB)
+
+def downsample(timestamps, values, points, mode=MINMAX):
+    """Return (timestamps, values) dengan maksimal points titik"""
+    if mode not in MODES:
+        raise ValueError(f"Unknown downsampling mode '{mode}', expected one of {', '.join(MODES)}")
+    if len(timestamps) <= points:
+        return timestamps, values
+    if mode == LTTB:
+        return lttb(timestamps, values, points)
+    return minmax(timestamps, values, max(points // 2, 1))
+
+def minmax(timestamps, values, buckets):
+    """Min/max per bucket waktu, maksimal 2 * buckets titik"""
+    start = timestamps[0]
+    span = max(int(timestamps[-1] - start), 1)
+    bucket = np.minimum((timestamps - start) * buckets // span, buckets - 1)
+
+    # Rows are sorted, so every non-empty bucket is one contiguous run
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], len(timestamps)] - 1
+    counts = ends - starts + 1
+
+    mins = np.fmin.reduceat(values, starts, axis=0)
+    maxs = np.fmax.reduceat(values, starts, axis=0)
+
+    # First row index of the min and the max within each bucket
+    index = np.arange(len(timestamps))[:, None]
+    missing = len(timestamps)
+    first_min = np.minimum.reduceat(np.where(values == np.repeat(mins, counts, axis=0), index, missing), starts, axis=0)
+    first_max = np.minimum.reduceat(np.where(values == np.repeat(maxs, counts, axis=0), index, missing), starts, axis=0)
+    min_first = first_min <= first_max
+
+    out_ts = np.column_stack((timestamps[starts], timestamps[ends])).ravel()
+    out_values = np.empty((len(starts), 2, values.shape[1]))
+    out_values[:, 0] = np.where(min_first, mins, maxs)
+    out_values[:, 1] = np.where(min_first, maxs, mins)
+    out_values = out_values.reshape(-1, values.shape[1])
+
+    # A bucket with a single row becomes one point
+    keep = np.column_stack((np.ones(len(starts), dtype=bool), counts > 1)).ravel()
+    return out_ts[keep], out_values[keep]
+
+def lttb(timestamps, values, threshold):
+    """Largest-Triangle-Three-Buckets, tepat threshold titik (threshold >= 3)"""
+    n = len(timestamps)
+    threshold = max(int(threshold), 3)
+
+    x = timestamps.astype(np.float64)
+    low = np.fmin.reduce(values, axis=0)
+    scale = np.fmax.reduce(values, axis=0) - low
+    scale[~(scale > 0)] = 1.0
+    y = np.nan_to_num((values - low) / scale)
+
+    # Bucket boundaries for the points between the fixed first and last row
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i + 2 < threshold - 1:
+            next_lo, next_hi = edges[i + 1], edges[i + 2]
+            avg_x = x[next_lo:next_hi].mean()
+            avg_y = y[next_lo:next_hi].mean(axis=0)
+        else:
+            avg_x, avg_y = x[-1], y[-1]
+
+        # Twice the triangle area (a, candidate, next bucket average), summed over fields
+        area = np.abs(
+            (x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi, None]) * (avg_y - y[a])
+        ).sum(axis=1)
+        a = lo + int(area.argmax())
+        selected[i + 1] = a
+
+    return timestamps[selected], values[selected]
+
+def fetch_series(queryset, fields):
+    """values_list('timestamp', *fields) -> (timestamps int64, values float64 (n, k))"""
+    rows = list(queryset.values_list('timestamp', *fields))
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty((0, len(fields)))
+    # None becomes NaN; epoch milliseconds are exact in float64
+    array = np.array(rows, dtype=np.float64)
+    return array[:, 0].astype(np.int64), array[:, 1:]
+
+def to_json_list(array):
+    """Array NumPy -> list Python, NaN menjadi None"""
+    if array.dtype.kind == 'f':
+        return [None if value != value else value for value in array.tolist()]
+    return array.tolist()
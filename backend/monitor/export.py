@@ -0,0 +1,284 @@
+"""
+Export bulk RectifierData (CSV, NDJSON, Arrow IPC)
+
+Row database dibaca lewat server-side cursor di dalam transaction
+(PostgreSQL: named cursor tanpa WITH HOLD), CHUNK_SIZE row sekaligus,
+sehingga memori tetap konstan berapapun panjang range. Setiap chunk
+di-encode lalu dikirim lewat StreamingHttpResponse, opsional gzip.
+
+Di PostgreSQL setiap baris CSV / JSON dibentuk oleh database (satu kolom
+text per row), Python hanya menggabungkan dan mengirimnya; Arrow dibuat
+dari blok CSV tersebut dengan parser CSV pyarrow. Database lain memakai
+values_list().iterator() dan encoder Python (jauh lebih lambat untuk row
+dengan 40+ kolom).
+
+Hari yang sudah diarsip (monitor/archive.py) dikirim lebih dulu, lalu row
+dari database, keduanya urut (timestamp, id). Format dipilih lewat content
+negotiation DRF (?format=csv|ndjson|arrow atau header Accept), lihat RENDERERS.
+"""
+import csv
+import io
+import json
+import re
+import zlib
+from itertools import chain, islice
+from django.db import connections, router, transaction
+from rest_framework.renderers import BaseRenderer
+from . import archive
+from .models import RectifierData
+
+try:
+    import orjson
+except ImportError:  # Optional - faster NDJSON encoding
+    orjson = None
+
+try:
+    import pyarrow
+    import pyarrow.csv
+except ImportError:  # Optional - required for Arrow export only
+    pyarrow = None
+
+CHUNK_SIZE = 5000
+# Exports are throughput-bound; level 1 keeps most of the ratio on repetitive rows
+GZIP_LEVEL = 1
+
+# Same order as archive.FIELDS, with the site code in front
+COLUMNS = ['site'] + [field.name for field in archive.FIELDS]
+KINDS = {'site': 'CharField', **{field.name: field.get_internal_type() for field in archive.FIELDS}}
+DB_COLUMNS = {'site': 'site__code', **{field.name: field.attname for field in archive.FIELDS}}
+NUMERIC_TYPES = ('FloatField', *archive.INTEGER_TYPES)
+
+class ExportUnavailable(Exception):
+    """Format export tidak bisa dipakai (dependency opsional belum terinstall)"""
+
+# Renderers are only used for negotiation: the view streams the body itself
+# and error responses are rendered as JSON (RectifierDataViewSet.finalize_response)
+
+class ExportRenderer(BaseRenderer):
+    charset = None
+
+class CSVRenderer(ExportRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+class NDJSONRenderer(ExportRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+class ArrowRenderer(ExportRenderer):
+    media_type = 'application/vnd.apache.arrow.stream'
+    format = 'arrow'
+
+RENDERERS = [CSVRenderer, NDJSONRenderer, ArrowRenderer]
+EXTENSIONS = {'csv': 'csv', 'ndjson': 'ndjson', 'arrow': 'arrows'}
+
+def filename(site_code, fmt, gzip=False):
+    """Nama file untuk Content-Disposition"""
+    name = re.sub(r'[^\w.-]', '_', site_code or 'all')
+    return f"rectifier_{name}.{EXTENSIONS[fmt]}{'.gz' if gzip else ''}"
+
+def parse_columns(value):
+    """?fields=a,b,... -> list kolom (default semua), ValueError jika ada yang tidak dikenal"""
+    columns = [name for name in (value or '').split(',') if name] or list(COLUMNS)
+    unknown = [name for name in columns if name not in KINDS]
+    if unknown:
+        raise ValueError(f"Unknown export fields: {', '.join(unknown)}")
+    return columns
+
+# Row sources
+
+def database_chunks(queryset, columns, chunk_size=CHUNK_SIZE):
+    """List row tuple per chunk dari queryset, urut (timestamp, id)"""
+    rows = queryset.order_by('timestamp', 'id').values_list(*[DB_COLUMNS[name] for name in columns])
+    with transaction.atomic(using=queryset.db):
+        iterator = rows.iterator(chunk_size=chunk_size)
+        while True:
+            chunk = list(islice(iterator, chunk_size))
+            if not chunk:
+                break
+            yield chunk
+
+def line_sql(queryset, columns, fmt):
+    """
+    SELECT satu kolom text per row (baris CSV tanpa newline, atau objek JSON)
+    dari queryset, urut (timestamp, id). PostgreSQL saja
+    """
+    quote = connections[queryset.db].ops.quote_name
+    sql, params = queryset.order_by().values_list(
+        *[DB_COLUMNS[name] for name in columns], 'timestamp', 'id',
+    ).query.sql_with_params()
+    aliases = [quote(name) for name in columns]
+
+    def value(name, alias):
+        if KINDS[name] == 'DateTimeField':
+            # ISO 8601 like datetime.isoformat()
+            return f"""to_char(t.{alias} AT TIME ZONE 'UTC', 'YYYY-MM-DD"T"HH24:MI:SS.US"+00:00"')"""
+        return f't.{alias}'
+
+    if fmt == 'ndjson':
+        pairs = ', '.join(f"'{name}', {value(name, alias)}" for name, alias in zip(columns, aliases))
+        line = f'json_build_object({pairs})::text'
+    else:
+        values = []
+        for name, alias in zip(columns, aliases):
+            kind = KINDS[name]
+            if kind in NUMERIC_TYPES:
+                values.append(f"coalesce(t.{alias}::text, '')")
+            elif kind == 'DateTimeField':
+                values.append(f"coalesce({value(name, alias)}, '')")
+            else:
+                # Quote like csv.writer (QUOTE_MINIMAL)
+                text = f't.{alias}::text'
+                values.append(
+                    f"""coalesce(CASE WHEN {text} ~ '[",\\r\\n]' THEN '"' || replace({text}, '"', '""') || '"' ELSE {text} END, '')"""
+                )
+        line = f"concat_ws(',', {', '.join(values)})"
+
+    return (
+        f"SELECT {line} FROM ({sql}) AS t({', '.join(aliases)}, _timestamp, _id) ORDER BY t._timestamp, t._id",
+        params,
+    )
+
+def line_chunks(queryset, columns, fmt, chunk_size=CHUNK_SIZE):
+    """Blok bytes berisi chunk_size baris (CSV atau NDJSON) dari server-side cursor"""
+    sql, params = line_sql(queryset, columns, fmt)
+    # Inside a transaction the named cursor is not declared WITH HOLD,
+    # which would materialize the whole result before the first fetch
+    with transaction.atomic(using=queryset.db), connections[queryset.db].chunked_cursor() as cursor:
+        cursor.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield ('\n'.join([row[0] for row in rows]) + '\n').encode()
+
+def archive_chunks(columns, site_code=None, start=None, end=None):
+    """List row tuple per hari arsip, hanya kolom yang diminta"""
+    indexes = [COLUMNS.index(name) for name in columns]
+    for rows in archive.iter_days(site_code, start, end):
+        yield [tuple(row[index] for index in indexes) for row in rows]
+
+# Encoders: (columns, row chunks, pre-encoded line blocks) -> bytes per chunk
+
+def converters(columns, kinds):
+    """(index, kind) untuk kolom dengan kind tertentu"""
+    return [(index, KINDS[name]) for index, name in enumerate(columns) if KINDS[name] in kinds]
+
+def convert(chunk, convert_at, functions):
+    """Terapkan fungsi per kind ke kolom convert_at (chunk tanpa konversi dikembalikan apa adanya)"""
+    if not convert_at:
+        return chunk
+    converted = []
+    for row in chunk:
+        row = list(row)
+        for index, kind in convert_at:
+            if row[index] is not None:
+                row[index] = functions[kind](row[index])
+        converted.append(row)
+    return converted
+
+def encode_csv(columns, chunks, lines=()):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(columns)
+    convert_at = converters(columns, ('DateTimeField', 'JSONField'))
+    functions = {'DateTimeField': lambda value: value.isoformat(timespec='microseconds'), 'JSONField': json.dumps}
+    for chunk in chunks:
+        writer.writerows(convert(chunk, convert_at, functions))
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    # Header only when there are no rows
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+    yield from lines
+
+def encode_ndjson(columns, chunks, lines=()):
+    if orjson is not None:
+        # orjson handles datetime and nested JSON natively
+        for chunk in chunks:
+            yield b'\n'.join([orjson.dumps(dict(zip(columns, row))) for row in chunk]) + b'\n'
+    else:
+        convert_at = converters(columns, ('DateTimeField',))
+        functions = {'DateTimeField': lambda value: value.isoformat(timespec='microseconds')}
+        for chunk in chunks:
+            encoded = [json.dumps(dict(zip(columns, row))) for row in convert(chunk, convert_at, functions)]
+            yield ('\n'.join(encoded) + '\n').encode()
+    yield from lines
+
+def arrow_schema(columns):
+    types = {
+        'FloatField': pyarrow.float64(),
+        'DateTimeField': pyarrow.timestamp('us', tz='UTC'),
+        **dict.fromkeys(archive.INTEGER_TYPES, pyarrow.int64()),
+    }
+    # Strings and JSON (as text) for everything else
+    return pyarrow.schema([(name, types.get(KINDS[name], pyarrow.string())) for name in columns])
+
+class _Sink(io.RawIOBase):
+    """File-like untuk pyarrow yang menampung bytes sampai diambil dengan take()"""
+
+    def __init__(self):
+        self.parts = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def take(self):
+        data, self.parts = b''.join(self.parts), []
+        return data
+
+def encode_arrow(columns, chunks, lines=()):
+    """Arrow IPC streaming format, satu record batch per chunk (lines: blok CSV)"""
+    schema = arrow_schema(columns)
+    convert_at = converters(columns, ('JSONField',))
+    functions = {'JSONField': json.dumps}
+    read_options = pyarrow.csv.ReadOptions(column_names=columns)
+    parse_options = pyarrow.csv.ParseOptions(newlines_in_values=True)
+    convert_options = pyarrow.csv.ConvertOptions(
+        column_types=schema, strings_can_be_null=True, quoted_strings_can_be_null=False,
+    )
+    sink = _Sink()
+    with pyarrow.ipc.new_stream(sink, schema) as writer:
+        for chunk in chunks:
+            values = zip(*convert(chunk, convert_at, functions))
+            writer.write_batch(pyarrow.record_batch(
+                [pyarrow.array(column, type=field.type) for column, field in zip(values, schema)], schema=schema,
+            ))
+            yield sink.take()
+        for block in lines:
+            table = pyarrow.csv.read_csv(
+                io.BytesIO(block), read_options=read_options, parse_options=parse_options, convert_options=convert_options,
+            )
+            writer.write_table(table)
+            yield sink.take()
+    yield sink.take()
+
+ENCODERS = {'csv': encode_csv, 'ndjson': encode_ndjson, 'arrow': encode_arrow}
+
+def gzipped(chunks, level=GZIP_LEVEL):
+    """Kompres stream bytes menjadi satu member gzip"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def stream(fmt, queryset, columns, site_code=None, start=None, end=None, gzip=False, chunk_size=CHUNK_SIZE):
+    """Iterator bytes untuk StreamingHttpResponse, ExportUnavailable jika format tidak tersedia"""
+    if fmt == 'arrow' and pyarrow is None:
+        raise ExportUnavailable('Arrow export requires pyarrow')
+    queryset = queryset.using(router.db_for_read(RectifierData))
+    chunks = archive_chunks(columns, site_code, start, end)
+    if connections[queryset.db].vendor == 'postgresql':
+        # Arrow is parsed from CSV lines
+        lines = line_chunks(queryset, columns, 'ndjson' if fmt == 'ndjson' else 'csv', chunk_size)
+        content = ENCODERS[fmt](columns, chunks, lines)
+    else:
+        content = ENCODERS[fmt](columns, chain(chunks, database_chunks(queryset, columns, chunk_size)))
+    return gzipped(content) if gzip else content
@@ -0,0 +1,368 @@
+import logging
+import threading
+import time
+from collections import deque
+from django.conf import settings
+from django.db import close_old_connections, connection
+from .broadcast import broadcast_dashboards
+from .latest import update_latest
+from .models import RectifierData
+from .partitions import maintain_if_due
+from .rollups import update_rollups
+
+logger = logging.getLogger(__name__)
+
+class BatchWriter:
+    """
+    Buffer untuk data rectifier dari MQTT.
+    Data disimpan dengan bulk insert ketika buffer penuh (batch_size)
+    atau ketika deadline flush_interval sudah lewat. Redelivery QoS 1
+    (site + timestamp yang sudah ada) diabaikan dan dihitung.
+    """
+
+    def __init__(self, batch_size=500, flush_interval=0.25, on_error=None, on_flush=None):
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = flush_interval
+        self.on_error = on_error  # Called with the failed batch, e.g. Spool.append_records
+        self.on_flush = on_flush  # Called with the saved batch, e.g. records_saved
+
+        self._buffer = []
+        self._deadline = None
+        self._lock = threading.Lock()  # Protects _buffer, _deadline and counters
+        self._stop = threading.Event()
+        self._thread = None
+
+        # Counters
+        self.rows_written = 0
+        self.rows_duplicate = 0
+        self.rows_failed = 0
+        self.flush_count = 0
+        self.flush_seconds = 0.0
+        self.started_at = time.monotonic()
+
+    def start(self):
+        """Start thread yang melakukan flush berdasarkan deadline"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='batch-writer', daemon=True)
+            self._thread.start()
+        return self
+
+    def add(self, record):
+        """Tambahkan satu RectifierData (belum disimpan) ke buffer"""
+        with self._lock:
+            if not self._buffer:
+                self._deadline = time.monotonic() + self.flush_interval
+            self._buffer.append(record)
+            full = len(self._buffer) >= self.batch_size
+
+        if full:
+            self.flush()
+
+    def pending(self):
+        """Jumlah row yang masih ada di buffer"""
+        with self._lock:
+            return len(self._buffer)
+
+    def flush(self):
+        """Simpan semua row di buffer ke database, return jumlah row tersimpan"""
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+            self._deadline = None
+
+        return self.write(batch)
+
+    def write(self, batch):
+        """Simpan batch (list RectifierData) langsung, tanpa buffer, return jumlah row tersimpan"""
+        if not batch:
+            return 0
+
+        started = time.perf_counter()
+        try:
+            inserted = RectifierData.bulk_insert_ignore_duplicates(batch, batch_size=self.batch_size)
+        except Exception as e:
+            with self._lock:
+                self.rows_failed += len(batch)
+            logger.error(f"✗ Error saving batch of {len(batch)} rows: {e}")
+            # Drop broken connection so the next flush reconnects
+            close_old_connections()
+            if self.on_error is not None:
+                self.on_error(batch)
+            return 0
+
+        with self._lock:
+            self.flush_seconds += time.perf_counter() - started
+            self.flush_count += 1
+            self.rows_written += inserted
+            self.rows_duplicate += len(batch) - inserted
+
+        logger.debug(f"Flushed {inserted} rows to database ({len(batch) - inserted} duplicates skipped)")
+        if inserted and self.on_flush is not None:
+            try:
+                self.on_flush(batch)
+            except Exception as e:
+                logger.error(f"✗ Error in flush callback: {e}")
+        return inserted
+
+    def stats(self):
+        """Statistik throughput writer"""
+        elapsed = max(time.monotonic() - self.started_at, 1e-9)
+        return {
+            'rows_written': self.rows_written,
+            'rows_duplicate': self.rows_duplicate,
+            'rows_failed': self.rows_failed,
+            'rows_pending': self.pending(),
+            'flush_count': self.flush_count,
+            'rows_per_second': self.rows_written / elapsed,
+            'avg_flush_ms': (self.flush_seconds / self.flush_count * 1000) if self.flush_count else 0.0,
+        }
+
+    def log_stats(self):
+        stats = self.stats()
+        logger.info(
+            f"Writer stats - written: {stats['rows_written']} "
+            f"duplicates: {stats['rows_duplicate']} "
+            f"failed: {stats['rows_failed']} "
+            f"pending: {stats['rows_pending']} "
+            f"rate: {stats['rows_per_second']:.1f} rows/s "
+            f"avg flush: {stats['avg_flush_ms']:.1f} ms"
+        )
+
+    def close(self):
+        """Stop flush thread dan simpan sisa buffer"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                deadline = self._deadline
+            timeout = self.flush_interval if deadline is None else max(deadline - time.monotonic(), 0)
+
+            if self._stop.wait(timeout):
+                break
+
+            with self._lock:
+                due = self._deadline is not None and time.monotonic() >= self._deadline
+            if due:
+                self.flush()
+
+        # Each thread owns its own DB connection
+        connection.close()
+
+class IngestQueue:
+    """
+    Bounded queue antara callback MQTT (thread network paho) dan writer workers.
+    Callback hanya memanggil put(), decode + simpan + broadcast dijalankan
+    oleh worker threads sehingga database yang lambat tidak menahan keepalive.
+
+    Backpressure policy ketika queue penuh:
+    - block:       tunggu sampai ada slot (maksimal block_timeout detik, lalu drop item baru)
+    - drop-oldest: buang item paling lama, simpan item baru
+    - drop-newest: buang item baru
+    """
+    BLOCK = 'block'
+    DROP_OLDEST = 'drop-oldest'
+    DROP_NEWEST = 'drop-newest'
+    POLICIES = (BLOCK, DROP_OLDEST, DROP_NEWEST)
+
+    def __init__(self, handler, maxsize=10000, workers=2, policy=BLOCK, block_timeout=None, on_drop=None):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown queue policy '{policy}', expected one of {', '.join(self.POLICIES)}")
+
+        self.handler = handler
+        self.maxsize = max(1, int(maxsize))
+        self.worker_count = max(1, int(workers))
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.on_drop = on_drop  # Called with every dropped item, e.g. Spool.append
+
+        self._items = deque()
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._closing = False
+        self._workers = []
+
+        # Counters
+        self.enqueued = 0
+        self.processed = 0
+        self.errors = 0
+        self.dropped_oldest = 0
+        self.dropped_newest = 0
+        self.max_depth = 0
+
+    def start(self):
+        """Start worker threads"""
+        if not self._workers:
+            for i in range(self.worker_count):
+                worker = threading.Thread(target=self._run, name=f'ingest-worker-{i + 1}', daemon=True)
+                worker.start()
+                self._workers.append(worker)
+        return self
+
+    def put(self, item):
+        """Masukkan item ke queue, return False jika item di-drop"""
+        dropped = self._put(item)
+        if dropped is not None and self.on_drop is not None:
+            self.on_drop(dropped)
+        return dropped is not item
+
+    def _put(self, item):
+        """Return item yang di-drop (item baru atau item paling lama), atau None"""
+        with self._lock:
+            if self._closing:
+                self.dropped_newest += 1
+                return item
+
+            dropped = None
+            if len(self._items) >= self.maxsize:
+                if self.policy == self.DROP_NEWEST:
+                    self.dropped_newest += 1
+                    return item
+                if self.policy == self.DROP_OLDEST:
+                    dropped = self._items.popleft()
+                    self.dropped_oldest += 1
+                else:
+                    has_slot = self._not_full.wait_for(
+                        lambda: len(self._items) < self.maxsize or self._closing,
+                        timeout=self.block_timeout,
+                    )
+                    if not has_slot or self._closing:
+                        self.dropped_newest += 1
+                        return item
+
+            self._items.append(item)
+            self.enqueued += 1
+            if len(self._items) > self.max_depth:
+                self.max_depth = len(self._items)
+            self._not_empty.notify()
+            return dropped
+
+    def depth(self):
+        """Jumlah item yang menunggu di queue"""
+        with self._lock:
+            return len(self._items)
+
+    def stats(self):
+        """Statistik queue"""
+        with self._lock:
+            return {
+                'depth': len(self._items),
+                'max_depth': self.max_depth,
+                'maxsize': self.maxsize,
+                'policy': self.policy,
+                'enqueued': self.enqueued,
+                'processed': self.processed,
+                'errors': self.errors,
+                'dropped_oldest': self.dropped_oldest,
+                'dropped_newest': self.dropped_newest,
+            }
+
+    def log_stats(self):
+        stats = self.stats()
+        logger.info(
+            f"Queue stats - depth: {stats['depth']}/{stats['maxsize']} "
+            f"max: {stats['max_depth']} "
+            f"processed: {stats['processed']} "
+            f"errors: {stats['errors']} "
+            f"dropped: {stats['dropped_oldest'] + stats['dropped_newest']} ({stats['policy']})"
+        )
+
+    def close(self, timeout=None):
+        """Stop menerima item baru, proses sisa queue lalu stop workers"""
+        with self._lock:
+            self._closing = True
+            self._not_empty.notify_all()
+            self._not_full.notify_all()
+
+        for worker in self._workers:
+            worker.join(timeout)
+        self._workers = []
+
+    def _run(self):
+        while True:
+            with self._lock:
+                self._not_empty.wait_for(lambda: self._items or self._closing)
+                if not self._items:
+                    break
+                item = self._items.popleft()
+                self._not_full.notify()
+
+            try:
+                self.handler(item)
+            except Exception as e:
+                with self._lock:
+                    self.errors += 1
+                logger.error(f"✗ Error processing queued message: {e}")
+            else:
+                with self._lock:
+                    self.processed += 1
+
+        # Each thread owns its own DB connection
+        connection.close()
+
+class StatsReporter:
+    """Thread yang secara periodik memanggil log_stats() dari setiap komponen"""
+
+    def __init__(self, interval, *components):
+        self.interval = interval
+        self.components = components
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self.interval and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='ingest-stats', daemon=True)
+            self._thread.start()
+        return self
+
+    def log_stats(self):
+        for component in self.components:
+            component.log_stats()
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.log_stats()
+
+def records_saved(records):
+    """Dipanggil setelah batch tersimpan: update cache state terbaru, broadcast WebSocket lalu rollup"""
+    try:
+        broadcast_dashboards(update_latest(records))
+    except Exception as e:
+        # Rows are committed - rollups must not depend on the cache or the channel layer
+        logger.error(f"✗ Error updating latest state: {e}")
+    update_aggregates(records)
+
+def update_aggregates(records):
+    """Rollup dan maintenance partisi untuk batch yang tersimpan (setelah broadcast)"""
+    update_rollups(records)
+    maintain_if_due()
+
+def create_batch_writer(on_error=None, on_flush=None):
+    """BatchWriter dengan konfigurasi dari settings"""
+    return BatchWriter(
+        batch_size=getattr(settings, 'MQTT_BATCH_SIZE', 500),
+        flush_interval=getattr(settings, 'MQTT_BATCH_INTERVAL_MS', 250) / 1000,
+        on_error=on_error,
+        on_flush=on_flush,
+    )
+
+def create_ingest_queue(handler, on_drop=None):
+    """IngestQueue dengan konfigurasi dari settings"""
+    return IngestQueue(
+        handler,
+        on_drop=on_drop,
+        maxsize=getattr(settings, 'MQTT_QUEUE_SIZE', 10000),
+        workers=getattr(settings, 'MQTT_WRITER_WORKERS', 2),
+        policy=getattr(settings, 'MQTT_QUEUE_POLICY', IngestQueue.BLOCK),
+        block_timeout=getattr(settings, 'MQTT_QUEUE_BLOCK_TIMEOUT', 5.0),
+    )
@@ -0,0 +1,292 @@
+"""
+Cache state terbaru per site
+
+Ingestion (BatchWriter.on_flush dan replay spool) menyimpan row terbaru
+setiap site ke cache Django (Redis di production, locmem di development)
+sehingga endpoint latest/dashboard dan WebSocket tidak perlu query database.
+Cache hanya ditimpa oleh row dengan timestamp yang lebih baru, jadi data
+yang datang terlambat (misalnya replay spool) tidak menimpa state terbaru.
+Di Redis compare-and-set ini atomic (Lua script, window lewat WATCH/MULTI)
+karena listener dan proses ASGI menulis ke cache yang sama; cache lain
+(locmem) hanya dipakai satu proses sehingga cukup dengan lock.
+Jika cache kosong (cold start) data diambil dari database lalu disimpan.
+
+Bersamaan dengan row terbaru, JSON dashboard untuk row tersebut di-render
+sekali (DashboardPayload: version = timestamp row, body = bytes JSON)
+sehingga endpoint dashboard tidak menjalankan serializer per request.
+Version (timestamp row terbaru) juga disimpan sendiri sebagai integer kecil
+untuk validasi ETag / Last-Modified tanpa membaca row dari cache.
+
+Untuk initial state WebSocket, WS_HISTORY_POINTS titik terakhir setiap site
+(WINDOW_FIELDS) disimpan sebagai window format kolumnar yang sudah di-encode
+(monitor/columnar.py). Ingestion hanya menambah row ke window yang sudah ada
+di cache; window yang belum ada dibuat dari database saat pertama dibaca,
+jadi reconnect banyak client sekaligus tidak menjalankan query per koneksi.
+"""
+import logging
+import threading
+from collections import defaultdict, namedtuple
+import numpy as np
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.redis import RedisCache
+from rest_framework.renderers import JSONRenderer
+from . import columnar, downsample
+from .models import RectifierData
+from .serializers import DashboardDataSerializer
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'rectifier:latest:'
+DASHBOARD_PREFIX = 'rectifier:dashboard:'
+VERSION_PREFIX = 'rectifier:version:'
+WINDOW_PREFIX = 'rectifier:window:'
+ALL_SITES = '__all__'  # Newest row over all sites (no ?site= filter)
+
+# Series in the WebSocket history window (the chart_data defaults)
+WINDOW_FIELDS = ('vdc_output', 'load_current', 'temperature', 'humidity')
+
+DashboardPayload = namedtuple('DashboardPayload', ['version', 'body'])
+WindowPayload = namedtuple('WindowPayload', ['rows', 'body'])
+
+renderer = JSONRenderer()
+
+_lock = threading.Lock()  # Serializes read-compare-write between writer threads
+
+# KEYS / ARGV per site: version key / timestamp, row key / row, dashboard key / dashboard.
+# Writes a site only if its timestamp is newer than the cached version, returns
+# the index of the version key of every written site.
+COMPARE_AND_SET = """
+local written = {}
+for i = 1, #KEYS, 3 do
+    local current = tonumber(redis.call('GET', KEYS[i])) or -1
+    if tonumber(ARGV[i]) > current then
+        redis.call('SET', KEYS[i], ARGV[i])
+        redis.call('SET', KEYS[i + 1], ARGV[i + 1])
+        redis.call('SET', KEYS[i + 2], ARGV[i + 2])
+        table.insert(written, i)
+    end
+end
+return written
+"""
+
+def is_redis():
+    """True jika cache default adalah RedisCache (cache sendiri hanya proxy ke backend)"""
+    return isinstance(caches[DEFAULT_CACHE_ALIAS], RedisCache)
+
+def cache_key(site_code=None):
+    return KEY_PREFIX + (site_code or ALL_SITES)
+
+def dashboard_key(site_code=None):
+    return DASHBOARD_PREFIX + (site_code or ALL_SITES)
+
+def version_key(site_code=None):
+    return VERSION_PREFIX + (site_code or ALL_SITES)
+
+def window_key(site_code=None):
+    return WINDOW_PREFIX + (site_code or ALL_SITES)
+
+def window_points():
+    return getattr(settings, 'WS_HISTORY_POINTS', 300)
+
+def render_dashboard(record):
+    """Render JSON dashboard (bytes, sama dengan response DRF) untuk satu row"""
+    return DashboardPayload(record.timestamp, renderer.render(DashboardDataSerializer(record).data))
+
+def newest_per_site(records):
+    """Row dengan timestamp terbesar per site code dari records yang tersimpan"""
+    newest = {}
+    for record in records:
+        if record.pk is None:
+            # Duplicate skipped by the database
+            continue
+        current = newest.get(record.site.code)
+        if current is None or record.timestamp > current.timestamp:
+            newest[record.site.code] = record
+    return newest
+
+def update_latest(records):
+    """
+    Update cache dengan row terbaru per site (hanya jika lebih baru dari cache),
+    return {site code (None = semua site): DashboardPayload} yang berubah
+    """
+    newest = newest_per_site(records)
+    if not newest:
+        return {}
+
+    overall = max(newest.values(), key=lambda record: record.timestamp)
+    candidates = {code: record for code, record in newest.items()}
+    candidates[None] = overall
+
+    with _lock:
+        # Skips rendering rows that are already older, compare_and_set decides
+        cached = cache.get_many([version_key(code) for code in candidates])
+        changed = [
+            code for code, record in candidates.items()
+            if record.timestamp > cached.get(version_key(code), -1)
+        ]
+        rendered = {}
+        if changed:
+            entries = {}
+            for code in changed:
+                record = candidates[code]
+                # The overall entry is usually one of the per-site rows - render it once
+                if id(record) not in rendered:
+                    rendered[id(record)] = render_dashboard(record)
+                entries[code] = (record, rendered[id(record)])
+            changed = compare_and_set(entries)
+        update_windows(records)
+
+    logger.debug(f"Latest cache updated for {len(changed)} sites")
+    return {code: rendered[id(candidates[code])] for code in changed}
+
+def compare_and_set(entries):
+    """
+    Tulis row, dashboard dan version untuk {site code: (record, DashboardPayload)}
+    hanya jika timestamp lebih baru dari version di cache, return site codes yang ditulis
+    """
+    if is_redis():
+        client = cache._cache.get_client(write=True)
+        dumps = cache._cache._serializer.dumps
+        codes, keys, args = [], [], []
+        for code, (record, payload) in entries.items():
+            codes.append(code)
+            keys += [cache.make_and_validate_key(key) for key in (version_key(code), cache_key(code), dashboard_key(code))]
+            args += [record.timestamp, dumps(record), dumps(payload)]
+        written = client.register_script(COMPARE_AND_SET)(keys=keys, args=args)
+        return [codes[(index - 1) // 3] for index in written]
+
+    # Cache of this process only, callers hold _lock
+    cached = cache.get_many([version_key(code) for code in entries])
+    written = [
+        code for code, (record, _) in entries.items()
+        if record.timestamp > cached.get(version_key(code), -1)
+    ]
+    updates = {}
+    for code in written:
+        record, payload = entries[code]
+        updates[cache_key(code)] = record
+        updates[dashboard_key(code)] = payload
+        updates[version_key(code)] = record.timestamp
+    cache.set_many(updates, timeout=None)
+    return written
+
+def get_latest(site_code=None):
+    """Row terbaru (semua site atau satu site) dari cache, fallback ke database"""
+    key = cache_key(site_code)
+    record = cache.get(key)
+    if record is not None:
+        return record
+
+    queryset = RectifierData.objects.select_related('site')
+    if site_code:
+        queryset = queryset.filter(site__code=site_code)
+    record = queryset.first()
+    if record is not None:
+        # add() never overwrites a newer row cached by ingestion in the meantime
+        cache.add(key, record, timeout=None)
+        cache.add(version_key(site_code), record.timestamp, timeout=None)
+    return record
+
+def get_dashboard(site_code=None):
+    """DashboardPayload yang sudah di-render (semua site atau satu site), None jika belum ada data"""
+    key = dashboard_key(site_code)
+    payload = cache.get(key)
+    if payload is not None:
+        return payload
+
+    record = get_latest(site_code)
+    if record is None:
+        return None
+    payload = render_dashboard(record)
+    cache.add(key, payload, timeout=None)
+    return payload
+
+def get_version(site_code=None):
+    """Timestamp row terbaru (semua site atau satu site), None jika belum ada data"""
+    version = cache.get(version_key(site_code))
+    if version is not None:
+        return version
+
+    record = get_latest(site_code)
+    return record.timestamp if record is not None else None
+
+def render_window(timestamps, values):
+    """WindowPayload (timestamps int64 + float32 per WINDOW_FIELDS) dari array urut timestamp"""
+    return WindowPayload(len(timestamps), columnar.encode(columnar.chart_table(timestamps, WINDOW_FIELDS, values)))
+
+def window_arrays(payload):
+    """WindowPayload -> (timestamps, values (n, k))"""
+    _, columns = columnar.decode(payload.body)
+    return columns['timestamps'], np.column_stack([columns[name] for name in WINDOW_FIELDS])
+
+def update_windows(records):
+    """Tambahkan row tersimpan ke window yang sudah ada di cache (dipanggil dari update_latest)"""
+    points = window_points()
+    if points <= 0:
+        return
+
+    groups = defaultdict(list)
+    for record in records:
+        if record.pk is not None:
+            groups[record.site.code].append(record)
+            groups[None].append(record)
+    if not groups:
+        return
+
+    if is_redis():
+        # Optimistic transaction: retried if another process changed a window meanwhile
+        serializer = cache._cache._serializer
+        keys = {window_key(code): cache.make_and_validate_key(window_key(code)) for code in groups}
+
+        def merge(pipe):
+            values = pipe.mget(list(keys.values()))
+            cached = {key: serializer.loads(value) for key, value in zip(keys, values) if value is not None}
+            updates = merge_windows(groups, cached, points)
+            pipe.multi()
+            if updates:
+                pipe.mset({keys[key]: serializer.dumps(payload) for key, payload in updates.items()})
+
+        cache._cache.get_client(write=True).transaction(merge, *keys.values())
+        return
+
+    updates = merge_windows(groups, cache.get_many([window_key(code) for code in groups]), points)
+    if updates:
+        cache.set_many(updates, timeout=None)
+
+def merge_windows(groups, cached, points):
+    """Window baru {window key: WindowPayload} dari {site code: rows} dan window yang ada di cache"""
+    updates = {}
+    for code, rows in groups.items():
+        payload = cached.get(window_key(code))
+        if payload is None:
+            # Built from the database on first read, which already has these rows
+            continue
+        timestamps, values = window_arrays(payload)
+        timestamps = np.concatenate([timestamps, np.array([record.timestamp for record in rows], dtype=np.int64)])
+        # None becomes NaN
+        values = np.concatenate([values, np.array(
+            [[getattr(record, name) for name in WINDOW_FIELDS] for record in rows], dtype=np.float64,
+        )])
+        # Late rows (spool replay) are sorted in or fall out of the window
+        order = np.argsort(timestamps, kind='stable')[-points:]
+        updates[window_key(code)] = render_window(timestamps[order], values[order])
+    return updates
+
+def get_window(site_code=None):
+    """WindowPayload WS_HISTORY_POINTS titik terakhir (semua site atau satu site), None jika dimatikan"""
+    points = window_points()
+    if points <= 0:
+        return None
+    key = window_key(site_code)
+    payload = cache.get(key)
+    if payload is not None:
+        return payload
+
+    queryset = RectifierData.objects.all()
+    if site_code:
+        queryset = queryset.filter(site__code=site_code)
+    timestamps, values = downsample.fetch_series(queryset.order_by('-timestamp')[:points], WINDOW_FIELDS)
+    payload = render_window(timestamps[::-1], values[::-1])
+    cache.add(key, payload, timeout=None)
+    return payload
@@ -0,0 +1,52 @@
+"""
+ASGI lifespan: start / stop service yang berjalan di event loop server
+
+MQTT ingestion (monitor/mqtt_service.py) dimulai saat lifespan.startup jika
+MQTT_ASGI_INGEST aktif dan di-stop saat lifespan.shutdown (sisa queue
+disimpan). Server tanpa lifespan (daphne, termasuk manage.py runserver)
+memulainya pada request / koneksi pertama.
+"""
+import logging
+from django.conf import settings
+from .mqtt_service import start_mqtt_service, stop_mqtt_service
+
+logger = logging.getLogger(__name__)
+
+class LifespanApp:
+    """Bungkus aplikasi ASGI: tangani scope lifespan, scope lain diteruskan"""
+
+    def __init__(self, application):
+        self.application = application
+        self.started = False
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if not self.started:
+            await self.startup()
+        return await self.application(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    await self.startup()
+                except Exception as e:
+                    logger.error(f"✗ Startup failed: {e}")
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def startup(self):
+        # Set before awaiting: concurrent first requests start the service once
+        self.started = True
+        if getattr(settings, 'MQTT_ASGI_INGEST', False):
+            await start_mqtt_service()
+
+    async def shutdown(self):
+        await stop_mqtt_service()
@@ -0,0 +1,88 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from monitor import partitions
+from monitor.archive import DAY, FIELDS, archive_day, day_name
+from monitor.models import RectifierData, Site
+
+class Command(BaseCommand):
+    help = (
+        "Retention: pindahkan RectifierData yang lebih tua dari --days (default RETENTION_DAYS) ke "
+        "arsip .npz terkompresi per site per hari di ARCHIVE_DIR, lalu hapus dari database dalam "
+        "batch kecil. Hanya hari UTC yang sudah lengkap yang diarsip. Aman dijalankan ulang (mis. "
+        "dari cron); jangan jalankan dua proses sekaligus karena manifest ditulis ulang. Jika table "
+        "sudah dipartisi (partition_rectifierdata) dan tanpa --site, partisi yang seluruhnya lebih tua "
+        "dari cutoff di-DROP setelah diarsip, bukan DELETE per batch."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.RETENTION_DAYS, help='Umur data yang disimpan di database (hari)')
+        parser.add_argument('--site', action='append', help='Site code (boleh berulang), default semua site')
+        parser.add_argument('--batch-size', type=int, default=settings.RETENTION_DELETE_BATCH, help='Row per DELETE')
+        parser.add_argument('--sleep', type=float, default=0.0, help='Jeda (detik) antar DELETE batch')
+        parser.add_argument('--dry-run', action='store_true', help='Hanya tampilkan hari yang akan diarsip')
+
+    def handle(self, *args, **options):
+        if options['days'] < 1:
+            raise CommandError('--days must be at least 1')
+        batch_size = max(1, options['batch_size'])
+
+        # Only whole UTC days older than the retention age
+        cutoff = (int(time.time() * 1000) - options['days'] * DAY) // DAY * DAY
+        sites = Site.objects.all()
+        if options['site']:
+            sites = sites.filter(code__in=options['site'])
+
+        # Whole partitions below the cutoff are dropped instead of deleted row by row
+        dropped_ranges = []
+        if not options['site'] and partitions.is_partitioned():
+            dropped_ranges = [(start, end) for _, start, end in partitions.list_partitions() if end <= cutoff]
+
+        started = time.monotonic()
+        total_rows = total_days = 0
+        attnames = [field.attname for field in FIELDS]
+        for site in sites:
+            rows = RectifierData.objects.filter(site=site)
+            first = rows.filter(timestamp__lt=cutoff).aggregate(first=Min('timestamp'))['first']
+            if first is None:
+                continue
+
+            for day in range(first // DAY * DAY, cutoff, DAY):
+                day_rows = list(
+                    rows.filter(timestamp__gte=day, timestamp__lt=day + DAY)
+                    .order_by('timestamp', 'id').values_list(*attnames)
+                )
+                if not day_rows:
+                    continue
+                if options['dry_run']:
+                    self.stdout.write(f"{site.code} {day_name(day)}: {len(day_rows)} rows")
+                    continue
+
+                # File and manifest first, so an interrupted run loses nothing
+                entry = archive_day(site, day, day_rows)
+                ids = [] if any(start <= day < end for start, end in dropped_ranges) else [row[0] for row in day_rows]
+                for start in range(0, len(ids), batch_size):
+                    # Autocommit per batch: short transactions, locks released quickly
+                    RectifierData.objects.filter(pk__in=ids[start:start + batch_size]).delete()
+                    if options['sleep']:
+                        time.sleep(options['sleep'])
+
+                total_rows += len(day_rows)
+                total_days += 1
+                self.stdout.write(
+                    f"{site.code} {day_name(day)}: {len(day_rows)} rows -> {entry['file']} ({entry['bytes'] / 1024:.0f} KiB)"
+                )
+
+        if options['dry_run']:
+            for start, end in dropped_ranges:
+                self.stdout.write(f"would drop partition {partitions.partition_name(start)}")
+            return
+        if dropped_ranges:
+            # Every site-day below the cutoff is archived at this point
+            for name, _, _ in partitions.drop_partitions_before(dropped_ranges[-1][1]):
+                self.stdout.write(f"Dropped partition {name}")
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ Archived {total_rows} rows in {total_days} site-days older than {day_name(cutoff)} "
+            f"in {time.monotonic() - started:.1f}s"
+        ))
@@ -0,0 +1,67 @@
+import time
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from monitor.downsample import fetch_series
+from monitor.models import ROLLUP_FIELDS, RectifierData, Site
+from monitor.rollups import RESOLUTIONS, aggregate, upsert
+from monitor.timeutils import parse_time
+
+DAY = RESOLUTIONS['1d']
+
+class Command(BaseCommand):
+    help = (
+        "Isi ulang RectifierRollup (1m/1h/1d) dari data mentah RectifierData, per site per hari. "
+        "Bucket yang dibangun ulang ditimpa, jadi command aman dijalankan berulang. --from dan --to "
+        "dibulatkan ke hari UTC penuh supaya bucket 1h/1d tidak ditimpa dengan sebagian data. Bucket yang "
+        "sedang diisi ingestion bisa tertimpa snapshot lama - jalankan ulang untuk hari terakhir "
+        "(--from) setelah ingestion berjalan, atau saat ingestion berhenti."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--site', action='append', help='Site code (boleh berulang), default semua site')
+        parser.add_argument('--from', dest='start', help='Mulai (epoch ms atau ISO 8601), dibulatkan ke awal hari UTC')
+        parser.add_argument('--to', dest='end', help='Sampai (epoch ms atau ISO 8601, inklusif), dibulatkan ke akhir hari UTC')
+
+    def handle(self, *args, **options):
+        try:
+            start = parse_time(options['start']) // DAY * DAY if options['start'] else None
+            # Whole days only: the 1d bucket of the last day is replaced, not merged
+            end = (parse_time(options['end']) // DAY + 1) * DAY - 1 if options['end'] else None
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        sites = Site.objects.all()
+        if options['site']:
+            sites = sites.filter(code__in=options['site'])
+
+        started = time.monotonic()
+        total_rows = total_buckets = 0
+        for site in sites:
+            rows = RectifierData.objects.filter(site=site)
+            bounds = rows.aggregate(first=Min('timestamp'), last=Max('timestamp'))
+            if bounds['first'] is None:
+                continue
+            first = max(bounds['first'] // DAY * DAY, start if start is not None else 0)
+            last = min(bounds['last'], end) if end is not None else bounds['last']
+
+            site_rows = site_buckets = 0
+            for day in range(first, last + 1, DAY):
+                day_rows = rows.filter(timestamp__gte=day, timestamp__lt=min(day + DAY, last + 1)).order_by('timestamp')
+                timestamps, values = fetch_series(day_rows, ROLLUP_FIELDS)
+                if not len(timestamps):
+                    continue
+                site_ids = np.full(len(timestamps), site.pk, dtype=np.int64)
+                site_buckets += upsert({
+                    resolution: aggregate(site_ids, timestamps, values, width)
+                    for resolution, width in RESOLUTIONS.items()
+                }, merge=False)
+                site_rows += len(timestamps)
+
+            total_rows += site_rows
+            total_buckets += site_buckets
+            self.stdout.write(f"{site.code}: {site_rows} rows -> {site_buckets} buckets")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ Backfilled {total_buckets} rollup buckets from {total_rows} rows in {time.monotonic() - started:.1f}s"
+        ))
@@ -0,0 +1,50 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from monitor import partitions
+
+class Command(BaseCommand):
+    help = (
+        "Range partitioning RectifierData berdasarkan timestamp (PostgreSQL). Tanpa opsi: buat "
+        "partisi ke depan (PARTITION_PREMAKE) dan pindahkan row dari partisi DEFAULT, cocok untuk "
+        "cron. --convert: ubah table biasa menjadi table partisi (lihat monitor/partitions.py); "
+        "--drop-legacy: hapus table lama setelah convert diverifikasi. --list: daftar partisi."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--convert', action='store_true', help='Ubah table menjadi table partisi')
+        parser.add_argument('--lock-timeout', default='10s', help='lock_timeout untuk langkah swap --convert')
+        parser.add_argument('--drop-legacy', action='store_true', help='Hapus table lama hasil --convert')
+        parser.add_argument('--list', action='store_true', help='Tampilkan partisi')
+
+    def handle(self, *args, **options):
+        connection = partitions.get_connection()
+        if connection.vendor != 'postgresql':
+            raise CommandError('Partitioning requires PostgreSQL (settings_production)')
+
+        if options['convert']:
+            started = time.monotonic()
+            try:
+                copied = partitions.convert(stdout=self.stdout, lock_timeout=options['lock_timeout'])
+            except RuntimeError as e:
+                raise CommandError(str(e))
+            self.stdout.write(self.style.SUCCESS(
+                f"✓ Converted {copied:,} rows in {time.monotonic() - started:.1f}s. "
+                f"Drop {partitions.legacy_name(partitions.table_name())} with --drop-legacy once verified"
+            ))
+            return
+
+        if options['drop_legacy']:
+            partitions.drop_legacy()
+            self.stdout.write(self.style.SUCCESS(f"✓ Dropped {partitions.legacy_name(partitions.table_name())}"))
+            return
+
+        if not partitions.is_partitioned(connection):
+            raise CommandError(f'{partitions.table_name()} is not partitioned, run with --convert first')
+
+        if options['list']:
+            for name, start, end in partitions.list_partitions(connection):
+                self.stdout.write(f"{name}: [{start}, {end})")
+            return
+
+        created = partitions.ensure_future_partitions(connection)
+        self.stdout.write(self.style.SUCCESS(f"✓ {len(created)} partitions created"))
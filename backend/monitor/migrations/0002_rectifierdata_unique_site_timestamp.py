@@ -0,0 +1,48 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:32
+
+from django.db import migrations, models, transaction
+from django.db.models import Exists, Max, OuterRef
+from monitor.operations import AddUniqueConstraintConcurrently
+
+# Rows per DELETE transaction while removing existing duplicates
+CLEANUP_CHUNK = 50000
+
+
+def delete_duplicates(apps, schema_editor):
+    """
+    Hapus row duplikat (site_name, timestamp), simpan row dengan id terkecil.
+    Table di-scan per range id dan setiap range di-commit sendiri sehingga
+    tidak ada lock panjang pada table yang besar.
+    """
+    RectifierData = apps.get_model('monitor', 'RectifierData')
+    db = schema_editor.connection.alias
+    rows = RectifierData.objects.using(db)
+
+    max_id = rows.aggregate(max_id=Max('id'))['max_id'] or 0
+    older = rows.filter(
+        site_name=OuterRef('site_name'),
+        timestamp=OuterRef('timestamp'),
+        id__lt=OuterRef('id'),
+    )
+
+    for start in range(0, max_id + 1, CLEANUP_CHUNK):
+        with transaction.atomic(using=db):
+            rows.filter(id__gte=start, id__lt=start + CLEANUP_CHUNK).filter(Exists(older)).delete()
+
+
+class Migration(migrations.Migration):
+
+    # Cleanup commits per chunk and CREATE INDEX CONCURRENTLY can't run in a transaction
+    atomic = False
+
+    dependencies = [
+        ('monitor', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicates, migrations.RunPython.noop),
+        AddUniqueConstraintConcurrently(
+            model_name='rectifierdata',
+            constraint=models.UniqueConstraint(fields=('site_name', 'timestamp'), name='unique_site_timestamp'),
+        ),
+    ]
@@ -0,0 +1,122 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:05
+
+from django.db import migrations, models, transaction
+from django.db.models import Max
+import django.db.models.deletion
+import django.utils.timezone
+from monitor.operations import AddUniqueConstraintConcurrently
+
+# Rows per UPDATE transaction while linking existing data to sites
+LINK_CHUNK = 50000
+
+SITE_FIELDS = ('site_name', 'project_id', 'ladder', 'sla', 'latitude', 'longitude')
+
+
+def create_sites(apps, schema_editor):
+    """
+    Buat satu Site untuk setiap site_name yang ada (atribut diambil dari row
+    terbaru), lalu isi RectifierData.site per range id. Setiap range di-commit
+    sendiri sehingga tidak ada lock panjang pada table yang besar.
+    """
+    Site = apps.get_model('monitor', 'Site')
+    RectifierData = apps.get_model('monitor', 'RectifierData')
+    db = schema_editor.connection.alias
+    rows = RectifierData.objects.using(db)
+
+    site_ids = {}
+    for site_name in rows.order_by().values_list('site_name', flat=True).distinct():
+        latest = rows.filter(site_name=site_name).order_by('-timestamp').values(*SITE_FIELDS).first()
+        site, _ = Site.objects.using(db).update_or_create(code=(site_name or 'default')[:100], defaults=latest)
+        site_ids[site_name] = site.id
+
+    max_id = rows.aggregate(max_id=Max('id'))['max_id'] or 0
+    for start in range(0, max_id + 1, LINK_CHUNK):
+        with transaction.atomic(using=db):
+            chunk = rows.filter(id__gte=start, id__lt=start + LINK_CHUNK, site__isnull=True)
+            for site_name, site_id in site_ids.items():
+                chunk.filter(site_name=site_name).update(site=site_id)
+
+
+def restore_site_columns(apps, schema_editor):
+    Site = apps.get_model('monitor', 'Site')
+    RectifierData = apps.get_model('monitor', 'RectifierData')
+    db = schema_editor.connection.alias
+
+    for site in Site.objects.using(db):
+        RectifierData.objects.using(db).filter(site=site).update(
+            **{field: getattr(site, field) for field in SITE_FIELDS}
+        )
+
+
+class Migration(migrations.Migration):
+
+    # Data is linked in committed chunks and CREATE INDEX CONCURRENTLY can't run in a transaction
+    atomic = False
+
+    dependencies = [
+        ('monitor', '0002_rectifierdata_unique_site_timestamp'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Site',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=100, unique=True)),
+                ('site_name', models.CharField(default='', max_length=255)),
+                ('project_id', models.CharField(default='', max_length=255)),
+                ('ladder', models.CharField(default='', max_length=100)),
+                ('sla', models.CharField(default='', max_length=100)),
+                ('latitude', models.FloatField(blank=True, null=True)),
+                ('longitude', models.FloatField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['code'],
+            },
+        ),
+        migrations.AddField(
+            model_name='rectifierdata',
+            name='site',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='data', to='monitor.site'),
+        ),
+        migrations.RemoveConstraint(
+            model_name='rectifierdata',
+            name='unique_site_timestamp',
+        ),
+        migrations.RunPython(create_sites, restore_site_columns),
+        migrations.RemoveField(
+            model_name='rectifierdata',
+            name='site_name',
+        ),
+        migrations.RemoveField(
+            model_name='rectifierdata',
+            name='project_id',
+        ),
+        migrations.RemoveField(
+            model_name='rectifierdata',
+            name='ladder',
+        ),
+        migrations.RemoveField(
+            model_name='rectifierdata',
+            name='sla',
+        ),
+        migrations.RemoveField(
+            model_name='rectifierdata',
+            name='latitude',
+        ),
+        migrations.RemoveField(
+            model_name='rectifierdata',
+            name='longitude',
+        ),
+        migrations.AlterField(
+            model_name='rectifierdata',
+            name='site',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='data', to='monitor.site'),
+        ),
+        AddUniqueConstraintConcurrently(
+            model_name='rectifierdata',
+            constraint=models.UniqueConstraint(fields=('site', 'timestamp'), name='unique_site_timestamp'),
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:50
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitor', '0003_site'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RectifierRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resolution', models.CharField(choices=[('1m', '1 minute'), ('1h', '1 hour'), ('1d', '1 day')], max_length=3)),
+                ('bucket', models.BigIntegerField()),
+                ('count', models.IntegerField(default=0)),
+                ('last_timestamp', models.BigIntegerField()),
+                ('vdc_output_min', models.FloatField(default=0)),
+                ('vdc_output_max', models.FloatField(default=0)),
+                ('vdc_output_sum', models.FloatField(default=0)),
+                ('vdc_output_last', models.FloatField(default=0)),
+                ('battery_current_min', models.FloatField(default=0)),
+                ('battery_current_max', models.FloatField(default=0)),
+                ('battery_current_sum', models.FloatField(default=0)),
+                ('battery_current_last', models.FloatField(default=0)),
+                ('load_current_min', models.FloatField(default=0)),
+                ('load_current_max', models.FloatField(default=0)),
+                ('load_current_sum', models.FloatField(default=0)),
+                ('load_current_last', models.FloatField(default=0)),
+                ('load_power_min', models.FloatField(default=0)),
+                ('load_power_max', models.FloatField(default=0)),
+                ('load_power_sum', models.FloatField(default=0)),
+                ('load_power_last', models.FloatField(default=0)),
+                ('rectifier_current_min', models.FloatField(default=0)),
+                ('rectifier_current_max', models.FloatField(default=0)),
+                ('rectifier_current_sum', models.FloatField(default=0)),
+                ('rectifier_current_last', models.FloatField(default=0)),
+                ('total_power_min', models.FloatField(default=0)),
+                ('total_power_max', models.FloatField(default=0)),
+                ('total_power_sum', models.FloatField(default=0)),
+                ('total_power_last', models.FloatField(default=0)),
+                ('temperature_min', models.FloatField(default=0)),
+                ('temperature_max', models.FloatField(default=0)),
+                ('temperature_sum', models.FloatField(default=0)),
+                ('temperature_last', models.FloatField(default=0)),
+                ('humidity_min', models.FloatField(default=0)),
+                ('humidity_max', models.FloatField(default=0)),
+                ('humidity_sum', models.FloatField(default=0)),
+                ('humidity_last', models.FloatField(default=0)),
+                ('soc_avg_min', models.FloatField(default=0)),
+                ('soc_avg_max', models.FloatField(default=0)),
+                ('soc_avg_sum', models.FloatField(default=0)),
+                ('soc_avg_last', models.FloatField(default=0)),
+                ('site', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='monitor.site')),
+            ],
+            options={
+                'ordering': ['-bucket'],
+                'indexes': [models.Index(fields=['resolution', '-bucket'], name='monitor_rec_resolut_c0839e_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='rectifierrollup',
+            constraint=models.UniqueConstraint(fields=('site', 'resolution', 'bucket'), name='unique_rollup_bucket'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:38
+
+from django.db import migrations, models
+from monitor.operations import AddBrinIndex, AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY can't run in a transaction
+    atomic = False
+
+    dependencies = [
+        ('monitor', '0004_rectifierrollup'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='rectifierdata',
+            index=models.Index(condition=models.Q(('status_realtime', 'Normal'), _negated=True), fields=['site', '-timestamp'], name='rectifier_alarm_status_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='rectifierdata',
+            index=models.Index(condition=models.Q(('door_cabinet', 'Open')), fields=['site', '-timestamp'], name='rectifier_alarm_door_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='rectifierdata',
+            index=models.Index(condition=models.Q(('battery_stolen', 'Open')), fields=['site', '-timestamp'], name='rectifier_alarm_battery_idx'),
+        ),
+        # created_at is append-only and only range-filtered: a BRIN index (a few pages,
+        # PostgreSQL only) replaces the b-tree that every insert had to maintain
+        AddBrinIndex(model_name='rectifierdata', name='rectifier_created_brin', column='created_at'),
+        migrations.RemoveIndex(
+            model_name='rectifierdata',
+            name='monitor_rec_created_9e0bf8_idx',
+        ),
+    ]
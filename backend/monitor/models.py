@@ -1,20 +1,44 @@
 from django.db import models
+from django.db.models import Q
 from django.utils import timezone
 
-class RectifierData(models.Model):
-    """Model untuk menyimpan data rectifier lengkap"""
-    timestamp = models.BigIntegerField()
+class Site(models.Model):
+    """Model untuk atribut statis site (satu row per rectifier)"""
+    # Site ID from the MQTT topic (rectifier/<code>/data) or the payload
+    code = models.CharField(max_length=100, unique=True)
     
-    # Site Info
     site_name = models.CharField(max_length=255, default='')
     project_id = models.CharField(max_length=255, default='')
     ladder = models.CharField(max_length=100, default='')
     sla = models.CharField(max_length=100, default='')
-    status_realtime = models.CharField(max_length=50, default='Normal')
-    status_ladder = models.CharField(max_length=50, default='Normal')
     latitude = models.FloatField(null=True, blank=True)
     longitude = models.FloatField(null=True, blank=True)
     
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['code']
+    
+    def __str__(self):
+        return f"{self.code} - {self.site_name}"
+
+# Abnormal states (GET /api/sites/alarms/), each backed by a partial index
+ALARM_CONDITIONS = {
+    'status': ~Q(status_realtime='Normal'),
+    'door': Q(door_cabinet='Open'),
+    'battery': Q(battery_stolen='Open'),
+}
+
+class RectifierData(models.Model):
+    """Model untuk menyimpan data rectifier lengkap"""
+    timestamp = models.BigIntegerField()
+    
+    # Site Info
+    site = models.ForeignKey(Site, on_delete=models.CASCADE, related_name='data')
+    status_realtime = models.CharField(max_length=50, default='Normal')
+    status_ladder = models.CharField(max_length=50, default='Normal')
+    
     # Environment Status
     door_cabinet = models.CharField(max_length=20, default='Close')
     battery_stolen = models.CharField(max_length=20, default='Close')
@@ -70,17 +94,86 @@ class RectifierData(models.Model):
         ordering = ['-timestamp']
         indexes = [
             models.Index(fields=['-timestamp']),
-            models.Index(fields=['-created_at']),
+            # created_at only gets range filters (admin), served by a BRIN index (migration 0005)
+            # Partial: only the few abnormal rows, newest per site first
+            *(
+                models.Index(fields=['site', '-timestamp'], condition=condition, name=f'rectifier_alarm_{name}_idx')
+                for name, condition in ALARM_CONDITIONS.items()
+            ),
+        ]
+        constraints = [
+            # MQTT QoS 1 redelivers messages after reconnects
+            models.UniqueConstraint(fields=['site', 'timestamp'], name='unique_site_timestamp'),
         ]
     
     def __str__(self):
-        return f"Rectifier Data - {self.site_name} - {self.timestamp}"
+        return f"Rectifier Data - {self.site.code} - {self.timestamp}"
     
     @classmethod
     def get_latest(cls, limit=1):
         """Ambil data terbaru"""
         return cls.objects.all()[:limit]
     
+    @classmethod
+    def bulk_insert_ignore_duplicates(cls, objs, batch_size=500):
+        """
+        Insert banyak row sekaligus, row dengan (site, timestamp) yang
+        sudah ada diabaikan oleh database (ON CONFLICT DO NOTHING / INSERT OR IGNORE).
+        Object yang benar-benar tersimpan mendapat pk, duplikat tetap pk=None.
+        Return jumlah row yang benar-benar tersimpan.
+
+        pk hanya diisi di database dengan INSERT ... RETURNING (PostgreSQL,
+        SQLite >= 3.35). Database lain hanya mendapat jumlah row: semua object
+        tetap pk=None, sehingga cache state terbaru dan rollup melewati batch
+        tersebut (isi rollup dengan backfill_rollups).
+        """
+        from django.db import connections, router, transaction
+        from django.db.models.constants import OnConflict
+        from django.db.models.sql import InsertQuery
+
+        if not objs:
+            return 0
+
+        db = router.db_for_write(cls)
+        connection = connections[db]
+        opts = cls._meta
+        fields = [f for f in opts.concrete_fields if not f.primary_key]
+        returning = [opts.pk, opts.get_field('site'), opts.get_field('timestamp')]
+        can_return = connection.features.can_return_rows_from_bulk_insert
+        batch_size = min(batch_size, connection.ops.bulk_batch_size(fields, objs) or batch_size)
+
+        inserted = 0
+        with transaction.atomic(using=db, savepoint=False), connection.cursor() as cursor:
+            for start in range(0, len(objs), batch_size):
+                batch = objs[start:start + batch_size]
+                query = InsertQuery(cls, on_conflict=OnConflict.IGNORE)
+                query.insert_values(fields, batch)
+                compiler = query.get_compiler(using=db)
+
+                if not can_return:
+                    # Count only: bulk_create() does not report how many rows were skipped, the cursor
+                    # does, but not which ones - a SELECT afterwards cannot tell new rows from the
+                    # rows they duplicate, so pk stays None
+                    for sql, params in compiler.as_sql():
+                        cursor.execute(sql, params)
+                        inserted += max(cursor.rowcount, 0)
+                    continue
+
+                # RETURNING only yields the inserted rows - match them back to set pk
+                compiler.returning_fields = returning
+                for sql, params in compiler.as_sql():
+                    cursor.execute(sql, params)
+                    rows = cursor.fetchall()
+                by_key = {(obj.site_id, obj.timestamp): obj for obj in batch}
+                for pk, site_id, timestamp in rows:
+                    obj = by_key.get((site_id, timestamp))
+                    if obj is not None:
+                        obj.pk = pk
+                        obj._state.adding = False
+                        obj._state.db = db
+                inserted += len(rows)
+        return inserted
+    
     @classmethod
     def get_stats(cls):
         """Ambil statistik data"""
@@ -94,3 +187,51 @@ class RectifierData(models.Model):
             avg_temperature=Avg('temperature'),
             avg_humidity=Avg('humidity'),
         )
+
+# Fields aggregated into RectifierRollup (count/min/max/sum/last per bucket)
+ROLLUP_FIELDS = (
+    'vdc_output',
+    'battery_current',
+    'load_current',
+    'load_power',
+    'rectifier_current',
+    'total_power',
+    'temperature',
+    'humidity',
+    'soc_avg',
+)
+
+class RectifierRollup(models.Model):
+    """
+    Agregat RectifierData per site per bucket waktu (1 menit, 1 jam, 1 hari).
+    Di-update secara incremental oleh ingestion (monitor/rollups.py) dan
+    diisi ulang dari data mentah dengan command backfill_rollups.
+    """
+    RESOLUTION_CHOICES = [
+        ('1m', '1 minute'),
+        ('1h', '1 hour'),
+        ('1d', '1 day'),
+    ]
+    
+    site = models.ForeignKey(Site, on_delete=models.CASCADE, related_name='rollups')
+    resolution = models.CharField(max_length=3, choices=RESOLUTION_CHOICES)
+    bucket = models.BigIntegerField()  # Bucket start, epoch milliseconds (UTC)
+    count = models.IntegerField(default=0)
+    last_timestamp = models.BigIntegerField()  # Timestamp of the row the *_last values come from
+    
+    class Meta:
+        ordering = ['-bucket']
+        indexes = [
+            models.Index(fields=['resolution', '-bucket']),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['site', 'resolution', 'bucket'], name='unique_rollup_bucket'),
+        ]
+    
+    def __str__(self):
+        return f"Rollup {self.resolution} - {self.site.code} - {self.bucket}"
+
+for _name in ROLLUP_FIELDS:
+    for _suffix in ('min', 'max', 'sum', 'last'):
+        RectifierRollup.add_to_class(f'{_name}_{_suffix}', models.FloatField(default=0))
+del _name, _suffix
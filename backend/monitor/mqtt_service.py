@@ -0,0 +1,336 @@
+"""
+MQTT ingestion asyncio di proses ASGI
+
+AsyncMQTTService menjalankan client paho di event loop server ASGI: socket
+MQTT didaftarkan ke loop.add_reader / add_writer, tanpa thread loop_start().
+- on_message (di event loop) hanya memasukkan (topic, payload) ke queue
+- writer task mengambil batch (MQTT_BATCH_SIZE message atau
+  MQTT_BATCH_INTERVAL_MS setelah message pertama); decode, bulk insert,
+  update cache state terbaru dan encode event WebSocket dijalankan dalam
+  satu hop per batch ke thread writer (satu thread dengan koneksi database
+  persisten, seperti BatchWriter), lalu group_send langsung di event loop
+  (tanpa async_to_sync)
+- rollup dan maintenance partisi di hop berikutnya, setelah broadcast
+Queue penuh (MQTT_QUEUE_SIZE): policy block berhenti membaca socket MQTT
+(backpressure ke broker lewat TCP) sampai writer mengambil batch,
+drop-oldest / drop-newest membuang message. Seperti mqtt_listener, batch
+yang gagal disimpan dan message yang dibuang ditulis ke spool
+(MQTT_SPOOL_PATH) dan di-replay setelah database normal lagi.
+
+Dimulai dari ASGI lifespan (monitor/lifespan.py) jika MQTT_ASGI_INGEST aktif.
+"""
+import asyncio
+import logging
+import os
+import random
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import paho.mqtt.client as mqtt
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection
+from channels.layers import get_channel_layer
+from .broadcast import dashboard_events, send_events
+from .decoder import JSONDecodeError, decode_message
+from .ingest import IngestQueue, create_batch_writer, update_aggregates
+from .latest import update_latest
+from .spool import create_spool
+
+logger = logging.getLogger(__name__)
+
+# Reconnect backoff (seconds)
+RECONNECT_MIN = 1
+RECONNECT_MAX = 60
+
+class AsyncMQTTService:
+    """MQTT client dan batch writer di event loop"""
+
+    def __init__(self, channel_layer=None):
+        # Unique per process: the broker disconnects an older session with the same id
+        self.client = mqtt.Client(client_id=f"{settings.MQTT_CLIENT_ID}_{os.getpid()}_{random.randint(1000, 9999)}")
+        if getattr(settings, 'MQTT_USERNAME', None):
+            self.client.username_pw_set(settings.MQTT_USERNAME, settings.MQTT_PASSWORD)
+        self.client.on_connect = self.on_connect
+        self.client.on_message = self.on_message
+        self.client.on_disconnect = self.on_disconnect
+        self.client.on_socket_open = self.on_socket_open
+        self.client.on_socket_close = self.on_socket_close
+        self.client.on_socket_register_write = self.on_socket_register_write
+        self.client.on_socket_unregister_write = self.on_socket_unregister_write
+        self.channel_layer = channel_layer or get_channel_layer()
+
+        # Failed batches and dropped messages, replayed once the database is back
+        self.spool = create_spool()
+        # Used for write() and its counters only, batching happens in write_batches()
+        self.writer = create_batch_writer(on_error=self.spool and self.spool.append_records)
+        self.maxsize = max(1, int(getattr(settings, 'MQTT_QUEUE_SIZE', 10000)))
+        self.policy = getattr(settings, 'MQTT_QUEUE_POLICY', IngestQueue.BLOCK)
+        if self.policy not in IngestQueue.POLICIES:
+            raise ValueError(f"Unknown queue policy '{self.policy}', expected one of {', '.join(IngestQueue.POLICIES)}")
+        self.queue = deque()
+        # Database work runs here: one thread keeps its connection between batches
+        # (database_sync_to_async would close it after every call with CONN_MAX_AGE = 0)
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='mqtt-writer')
+
+        self.loop = None
+        self.fd = None  # MQTT socket file descriptor while connected
+        self.paused = False
+        self.closing = False
+        self.reconnect_delay = RECONNECT_MIN
+        self.tasks = []
+        self.writer_task = None
+
+        # Counters
+        self.received = 0
+        self.dropped = 0
+        self.max_depth = 0
+
+    async def start(self):
+        """Start koneksi broker, writer task dan stats task di event loop yang berjalan"""
+        self.loop = asyncio.get_running_loop()
+        self.has_items = asyncio.Event()
+        self.batch_full = asyncio.Event()
+        self.disconnected = asyncio.Event()
+        self.writer_task = self.loop.create_task(self.write_batches())
+        if self.spool is not None:
+            self.spool.start()
+            logger.info(f"Spool: {self.spool.path} (fsync {self.spool.fsync}, {self.spool.pending()} records waiting)")
+        self.tasks = [self.loop.create_task(self.run())]
+        interval = getattr(settings, 'MQTT_STATS_INTERVAL', 60)
+        if interval:
+            self.tasks.append(self.loop.create_task(self.report_stats(interval)))
+        logger.info("MQTT ingestion started on the event loop")
+
+    async def stop(self):
+        """Disconnect, simpan sisa queue lalu log statistik akhir"""
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        if self.fd is not None:
+            self.client.disconnect()
+            self.client.loop_write()
+        self.closing = True
+        self.has_items.set()
+        self.batch_full.set()
+        await self.writer_task
+        # Looked up in the writer thread: connection is per thread
+        await self.loop.run_in_executor(self.executor, lambda: connection.close())
+        self.executor.shutdown()
+        self.log_stats()
+        if self.spool is not None:
+            await self.loop.run_in_executor(None, self.spool.close)
+        logger.info("MQTT ingestion stopped")
+
+    async def run(self):
+        """Koneksi ke broker dan reconnect dengan backoff"""
+        while True:
+            self.disconnected.clear()
+            try:
+                # Blocking DNS lookup and TCP connect off the event loop
+                await self.loop.run_in_executor(None, self.client.connect, settings.MQTT_BROKER, settings.MQTT_PORT, 60)
+            except Exception as e:
+                logger.error(f"✗ Failed to connect to MQTT Broker {settings.MQTT_BROKER}: {e}")
+            else:
+                # Keepalive pings and timeouts until the connection drops
+                while not self.disconnected.is_set():
+                    if self.client.loop_misc() != mqtt.MQTT_ERR_SUCCESS:
+                        break
+                    try:
+                        await asyncio.wait_for(self.disconnected.wait(), 1)
+                    except asyncio.TimeoutError:
+                        pass
+            await asyncio.sleep(self.reconnect_delay)
+            self.reconnect_delay = min(self.reconnect_delay * 2, RECONNECT_MAX)
+
+    def on_connect(self, client, userdata, flags, rc):
+        """Callback ketika koneksi ke broker berhasil"""
+        if rc == 0:
+            self.reconnect_delay = RECONNECT_MIN
+            logger.info(f"✓ Connected to MQTT Broker: {settings.MQTT_BROKER}")
+            client.subscribe(settings.MQTT_TOPIC)
+            logger.info(f"✓ Subscribed to topic: {settings.MQTT_TOPIC}")
+        else:
+            logger.error(f"✗ Failed to connect to MQTT Broker, return code: {rc}")
+
+    def on_disconnect(self, client, userdata, rc):
+        """Callback ketika disconnect dari broker"""
+        if rc != 0:
+            logger.warning(f"Disconnected from broker (rc={rc}), will reconnect...")
+        self.disconnected.set()
+
+    def on_message(self, client, userdata, msg):
+        """Callback (di event loop) - hanya masukkan ke queue, database di writer task"""
+        if len(self.queue) >= self.maxsize:
+            if self.policy == IngestQueue.DROP_NEWEST:
+                self.dropped += 1
+                self.spool_dropped((msg.topic, msg.payload))
+                return
+            if self.policy == IngestQueue.DROP_OLDEST:
+                topic, raw, _ = self.queue.popleft()
+                self.dropped += 1
+                self.spool_dropped((topic, raw))
+        self.queue.append((msg.topic, msg.payload, self.loop.time()))
+        self.received += 1
+        self.max_depth = max(self.max_depth, len(self.queue))
+        if self.policy == IngestQueue.BLOCK and len(self.queue) >= self.maxsize:
+            self.pause_reading()
+        if len(self.queue) >= self.writer.batch_size:
+            self.batch_full.set()
+        self.has_items.set()
+
+    def spool_dropped(self, item):
+        """Simpan message yang dibuang policy drop-oldest / drop-newest ke spool"""
+        # Buffered append (fsync at most every MQTT_SPOOL_FSYNC_INTERVAL with the default policy)
+        if self.spool is not None:
+            self.spool.append(item)
+
+    # paho socket callbacks: from the event loop, or from the executor thread running connect()
+
+    def call_in_loop(self, callback, *args):
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            callback(*args)
+        else:
+            self.loop.call_soon_threadsafe(callback, *args)
+
+    def on_socket_open(self, client, userdata, sock):
+        self.call_in_loop(self.watch, sock.fileno())
+
+    def on_socket_close(self, client, userdata, sock):
+        self.call_in_loop(self.unwatch, sock.fileno())
+
+    def on_socket_register_write(self, client, userdata, sock):
+        self.call_in_loop(self.loop.add_writer, sock.fileno(), self.client.loop_write)
+
+    def on_socket_unregister_write(self, client, userdata, sock):
+        self.call_in_loop(self.loop.remove_writer, sock.fileno())
+
+    def watch(self, fd):
+        self.fd = fd
+        if not self.paused:
+            self.loop.add_reader(fd, self.client.loop_read)
+
+    def unwatch(self, fd):
+        self.loop.remove_reader(fd)
+        self.loop.remove_writer(fd)
+        if self.fd == fd:
+            self.fd = None
+
+    def pause_reading(self):
+        """Queue penuh (policy block): berhenti membaca socket MQTT"""
+        if not self.paused:
+            self.paused = True
+            if self.fd is not None:
+                self.loop.remove_reader(self.fd)
+            logger.warning(f"MQTT queue full ({self.maxsize}), pausing reads from the broker")
+
+    def resume_reading(self):
+        if self.paused:
+            self.paused = False
+            if self.fd is not None:
+                self.loop.add_reader(self.fd, self.client.loop_read)
+
+    async def write_batches(self):
+        """Ambil batch dari queue: penuh (MQTT_BATCH_SIZE) atau MQTT_BATCH_INTERVAL_MS setelah message terlama di queue"""
+        while True:
+            if self.closing and not self.queue:
+                return
+            await self.has_items.wait()
+            # Deadline from the arrival of the oldest queued message, like BatchWriter
+            timeout = self.queue[0][2] + self.writer.flush_interval - self.loop.time() if self.queue else 0
+            if not self.closing and len(self.queue) < self.writer.batch_size and timeout > 0:
+                self.batch_full.clear()
+                try:
+                    await asyncio.wait_for(self.batch_full.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"✗ Error writing MQTT batch: {e}")
+
+    async def flush(self):
+        """Simpan satu batch dari queue lalu kirim update dashboard lewat channel layer"""
+        items = [self.queue.popleft() for _ in range(min(len(self.queue), self.writer.batch_size))]
+        if not self.queue:
+            self.has_items.clear()
+        if self.paused and len(self.queue) < self.maxsize:
+            self.resume_reading()
+        if not items:
+            return 0
+
+        records, events = await self.loop.run_in_executor(self.executor, self.save_batch, items)
+        if events and self.channel_layer is not None:
+            try:
+                await send_events(self.channel_layer, events)
+            except Exception as e:
+                logger.warning(f"WebSocket broadcast failed (OK - using REST API polling): {e}")
+        if records:
+            await self.loop.run_in_executor(self.executor, update_aggregates, records)
+        return len(records)
+
+    def save_batch(self, items):
+        """
+        Decode + bulk insert + update cache state terbaru (di thread writer),
+        return (records, [(group, event)] untuk dashboard yang berubah)
+        """
+        records = []
+        for topic, raw, _ in items:
+            try:
+                records.append(decode_message(raw, topic))
+            except DatabaseError as e:
+                # Site lookup needs the database - keep the raw message for replay
+                logger.error(f"✗ Database error while decoding, spooling message: {e}")
+                if self.spool is not None:
+                    self.spool.append((topic, raw))
+                close_old_connections()
+            except JSONDecodeError as e:
+                logger.error(f"✗ Failed to decode JSON: {e}")
+            except Exception as e:
+                logger.error(f"✗ Error processing message: {e}")
+        if not self.writer.write(records):
+            return [], []
+        try:
+            events = dashboard_events(update_latest(records))
+        except Exception as e:
+            # Rows are committed - flush() still runs the rollups
+            logger.error(f"✗ Error updating latest state: {e}")
+            events = []
+        return records, events
+
+    async def report_stats(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            self.log_stats()
+
+    def log_stats(self):
+        logger.info(
+            f"Queue stats - depth: {len(self.queue)}/{self.maxsize} "
+            f"max: {self.max_depth} "
+            f"received: {self.received} "
+            f"dropped: {self.dropped} ({self.policy})"
+            f"{' paused' if self.paused else ''}"
+        )
+        self.writer.log_stats()
+        if self.spool is not None:
+            self.spool.log_stats()
+
+# Service of this process, started by the ASGI lifespan
+mqtt_service = None
+
+async def start_mqtt_service():
+    """Start MQTT ingestion di event loop yang berjalan"""
+    global mqtt_service
+    if mqtt_service is None:
+        mqtt_service = AsyncMQTTService()
+        await mqtt_service.start()
+    return mqtt_service
+
+async def stop_mqtt_service():
+    """Stop MQTT ingestion (sisa queue disimpan)"""
+    global mqtt_service
+    if mqtt_service is not None:
+        service, mqtt_service = mqtt_service, None
+        await service.stop()
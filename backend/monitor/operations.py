@@ -0,0 +1,110 @@
+import re
+from django.db import migrations
+
+class AddUniqueConstraintConcurrently(migrations.AddConstraint):
+    """
+    AddConstraint yang di PostgreSQL membangun unique index dengan
+    CREATE INDEX CONCURRENTLY (tidak memblokir insert), lalu memakai index
+    tersebut sebagai constraint. Database lain memakai AddConstraint biasa.
+    Hanya bisa dipakai di migration dengan atomic = False.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != 'postgresql':
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+        model = to_state.apps.get_model(app_label, self.model_name)
+        table = schema_editor.quote_name(model._meta.db_table)
+        name = schema_editor.quote_name(self.constraint.name)
+        columns = ', '.join(
+            schema_editor.quote_name(model._meta.get_field(field).column) for field in self.constraint.fields
+        )
+        schema_editor.execute(f'CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({columns})')
+        schema_editor.execute(f'ALTER TABLE {table} ADD CONSTRAINT {name} UNIQUE USING INDEX {name}')
+
+def partitions_of(schema_editor, table):
+    """Nama partisi table (kosong jika bukan table partisi)"""
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid '
+            'JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = %s AND pg_table_is_visible(p.oid) '
+            'ORDER BY c.relname',
+            [table],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+def create_index_concurrently(schema_editor, table, name, definition):
+    """
+    CREATE INDEX tanpa memblokir insert. definition adalah bagian setelah
+    'ON <table>', mis. 'USING brin ("timestamp")'. Table partisi tidak
+    mendukung CONCURRENTLY: index dibuat ON ONLY parent, lalu per partisi
+    secara CONCURRENTLY dan di-ATTACH ke index parent.
+    """
+    qn = schema_editor.quote_name
+    partitions = partitions_of(schema_editor, table)
+    if not partitions:
+        schema_editor.execute(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {qn(name)} ON {qn(table)} {definition}')
+        return
+    schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {qn(name)} ON ONLY {qn(table)} {definition}')
+    for partition in partitions:
+        partition_index = f'{partition[:40]}_{name[:22]}'
+        schema_editor.execute(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {qn(partition_index)} ON {qn(partition)} {definition}')
+        schema_editor.execute(f'ALTER INDEX {qn(name)} ATTACH PARTITION {qn(partition_index)}')
+
+class AddIndexConcurrently(migrations.AddIndex):
+    """
+    AddIndex yang di PostgreSQL memakai create_index_concurrently() (juga
+    untuk table partisi). Database lain memakai AddIndex biasa. Hanya bisa
+    dipakai di migration dengan atomic = False.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != 'postgresql':
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+        model = to_state.apps.get_model(app_label, self.model_name)
+        sql = str(self.index.create_sql(model, schema_editor))
+        # 'CREATE INDEX "name" ON "table" <definition>'
+        definition = re.sub(r'^CREATE INDEX \S+ ON \S+ ', '', sql)
+        create_index_concurrently(schema_editor, model._meta.db_table, self.index.name, definition)
+
+class AddBrinIndex(migrations.operations.base.Operation):
+    """
+    BRIN index (hanya PostgreSQL, no-op di database lain). Tidak dicatat di
+    model state karena SQLite tidak mengenal BRIN dan akan gagal saat
+    table di-rebuild.
+    """
+    reduces_to_sql = False
+    reversible = True
+
+    def __init__(self, model_name, name, column, pages_per_range=32):
+        self.model_name = model_name
+        self.name = name
+        self.column = column
+        self.pages_per_range = pages_per_range
+
+    def deconstruct(self):
+        return (self.__class__.__name__, [], {
+            'model_name': self.model_name,
+            'name': self.name,
+            'column': self.column,
+            'pages_per_range': self.pages_per_range,
+        })
+
+    def state_forwards(self, app_label, state):
+        pass
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        model = to_state.apps.get_model(app_label, self.model_name)
+        definition = f'USING brin ({schema_editor.quote_name(self.column)}) WITH (pages_per_range = {int(self.pages_per_range)})'
+        create_index_concurrently(schema_editor, model._meta.db_table, self.name, definition)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        schema_editor.execute(f'DROP INDEX IF EXISTS {schema_editor.quote_name(self.name)}')
+
+    def describe(self):
+        return f'Create BRIN index {self.name} on {self.model_name}.{self.column}'
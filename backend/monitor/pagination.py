@@ -0,0 +1,106 @@
+"""
+Keyset (cursor) pagination untuk history RectifierData
+
+Urutan (-timestamp, -id). Cursor adalah posisi row terakhir dari halaman
+sebelumnya (timestamp, id), di-encode base64 sehingga opaque bagi client.
+Halaman berikutnya diambil dengan WHERE timestamp <= ts AND (timestamp < ts
+OR id < id) ... LIMIT n, yang dilayani index -timestamp, sehingga halaman
+ke-N sama murahnya dengan halaman pertama (tidak seperti OFFSET).
+
+Dengan archive (lihat monitor/archive.read_rows), row yang sudah diarsip
+digabung ke halaman dengan urutan dan cursor yang sama.
+"""
+import base64
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+def encode_position(position):
+    """(timestamp, id) -> cursor opaque"""
+    return base64.urlsafe_b64encode(f'{position[0]}:{position[1]}'.encode()).decode()
+
+def decode_position(encoded):
+    """Cursor -> (timestamp, id), ValueError jika cursor tidak valid"""
+    timestamp, pk = base64.urlsafe_b64decode(encoded.encode()).decode().split(':')
+    return int(timestamp), int(pk)
+
+class KeysetPagination(BasePagination):
+    """Pagination forward-only dengan cursor (timestamp, id)"""
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 100
+    max_page_size = 1000
+    ordering = ('-timestamp', '-id')
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self, archive=None):
+        # archive(before=, after=, limit=) -> archived rows, newest first
+        self.archive = archive
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+
+        position = self.decode_cursor(request)
+        queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            timestamp, pk = position
+            # timestamp <= ts is the index range, the OR only breaks ties within ts
+            queryset = queryset.filter(timestamp__lte=timestamp).filter(
+                Q(timestamp__lt=timestamp) | Q(id__lt=pk)
+            )
+
+        # One extra row tells whether there is a next page
+        page = list(queryset[:self.page_size + 1])
+        if self.archive is not None:
+            page = self.merge_archived(page, position)
+        self.has_next = len(page) > self.page_size
+        page = page[:self.page_size]
+        self.next_position = (page[-1].timestamp, page[-1].pk) if self.has_next else None
+        return page
+
+    def merge_archived(self, page, position):
+        """Gabungkan row arsip yang masuk ke halaman ini (urut -timestamp, -id)"""
+        # A full database page only needs archived rows newer than its last row
+        after = (page[-1].timestamp, page[-1].pk) if len(page) > self.page_size else None
+        archived = self.archive(before=position, after=after, limit=self.page_size + 1)
+        if not archived:
+            return page
+        # Rows archived by an interrupted run may still be in the table
+        seen = {row.pk for row in page}
+        page += [row for row in archived if row.pk not in seen]
+        page.sort(key=lambda row: (row.timestamp, row.pk), reverse=True)
+        return page[:self.page_size + 1]
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def decode_cursor(self, request):
+        """Return (timestamp, id) dari ?cursor=, None untuk halaman pertama"""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            return decode_position(encoded)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, position):
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, encode_position(position))
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(self.next_position)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
@@ -0,0 +1,326 @@
+"""
+Range partitioning RectifierData berdasarkan timestamp (PostgreSQL)
+
+Command partition_rectifierdata --convert mengubah table biasa menjadi
+table partisi (PARTITION BY RANGE (timestamp), satu partisi per hari atau
+minggu UTC sesuai PARTITION_INTERVAL) tanpa mengubah model ORM:
+
+1. Table baru dibuat dengan kolom, default, constraint dan index yang sama
+   (primary key menjadi (id, timestamp) karena PostgreSQL mewajibkan
+   partition key di setiap unique constraint), ditambah partisi DEFAULT.
+2. Row disalin per partisi sementara ingestion tetap berjalan.
+3. Dalam satu transaksi (table lama di-lock dari write): row yang masuk
+   selama penyalinan disalin, lalu nama table, index, constraint dan
+   sequence ditukar. Table lama tetap ada sebagai <table>_legacy untuk
+   rollback sampai dihapus dengan --drop-legacy.
+
+Partisi ke depan (PARTITION_PREMAKE interval) dibuat setelah migrate,
+oleh command tanpa opsi (cron) dan secara berkala oleh ingestion. Row yang
+jatuh di luar semua partisi masuk ke partisi DEFAULT dan dipindahkan ke
+partisinya saat partisi tersebut dibuat. archive_history menghapus
+partisi yang seluruh isinya sudah diarsip dengan DETACH + DROP, bukan
+DELETE per row.
+"""
+import logging
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from django.conf import settings
+from django.db import connections, router, transaction
+from .models import RectifierData
+
+logger = logging.getLogger(__name__)
+
+DAY = 24 * 60 * 60 * 1000
+INTERVALS = {
+    'day': DAY,
+    'week': 7 * DAY,
+}
+BOUND = re.compile(r"FROM \('?(-?\d+)'?\) TO \('?(-?\d+)'?\)")
+
+def get_connection():
+    return connections[router.db_for_write(RectifierData)]
+
+def table_name():
+    return RectifierData._meta.db_table
+
+def interval_ms():
+    interval = getattr(settings, 'PARTITION_INTERVAL', 'day')
+    if interval not in INTERVALS:
+        raise ValueError(f"Unknown PARTITION_INTERVAL '{interval}', expected one of {', '.join(INTERVALS)}")
+    return INTERVALS[interval]
+
+def floor(timestamp, width):
+    """Awal partisi yang berisi timestamp (minggu dimulai hari Senin UTC)"""
+    # Epoch day 0 is a Thursday, shift so weeks start on Monday
+    offset = 3 * DAY if width == INTERVALS['week'] else 0
+    return (timestamp - offset) // width * width + offset
+
+def partition_name(start):
+    """Nama partisi untuk awal range (epoch ms), mis. monitor_rectifierdata_p20240101"""
+    return f"{table_name()}_p{datetime.fromtimestamp(start / 1000, tz=timezone.utc):%Y%m%d}"
+
+def default_partition_name():
+    return f'{table_name()}_default'
+
+def is_partitioned(connection=None):
+    """True jika table RectifierData sudah berupa table partisi"""
+    connection = connection or get_connection()
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid '
+            'WHERE c.relname = %s AND pg_table_is_visible(c.oid)',
+            [table_name()],
+        )
+        return cursor.fetchone() is not None
+
+def list_partitions(connection=None, table=None):
+    """[(name, start, end)] urut naik, tanpa partisi DEFAULT"""
+    connection = connection or get_connection()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i '
+            'JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent '
+            'WHERE p.relname = %s AND pg_table_is_visible(p.oid)',
+            [table or table_name()],
+        )
+        partitions = []
+        for name, bound in cursor.fetchall():
+            match = BOUND.search(bound or '')
+            if match:
+                partitions.append((name, int(match.group(1)), int(match.group(2))))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+def create_partition(connection, cursor, table, start, end, default=None):
+    """
+    Buat partisi [start, end). Jika partisi DEFAULT berisi row di range
+    tersebut, row dipindahkan dulu (PostgreSQL menolak partisi baru yang
+    bertabrakan dengan isi DEFAULT).
+    """
+    qn = connection.ops.quote_name
+    name = partition_name(start)
+    if default:
+        cursor.execute(f'SELECT 1 FROM {qn(default)} WHERE "timestamp" >= %s AND "timestamp" < %s LIMIT 1', [start, end])
+        if cursor.fetchone():
+            with transaction.atomic(using=connection.alias):
+                cursor.execute(f'CREATE TABLE {qn(name)} (LIKE {qn(table)} INCLUDING DEFAULTS)')
+                cursor.execute(
+                    f'WITH moved AS (DELETE FROM {qn(default)} WHERE "timestamp" >= %s AND "timestamp" < %s RETURNING *) '
+                    f'INSERT INTO {qn(name)} SELECT * FROM moved',
+                    [start, end],
+                )
+                cursor.execute(f'ALTER TABLE {qn(table)} ATTACH PARTITION {qn(name)} FOR VALUES FROM ({int(start)}) TO ({int(end)})')
+            return name
+    cursor.execute(f'CREATE TABLE IF NOT EXISTS {qn(name)} PARTITION OF {qn(table)} FOR VALUES FROM ({int(start)}) TO ({int(end)})')
+    return name
+
+def ensure_partitions(start, end, table=None, connection=None):
+    """Pastikan setiap interval yang menyentuh [start, end] punya partisi, return nama partisi baru"""
+    connection = connection or get_connection()
+    table = table or table_name()
+    width = interval_ms()
+    existing = {partition_start for _, partition_start, _ in list_partitions(connection, table)}
+    default = f'{table}_default'
+    created = []
+    with connection.cursor() as cursor:
+        for partition_start in range(floor(start, width), end + 1, width):
+            if partition_start not in existing:
+                created.append(create_partition(connection, cursor, table, partition_start, partition_start + width, default))
+    return created
+
+def ensure_future_partitions(connection=None):
+    """Buat partisi dari sekarang sampai PARTITION_PREMAKE interval ke depan (no-op jika belum partisi)"""
+    connection = connection or get_connection()
+    if not is_partitioned(connection):
+        return []
+    now = int(time.time() * 1000)
+    created = ensure_partitions(now, now + getattr(settings, 'PARTITION_PREMAKE', 7) * interval_ms(), connection=connection)
+    for name in created:
+        logger.info(f"✓ Created partition {name}")
+    return created
+
+def drop_partitions_before(cutoff, connection=None):
+    """DETACH + DROP partisi yang seluruh range-nya sebelum cutoff, return [(name, start, end)]"""
+    connection = connection or get_connection()
+    qn = connection.ops.quote_name
+    dropped = []
+    with connection.cursor() as cursor:
+        for name, start, end in list_partitions(connection):
+            if end > cutoff:
+                break
+            with transaction.atomic(using=connection.alias):
+                cursor.execute(f'ALTER TABLE {qn(table_name())} DETACH PARTITION {qn(name)}')
+                cursor.execute(f'DROP TABLE {qn(name)}')
+            dropped.append((name, start, end))
+    return dropped
+
+# Periodic maintenance from the ingestion process
+
+_maintenance_lock = threading.Lock()
+_next_maintenance = 0.0
+MAINTENANCE_INTERVAL = 60 * 60
+
+def maintain_if_due():
+    """Panggil ensure_future_partitions() maksimal sekali per MAINTENANCE_INTERVAL"""
+    global _next_maintenance
+    if time.monotonic() < _next_maintenance or not _maintenance_lock.acquire(blocking=False):
+        return
+    try:
+        _next_maintenance = time.monotonic() + MAINTENANCE_INTERVAL
+        if get_connection().vendor == 'postgresql':
+            ensure_future_partitions()
+    except Exception as e:
+        logger.error(f"✗ Partition maintenance failed: {e}")
+    finally:
+        _maintenance_lock.release()
+
+def ensure_after_migrate(sender, using=None, **kwargs):
+    """Handler post_migrate: partisi ke depan setelah deploy"""
+    if connections[using or 'default'].vendor == 'postgresql':
+        ensure_future_partitions(connections[using or 'default'])
+
+# Conversion
+
+def describe_table(cursor, table):
+    """(constraints [(name, type, definition)], indexes [(name, definition)]) dari catalog"""
+    cursor.execute(
+        'SELECT con.conname, con.contype, pg_get_constraintdef(con.oid) FROM pg_constraint con '
+        'JOIN pg_class c ON c.oid = con.conrelid WHERE c.relname = %s AND pg_table_is_visible(c.oid) '
+        "AND con.contype IN ('p', 'u', 'f', 'c') ORDER BY con.contype DESC, con.conname",
+        [table],
+    )
+    constraints = cursor.fetchall()
+    cursor.execute(
+        'SELECT i.indexname, i.indexdef FROM pg_indexes i '
+        'WHERE i.tablename = %s AND i.schemaname = current_schema() AND NOT EXISTS ('
+        '  SELECT 1 FROM pg_constraint con WHERE con.conname = i.indexname'
+        ') ORDER BY i.indexname',
+        [table],
+    )
+    return constraints, cursor.fetchall()
+
+def temporary_name(name):
+    return f'{name[:55]}_new'
+
+def legacy_name(name):
+    return f'{name[:52]}_legacy'
+
+def copy_structure(cursor, qn, table, new_table):
+    """
+    Buat new_table (partisi) dengan kolom, constraint dan index seperti table.
+    Return daftar (nama asli, nama sementara, jenis) untuk ditukar saat swap.
+    """
+    constraints, indexes = describe_table(cursor, table)
+    cursor.execute(f'CREATE TABLE {qn(new_table)} (LIKE {qn(table)} INCLUDING DEFAULTS) PARTITION BY RANGE ("timestamp")')
+    # Own sequence instead of the serial/identity of the old table (LIKE does not copy identity)
+    sequence = f'{new_table}_id_seq'
+    cursor.execute(f'CREATE SEQUENCE {qn(sequence)} OWNED BY {qn(new_table)}.id')
+    cursor.execute(f"ALTER TABLE {qn(new_table)} ALTER COLUMN id SET DEFAULT nextval('{sequence}')")
+
+    renames = []
+    for name, kind, definition in constraints:
+        if kind == 'p':
+            # Every unique constraint on a partitioned table must contain the partition key
+            definition = re.sub(r'\)$', ', "timestamp")', definition) if '"timestamp"' not in definition else definition
+        cursor.execute(f'ALTER TABLE {qn(new_table)} ADD CONSTRAINT {qn(temporary_name(name))} {definition}')
+        renames.append((name, temporary_name(name), 'constraint'))
+    for name, definition in indexes:
+        # CREATE INDEX on the parent creates it on every partition
+        definition = re.sub(r'^CREATE (UNIQUE )?INDEX \S+ ON (ONLY )?\S+', lambda m: (
+            f'CREATE {m.group(1) or ""}INDEX {qn(temporary_name(name))} ON {qn(new_table)}'
+        ), definition)
+        cursor.execute(definition)
+        renames.append((name, temporary_name(name), 'index'))
+    return renames
+
+def rename_object(cursor, qn, table, kind, old, new):
+    if kind == 'constraint':
+        cursor.execute(f'ALTER TABLE {qn(table)} RENAME CONSTRAINT {qn(old)} TO {qn(new)}')
+    else:
+        cursor.execute(f'ALTER INDEX {qn(old)} RENAME TO {qn(new)}')
+
+def copy_rows(cursor, qn, source, target, start, end, max_id):
+    cursor.execute(
+        f'INSERT INTO {qn(target)} SELECT * FROM {qn(source)} '
+        f'WHERE "timestamp" >= %s AND "timestamp" < %s AND id <= %s',
+        [start, end, max_id],
+    )
+    return cursor.rowcount
+
+def convert(stdout=None, lock_timeout='10s'):
+    """
+    Ubah table RectifierData menjadi table partisi (lihat docstring module).
+    Return jumlah row yang disalin.
+    """
+    connection = get_connection()
+    if connection.vendor != 'postgresql':
+        raise RuntimeError('Partitioning requires PostgreSQL')
+    if is_partitioned(connection):
+        raise RuntimeError(f'{table_name()} is already partitioned')
+
+    qn = connection.ops.quote_name
+    table = table_name()
+    new_table = f'{table}_partitioned'
+    width = interval_ms()
+    write = stdout.write if stdout else logger.info
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT MIN("timestamp"), MAX("timestamp"), MAX(id) FROM {qn(table)}')
+        first, last, max_id = cursor.fetchone()
+        now = int(time.time() * 1000)
+        first = first if first is not None else now
+        last = max(last or now, now) + getattr(settings, 'PARTITION_PREMAKE', 7) * width
+        max_id = max_id or 0
+
+        with transaction.atomic(using=connection.alias):
+            renames = copy_structure(cursor, qn, table, new_table)
+            cursor.execute(f'CREATE TABLE {qn(f"{new_table}_default")} PARTITION OF {qn(new_table)} DEFAULT')
+            ensure_partitions(first, last, table=new_table, connection=connection)
+        write(f"Created {new_table} with {len(list_partitions(connection, new_table))} partitions")
+
+        # Bulk copy while ingestion keeps writing to the old table
+        copied = 0
+        started = time.monotonic()
+        for _, start, end in list_partitions(connection, new_table):
+            with transaction.atomic(using=connection.alias):
+                copied += copy_rows(cursor, qn, table, new_table, start, end, max_id)
+            write(f"  {partition_name(start)}: {copied:,} rows copied ({time.monotonic() - started:.0f}s)")
+
+        # Short final step: block writes (reads continue), copy the tail, swap names
+        with transaction.atomic(using=connection.alias):
+            cursor.execute(f"SET LOCAL lock_timeout = '{lock_timeout}'")
+            cursor.execute(f'LOCK TABLE {qn(table)} IN EXCLUSIVE MODE')
+            cursor.execute(f'INSERT INTO {qn(new_table)} SELECT * FROM {qn(table)} WHERE id > %s', [max_id])
+            copied += cursor.rowcount
+            # Rows that fell outside the premade range end up in the default partition
+            cursor.execute(f'SELECT MIN("timestamp"), MAX("timestamp") FROM {qn(f"{new_table}_default")}')
+            low, high = cursor.fetchone()
+
+            cursor.execute(f'ALTER TABLE {qn(table)} RENAME TO {qn(legacy_name(table))}')
+            for name, _, kind in renames:
+                rename_object(cursor, qn, legacy_name(table), kind, name, legacy_name(name))
+            cursor.execute(f'ALTER TABLE {qn(new_table)} RENAME TO {qn(table)}')
+            for name, temporary, kind in renames:
+                rename_object(cursor, qn, table, kind, temporary, name)
+            cursor.execute(f'ALTER TABLE {qn(f"{new_table}_default")} RENAME TO {qn(default_partition_name())}')
+            # Continue ids after the old table (ids are never reused, archives rely on that)
+            cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [legacy_name(table)])
+            old_sequence = cursor.fetchone()[0]
+            cursor.execute(
+                f"SELECT setval('{new_table}_id_seq', GREATEST(COALESCE((SELECT MAX(id) FROM {qn(table)}), 0), "
+                f"{f'(SELECT last_value FROM {old_sequence})' if old_sequence else '0'}, 1))"
+            )
+
+        if low is not None:
+            ensure_partitions(low, high, connection=connection)
+    write(f"Swapped: {copied:,} rows in partitioned {table}, old table kept as {legacy_name(table)}")
+    return copied
+
+def drop_legacy():
+    """Hapus table lama hasil convert()"""
+    connection = get_connection()
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {connection.ops.quote_name(legacy_name(table_name()))}')
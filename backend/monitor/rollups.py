@@ -0,0 +1,170 @@
+"""
+Rollup incremental RectifierData (1 menit, 1 jam, 1 hari)
+
+Setiap batch yang tersimpan diagregasi (NumPy) per (site, resolution,
+bucket) lalu di-upsert ke RectifierRollup: count dan sum dijumlahkan,
+min/max digabung, *_last diambil dari row dengan timestamp terbesar.
+Hanya row yang benar-benar tersimpan (pk terisi) yang dihitung, sehingga
+redelivery QoS 1 dan replay spool tidak menghitung dua kali.
+
+Command backfill_rollups mengisi ulang rollup dari data mentah dengan
+agregasi yang sama (mode replace, bukan merge).
+"""
+import logging
+import numpy as np
+from django.db import connections, router, transaction
+from django.db.models import Max, Min, Sum
+from .downsample import MINMAX
+from .models import ROLLUP_FIELDS, RectifierRollup
+
+logger = logging.getLogger(__name__)
+
+# Resolution -> bucket width in milliseconds, finest first
+RESOLUTIONS = {
+    '1m': 60 * 1000,
+    '1h': 60 * 60 * 1000,
+    '1d': 24 * 60 * 60 * 1000,
+}
+
+STATS = ('min', 'max', 'sum', 'last')
+COLUMNS = ['site_id', 'resolution', 'bucket', 'count', 'last_timestamp'] + [
+    f'{name}_{stat}' for name in ROLLUP_FIELDS for stat in STATS
+]
+
+def aggregate(site_ids, timestamps, values, width):
+    """
+    Agregasi per (site, bucket) untuk satu lebar bucket.
+    Input array dengan panjang sama (values shape (n, len(ROLLUP_FIELDS))),
+    return list tuple (site_id, bucket, count, last_timestamp, stats...)
+    dengan stats berurutan seperti COLUMNS.
+    """
+    if not len(timestamps):
+        return []
+    buckets = timestamps // width * width
+    order = np.lexsort((timestamps, buckets, site_ids))
+    site_ids, buckets, timestamps, values = site_ids[order], buckets[order], timestamps[order], values[order]
+
+    # Sorted by (site, bucket, timestamp): each group is a contiguous run
+    boundary = np.r_[True, (site_ids[1:] != site_ids[:-1]) | (buckets[1:] != buckets[:-1])]
+    starts = np.flatnonzero(boundary)
+    ends = np.r_[starts[1:], len(timestamps)] - 1
+
+    stats = np.empty((len(starts), len(ROLLUP_FIELDS), len(STATS)))
+    stats[:, :, 0] = np.minimum.reduceat(values, starts, axis=0)
+    stats[:, :, 1] = np.maximum.reduceat(values, starts, axis=0)
+    stats[:, :, 2] = np.add.reduceat(values, starts, axis=0)
+    stats[:, :, 3] = values[ends]
+
+    return list(zip(
+        site_ids[starts].tolist(),
+        buckets[starts].tolist(),
+        (ends - starts + 1).tolist(),
+        timestamps[ends].tolist(),
+        *stats.reshape(len(starts), -1).T.tolist(),
+    ))
+
+def records_to_arrays(records):
+    """RectifierData yang tersimpan -> (site_ids, timestamps, values)"""
+    saved = [record for record in records if record.pk is not None]
+    site_ids = np.fromiter((record.site_id for record in saved), dtype=np.int64, count=len(saved))
+    timestamps = np.fromiter((record.timestamp for record in saved), dtype=np.int64, count=len(saved))
+    values = np.array(
+        [[getattr(record, name) for name in ROLLUP_FIELDS] for record in saved], dtype=np.float64,
+    ).reshape(len(saved), len(ROLLUP_FIELDS))
+    return site_ids, timestamps, values
+
+def upsert(rows_by_resolution, merge=True):
+    """
+    Tulis hasil aggregate() ke RectifierRollup dengan INSERT ... ON CONFLICT.
+    merge=True menggabungkan dengan bucket yang sudah ada (ingestion),
+    merge=False menimpa bucket (backfill).
+    """
+    db = router.db_for_write(RectifierRollup)
+    connection = connections[db]
+    table = connection.ops.quote_name(RectifierRollup._meta.db_table)
+    least, greatest = ('LEAST', 'GREATEST') if connection.vendor == 'postgresql' else ('MIN', 'MAX')
+
+    if merge:
+        newer = f'EXCLUDED.last_timestamp >= {table}.last_timestamp'
+        assignments = [
+            f'count = {table}.count + EXCLUDED.count',
+            f'last_timestamp = {greatest}({table}.last_timestamp, EXCLUDED.last_timestamp)',
+        ]
+        for name in ROLLUP_FIELDS:
+            assignments += [
+                f'{name}_min = {least}({table}.{name}_min, EXCLUDED.{name}_min)',
+                f'{name}_max = {greatest}({table}.{name}_max, EXCLUDED.{name}_max)',
+                f'{name}_sum = {table}.{name}_sum + EXCLUDED.{name}_sum',
+                f'{name}_last = CASE WHEN {newer} THEN EXCLUDED.{name}_last ELSE {table}.{name}_last END',
+            ]
+    else:
+        assignments = [f'{column} = EXCLUDED.{column}' for column in COLUMNS[3:]]
+
+    rows = [
+        (site_id, resolution, *rest)
+        for resolution, aggregated in rows_by_resolution.items()
+        for site_id, *rest in aggregated
+    ]
+    max_params = connection.features.max_query_params or 65535
+    batch_size = max(1, min(500, max_params // len(COLUMNS)))
+    placeholder = '(' + ', '.join(['%s'] * len(COLUMNS)) + ')'
+
+    with transaction.atomic(using=db, savepoint=False), connection.cursor() as cursor:
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            cursor.execute(
+                f'INSERT INTO {table} ({", ".join(COLUMNS)}) VALUES {", ".join([placeholder] * len(batch))} '
+                f'ON CONFLICT (site_id, resolution, bucket) DO UPDATE SET {", ".join(assignments)}',
+                [value for row in batch for value in row],
+            )
+    return len(rows)
+
+def update_rollups(records):
+    """Gabungkan batch RectifierData yang baru tersimpan ke semua rollup"""
+    site_ids, timestamps, values = records_to_arrays(records)
+    if not len(timestamps):
+        return 0
+    written = upsert({
+        resolution: aggregate(site_ids, timestamps, values, width)
+        for resolution, width in RESOLUTIONS.items()
+    })
+    logger.debug(f"Rollups updated: {written} buckets from {len(timestamps)} rows")
+    return written
+
+def pick_resolution(span_ms, points):
+    """Rollup paling kasar yang masih memberi minimal points bucket, None = pakai data mentah"""
+    chosen = None
+    for resolution, width in RESOLUTIONS.items():
+        if span_ms / width >= points:
+            chosen = resolution
+    return chosen
+
+def fetch_series(queryset, fields, resolution, mode):
+    """
+    Series chart dari rollup (queryset RectifierRollup yang sudah difilter),
+    digabung per bucket untuk semua site. mode 'minmax' menghasilkan dua
+    titik per bucket (min lalu max), mode lain rata-rata per bucket.
+    """
+    width = RESOLUTIONS[resolution]
+    # Aliases can't reuse the model column names
+    aggregates = {'rows': Sum('count')}
+    for name in fields:
+        aggregates[f'agg_{name}_min'] = Min(f'{name}_min')
+        aggregates[f'agg_{name}_max'] = Max(f'{name}_max')
+        aggregates[f'agg_{name}_sum'] = Sum(f'{name}_sum')
+    rows = list(
+        queryset.filter(resolution=resolution)
+        .values('bucket').annotate(**aggregates).order_by('bucket')
+        .values_list('bucket', *aggregates)
+    )
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty((0, len(fields)))
+
+    array = np.array(rows, dtype=np.float64)
+    buckets = array[:, 0].astype(np.int64)
+    stats = array[:, 2:].reshape(len(rows), len(fields), 3)
+    if mode == MINMAX:
+        timestamps = np.column_stack((buckets, buckets + width // 2)).ravel()
+        values = stats[:, :, :2].transpose(0, 2, 1).reshape(-1, len(fields))
+        return timestamps, values
+    return buckets + width // 2, stats[:, :, 2] / array[:, 1:2]
@@ -4,3 +4,8 @@ from . import consumers
 websocket_urlpatterns = [
     re_path(r'ws/rectifier/$', consumers.RectifierConsumer.as_asgi()),
 ]
+
+# Served by the ASGI application before Django (streaming responses)
+http_urlpatterns = [
+    re_path(r'^api/stream/rectifier/$', consumers.DashboardStreamConsumer.as_asgi()),
+]
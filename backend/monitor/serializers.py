@@ -1,8 +1,23 @@
 from rest_framework import serializers
-from .models import RectifierData
+from .models import RectifierData, Site
+
+class SiteSerializer(serializers.ModelSerializer):
+    """Serializer untuk Site"""
+    
+    class Meta:
+        model = Site
+        fields = '__all__'
 
 class RectifierDataSerializer(serializers.ModelSerializer):
     """Serializer untuk RectifierData"""
+    # Site attributes, flattened to keep the response shape of the API
+    site_code = serializers.CharField(source='site.code', read_only=True)
+    site_name = serializers.CharField(source='site.site_name', read_only=True)
+    project_id = serializers.CharField(source='site.project_id', read_only=True)
+    ladder = serializers.CharField(source='site.ladder', read_only=True)
+    sla = serializers.CharField(source='site.sla', read_only=True)
+    latitude = serializers.FloatField(source='site.latitude', read_only=True)
+    longitude = serializers.FloatField(source='site.longitude', read_only=True)
     
     class Meta:
         model = RectifierData
@@ -18,17 +33,19 @@ class DashboardDataSerializer(serializers.Serializer):
     battery = serializers.SerializerMethodField()
     
     def get_siteInfo(self, obj):
+        site = obj.site
         return {
-            'siteName': obj.site_name,
-            'projectId': obj.project_id,
-            'ladder': obj.ladder,
-            'sla': obj.sla,
+            'siteId': site.code,
+            'siteName': site.site_name,
+            'projectId': site.project_id,
+            'ladder': site.ladder,
+            'sla': site.sla,
             'statusRealtime': obj.status_realtime,
             'statusLadder': obj.status_ladder,
             'lastData': obj.created_at.strftime('%Y-%m-%d %H:%M:%S'),
             'location': {
-                'lat': obj.latitude or 0,
-                'lng': obj.longitude or 0,
+                'lat': site.latitude or 0,
+                'lng': site.longitude or 0,
             }
         }
     
@@ -98,8 +115,27 @@ class DashboardDataSerializer(serializers.Serializer):
             'socAvg': obj.soc_avg,
         }
 
+class SiteAlarmSerializer(serializers.Serializer):
+    """Serializer untuk site yang sedang alarm (lihat monitor/alarms.py)"""
+    site_code = serializers.CharField(source='record.site.code')
+    site_name = serializers.CharField(source='record.site.site_name')
+    project_id = serializers.CharField(source='record.site.project_id')
+    timestamp = serializers.IntegerField(source='record.timestamp')
+    alarms = serializers.ListField(child=serializers.CharField())
+    status_realtime = serializers.CharField(source='record.status_realtime')
+    door_cabinet = serializers.CharField(source='record.door_cabinet')
+    battery_stolen = serializers.CharField(source='record.battery_stolen')
+
 class RectifierStatsSerializer(serializers.Serializer):
-    """Serializer untuk statistik"""
+    """Serializer untuk statistik window (lihat monitor/stats.py)"""
+    site = serializers.CharField(allow_null=True)
+    window = serializers.CharField(allow_null=True)
+    start = serializers.IntegerField()  # Epoch ms, inclusive
+    end = serializers.IntegerField()  # Epoch ms, inclusive
+    count = serializers.IntegerField()
+    fields = serializers.DictField()  # {field: {avg, min, max[, p50, p95, p99]}}
+    
+    # Flat summary kept for existing clients
     avg_vdc_output = serializers.FloatField()
     max_vdc_output = serializers.FloatField()
     min_vdc_output = serializers.FloatField()
@@ -0,0 +1,85 @@
+"""
+Site dimension untuk ingestion path
+
+Atribut statis site (nama, project, koordinat, ...) disimpan di table Site.
+SiteCache menyimpan Site per code di memory sehingga setiap message hanya
+butuh satu dict lookup; database hanya disentuh untuk site baru atau
+ketika atribut site di payload berubah.
+"""
+import threading
+from django.conf import settings
+from .models import Site
+
+# (model field, payload key, coercion)
+SITE_SPEC = (
+    ('site_name', 'site_name', str),
+    ('project_id', 'project_id', str),
+    ('ladder', 'ladder', str),
+    ('sla', 'sla', str),
+    ('latitude', 'latitude', float),
+    ('longitude', 'longitude', float),
+)
+
+DEFAULT_SITE_CODE = 'default'
+
+def topic_site_index(pattern):
+    """Posisi level '+' pertama di topic pattern (rectifier/+/data -> 1), None jika tidak ada"""
+    levels = pattern.split('/')
+    return levels.index('+') if '+' in levels else None
+
+def site_code_from_topic(topic, pattern=None):
+    """Ambil site code dari topic MQTT sesuai wildcard di MQTT_TOPIC"""
+    if not topic:
+        return None
+    index = topic_site_index(pattern or settings.MQTT_TOPIC)
+    if index is None:
+        return None
+    levels = topic.split('/')
+    return levels[index] if index < len(levels) else None
+
+def site_code_from_payload(payload):
+    """Fallback untuk topic tanpa wildcard: site_id atau site_name dari payload"""
+    return str(payload.get('site_id') or payload.get('site_name') or DEFAULT_SITE_CODE)
+
+def site_attributes(payload):
+    """Atribut site yang ada di payload (key yang tidak ada / null diabaikan)"""
+    attributes = {}
+    for name, key, coerce in SITE_SPEC:
+        value = payload.get(key)
+        if value is not None:
+            attributes[name] = coerce(value)
+    return attributes
+
+class SiteCache:
+    """In-memory cache code -> Site"""
+
+    def __init__(self):
+        self._sites = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, code, payload):
+        """Return Site untuk code, buat atau update jika perlu"""
+        attributes = site_attributes(payload)
+        site = self._sites.get(code)
+        if site is not None and all(getattr(site, name) == value for name, value in attributes.items()):
+            return site
+
+        with self._lock:
+            site, _ = Site.objects.update_or_create(code=code, defaults=attributes)
+            self._sites[code] = site
+        return site
+
+    def get(self, code):
+        """Site dari cache (atau database), None jika tidak ada"""
+        site = self._sites.get(code)
+        if site is None:
+            site = Site.objects.filter(code=code).first()
+            if site is not None:
+                self._sites[code] = site
+        return site
+
+    def clear(self):
+        with self._lock:
+            self._sites.clear()
+
+site_cache = SiteCache()
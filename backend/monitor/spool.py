@@ -0,0 +1,380 @@
+"""
+Spool lokal (append-only) untuk ingestion MQTT
+
+Ketika database gagal menyimpan batch atau work queue penuh, payload
+ditulis ke file spool. Thread replay mengirim ulang isi spool ke database
+dengan bulk insert setelah database kembali normal. Insert mengabaikan
+duplikat (site, timestamp) sehingga replay ulang setelah crash aman.
+
+Format file: header '<4sH' (magic RSPL, versi format) diikuti record.
+Format record (versi 2): header '<HIIQ' (panjang topic, panjang payload,
+CRC32 topic + payload, waktu tulis dalam ms) diikuti topic MQTT dan payload
+JSON MQTT mentah. File versi 1 (tanpa file header, record '<IIQ' tanpa
+topic) dikonversi ke versi 2 saat spool dibuka.
+"""
+import json
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection
+from .decoder import decode_message, encode_payload
+from .ingest import records_saved
+from .models import RectifierData
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'RSPL'
+VERSION = 2
+FILE_HEADER = struct.Struct('<4sH')
+HEADER = struct.Struct('<HIIQ')
+# Version 1 (no file header): payload length, CRC32 payload, written ms
+HEADER_V1 = struct.Struct('<IIQ')
+
+def pack_record(topic, raw, written_ms):
+    """Record versi 2 (header + topic + payload) sebagai bytes"""
+    body = topic + raw
+    return HEADER.pack(len(topic), len(raw), zlib.crc32(body), written_ms) + body
+
+class Spool:
+    """File spool dengan replay ke database"""
+    FSYNC_ALWAYS = 'always'
+    FSYNC_INTERVAL = 'interval'
+    FSYNC_NEVER = 'never'
+    FSYNC_POLICIES = (FSYNC_ALWAYS, FSYNC_INTERVAL, FSYNC_NEVER)
+
+    def __init__(self, path, fsync=FSYNC_INTERVAL, fsync_interval=1.0,
+                 replay_batch=500, replay_rate=2000, retry_interval=5.0):
+        if fsync not in self.FSYNC_POLICIES:
+            raise ValueError(f"Unknown spool fsync policy '{fsync}', expected one of {', '.join(self.FSYNC_POLICIES)}")
+
+        self.path = str(path)
+        self.offset_path = self.path + '.offset'
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.replay_batch = max(1, int(replay_batch))
+        self.replay_rate = replay_rate
+        self.retry_interval = retry_interval
+
+        self._lock = threading.Lock()  # Protects the file, offsets and counters
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._last_fsync = time.monotonic()
+
+        # Counters
+        self.appended = 0
+        self.replayed = 0
+        self.replay_failures = 0
+        self.discarded = 0
+        self.replay_seconds = 0.0
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._read_offset = self._load_offset()
+        self._open_format()
+        self._pending, self._oldest_ms = self._recover()
+        self._file = open(self.path, 'ab')
+
+    # Write path
+
+    def append(self, item):
+        """Tulis satu (topic, payload) MQTT mentah ke spool"""
+        topic, raw = item
+        topic = (topic or '').encode()
+        if isinstance(raw, str):
+            raw = raw.encode()
+        now_ms = int(time.time() * 1000)
+        record = pack_record(topic, raw, now_ms)
+
+        with self._lock:
+            self._file.write(record)
+            self._file.flush()
+            self._sync_locked()
+            self._pending += 1
+            self.appended += 1
+            if self._oldest_ms is None:
+                self._oldest_ms = now_ms
+        self._wakeup.set()
+
+    def append_records(self, records):
+        """Tulis RectifierData (belum disimpan) ke spool, misalnya batch yang gagal disimpan"""
+        for record in records:
+            # Site code travels in the payload (site_id), no topic needed
+            self.append((None, json.dumps(encode_payload(record))))
+
+    def pending(self):
+        with self._lock:
+            return self._pending
+
+    # Replay
+
+    def start(self):
+        """Start thread replay"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='spool-replay', daemon=True)
+            self._thread.start()
+        return self
+
+    def replay_once(self):
+        """
+        Kirim satu batch dari spool ke database.
+        Return jumlah record yang diproses, atau None jika database masih gagal.
+        """
+        with self._lock:
+            self._file.flush()
+            start = self._read_offset
+            payloads, end = self._read_batch(start, self.replay_batch)
+        if not payloads:
+            return 0
+
+        records = []
+        for topic, raw in payloads:
+            try:
+                records.append(decode_message(raw, topic))
+            except DatabaseError as e:
+                # Site lookup needs the database - keep the batch for the next attempt
+                self.replay_failures += 1
+                logger.warning(f"Spool replay failed, retrying in {self.retry_interval}s: {e}")
+                close_old_connections()
+                return None
+            except (ValueError, TypeError) as e:
+                self.discarded += 1
+                logger.error(f"✗ Discarding unreadable spool record: {e}")
+
+        started = time.perf_counter()
+        try:
+            RectifierData.bulk_insert_ignore_duplicates(records, batch_size=self.replay_batch)
+        except Exception as e:
+            self.replay_failures += 1
+            logger.warning(f"Spool replay failed, retrying in {self.retry_interval}s: {e}")
+            close_old_connections()
+            return None
+        try:
+            records_saved(records)
+        except Exception as e:
+            # Rows are saved, the offset must still move past them
+            logger.error(f"✗ Error in replay callback: {e}")
+
+        with self._lock:
+            self.replay_seconds += time.perf_counter() - started
+            self.replayed += len(records)
+            self._pending -= len(payloads)
+            self._read_offset = end
+            if self._read_offset >= self._file.tell():
+                # Everything replayed - start a fresh file
+                self._file.truncate(0)
+                self._file.seek(0)
+                self._file.write(FILE_HEADER.pack(MAGIC, VERSION))
+                self._file.flush()
+                self._read_offset = FILE_HEADER.size
+                self._pending = 0
+                self._oldest_ms = None
+            else:
+                self._oldest_ms = self._peek_written_at(self._read_offset)
+            self._save_offset()
+
+        return len(payloads)
+
+    # Observability
+
+    def stats(self):
+        """Statistik spool"""
+        with self._lock:
+            size = self._file.tell()
+            oldest_ms = self._oldest_ms
+            pending = self._pending
+        return {
+            'size_bytes': size,
+            'records_pending': pending,
+            'oldest_age_seconds': (time.time() - oldest_ms / 1000) if oldest_ms else 0.0,
+            'appended': self.appended,
+            'replayed': self.replayed,
+            'replay_failures': self.replay_failures,
+            'discarded': self.discarded,
+            'replay_rows_per_second': (self.replayed / self.replay_seconds) if self.replay_seconds else 0.0,
+        }
+
+    def log_stats(self):
+        stats = self.stats()
+        logger.info(
+            f"Spool stats - pending: {stats['records_pending']} "
+            f"size: {stats['size_bytes']} bytes "
+            f"oldest: {stats['oldest_age_seconds']:.0f}s "
+            f"replayed: {stats['replayed']} "
+            f"replay rate: {stats['replay_rows_per_second']:.1f} rows/s "
+            f"failures: {stats['replay_failures']}"
+        )
+
+    def close(self):
+        """Stop thread replay, sync dan tutup file (sisa spool di-replay saat start berikutnya)"""
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        with self._lock:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+
+    # Internals
+
+    def _run(self):
+        while not self._stop.is_set():
+            if not self.pending():
+                self._wakeup.wait(self.retry_interval)
+                self._wakeup.clear()
+                continue
+
+            started = time.monotonic()
+            try:
+                processed = self.replay_once()
+            except Exception as e:
+                # Keep the thread alive, the records stay in the spool
+                self.replay_failures += 1
+                logger.error(f"✗ Spool replay error, retrying in {self.retry_interval}s: {e}")
+                close_old_connections()
+                processed = None
+            if not processed:
+                self._stop.wait(self.retry_interval)
+            elif self.replay_rate:
+                # Throttle replay so live ingestion keeps most of the database
+                self._stop.wait(max(processed / self.replay_rate - (time.monotonic() - started), 0))
+
+        # Each thread owns its own DB connection
+        connection.close()
+
+    def _sync_locked(self):
+        if self.fsync == self.FSYNC_ALWAYS:
+            os.fsync(self._file.fileno())
+        elif self.fsync == self.FSYNC_INTERVAL and time.monotonic() - self._last_fsync >= self.fsync_interval:
+            os.fsync(self._file.fileno())
+            self._last_fsync = time.monotonic()
+
+    def _read_batch(self, offset, limit):
+        """Baca maksimal limit record mulai dari offset, return ([(topic, payload)], offset_akhir)"""
+        payloads = []
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            while len(payloads) < limit:
+                header = f.read(HEADER.size)
+                if len(header) < HEADER.size:
+                    break
+                topic_length, length, crc, _ = HEADER.unpack(header)
+                body = f.read(topic_length + length)
+                if len(body) < topic_length + length or zlib.crc32(body) != crc:
+                    break
+                payloads.append((body[:topic_length].decode() or None, body[topic_length:]))
+                offset = f.tell()
+        return payloads, offset
+
+    def _peek_written_at(self, offset):
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            header = f.read(HEADER.size)
+        if len(header) < HEADER.size:
+            return None
+        return HEADER.unpack(header)[3]
+
+    def _open_format(self):
+        """Pastikan file spool ada dengan file header versi sekarang, konversi file versi 1"""
+        head = b''
+        if os.path.exists(self.path):
+            with open(self.path, 'rb') as f:
+                head = f.read(FILE_HEADER.size)
+
+        if len(head) == FILE_HEADER.size and head[:len(MAGIC)] == MAGIC:
+            version = FILE_HEADER.unpack(head)[1]
+            if version != VERSION:
+                raise ValueError(f"Unsupported spool format version {version} in {self.path}")
+        elif FILE_HEADER.pack(MAGIC, VERSION).startswith(head):
+            # New file, or torn file header of an empty spool
+            with open(self.path, 'wb') as f:
+                f.write(FILE_HEADER.pack(MAGIC, VERSION))
+            self._read_offset = FILE_HEADER.size
+        else:
+            self._upgrade_v1()
+
+        if not FILE_HEADER.size <= self._read_offset <= os.path.getsize(self.path):
+            self._read_offset = FILE_HEADER.size
+
+    def _upgrade_v1(self):
+        """Tulis ulang record versi 1 yang belum di-replay ke file versi 2"""
+        size = os.path.getsize(self.path)
+        offset = self._read_offset if self._read_offset <= size else 0
+        tmp_path = self.path + '.upgrade'
+        count = 0
+        with open(self.path, 'rb') as source, open(tmp_path, 'wb') as target:
+            target.write(FILE_HEADER.pack(MAGIC, VERSION))
+            source.seek(offset)
+            while True:
+                header = source.read(HEADER_V1.size)
+                if len(header) < HEADER_V1.size:
+                    break
+                length, crc, written_ms = HEADER_V1.unpack(header)
+                raw = source.read(length)
+                if len(raw) < length or zlib.crc32(raw) != crc:
+                    break
+                target.write(pack_record(b'', raw, written_ms))
+                count += 1
+            target.flush()
+            os.fsync(target.fileno())
+
+        # Without an offset file a crash before the replace replays the
+        # version 1 file from the start, duplicates are ignored on insert
+        if os.path.exists(self.offset_path):
+            os.remove(self.offset_path)
+        os.replace(tmp_path, self.path)
+        self._read_offset = FILE_HEADER.size
+        logger.info(f"Upgraded spool {self.path} to format version {VERSION} ({count} records)")
+
+    def _recover(self):
+        """Hitung record yang belum di-replay dan buang record terakhir yang tidak lengkap"""
+
+        pending = 0
+        oldest_ms = self._peek_written_at(self._read_offset)
+        end = self._read_offset
+        while True:
+            payloads, new_end = self._read_batch(end, 10000)
+            if not payloads:
+                break
+            pending += len(payloads)
+            end = new_end
+
+        if end < os.path.getsize(self.path):
+            logger.warning(f"Truncating incomplete spool record at byte {end}")
+            with open(self.path, 'r+b') as f:
+                f.truncate(end)
+
+        if pending:
+            logger.info(f"Spool has {pending} records waiting for replay")
+        return pending, (oldest_ms if pending else None)
+
+    def _load_offset(self):
+        try:
+            with open(self.offset_path) as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _save_offset(self):
+        tmp_path = self.offset_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(str(self._read_offset))
+        os.replace(tmp_path, self.offset_path)
+
+def create_spool():
+    """Spool dengan konfigurasi dari settings, None jika spool dinonaktifkan"""
+    path = getattr(settings, 'MQTT_SPOOL_PATH', '')
+    if not path:
+        return None
+    return Spool(
+        path,
+        fsync=getattr(settings, 'MQTT_SPOOL_FSYNC', Spool.FSYNC_INTERVAL),
+        fsync_interval=getattr(settings, 'MQTT_SPOOL_FSYNC_INTERVAL', 1.0),
+        replay_batch=getattr(settings, 'MQTT_BATCH_SIZE', 500),
+        replay_rate=getattr(settings, 'MQTT_SPOOL_REPLAY_RATE', 2000),
+    )
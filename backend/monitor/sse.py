@@ -0,0 +1,116 @@
+"""
+Server-Sent Events: ring event terbaru per site dan keepalive
+
+DashboardStreamConsumer (consumers.py) menerima rectifier_update dari
+channel layer seperti RectifierConsumer. Frame SSE setiap update dibentuk
+sekali per proses dan disimpan di EventRing (SSE_RING_SIZE event terakhir
+per site), dipakai bersama oleh semua koneksi dan untuk resume dengan
+Last-Event-ID. Id event adalah seq dashboard (timestamp row), sama di semua
+proses, jadi resume tetap benar jika client tersambung ke worker lain (ring
+di worker itu saja yang mungkin tidak berisi id tersebut -> snapshot lengkap).
+"""
+import asyncio
+import logging
+from collections import deque
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Client reconnect delay (EventSource default is ~3 s), same as the WebSocket reconnect in the frontend
+RETRY_MS = 5000
+
+KEEPALIVE = b': keepalive\n\n'
+
+def frame(seq, text):
+    """Frame SSE untuk satu message (teks JSON satu baris dari broadcast.message)"""
+    if seq is None:
+        return f'data: {text}\n\n'.encode()
+    return f'id: {seq}\ndata: {text}\n\n'.encode()
+
+def cors_headers(scope):
+    """Header CORS untuk stream (consumer channels tidak melewati middleware django-cors-headers)"""
+    origin = dict(scope.get('headers', [])).get(b'origin')
+    if origin is None:
+        return []
+    allowed = getattr(settings, 'CORS_ALLOW_ALL_ORIGINS', False) or origin.decode() in getattr(settings, 'CORS_ALLOWED_ORIGINS', ())
+    if not allowed:
+        return []
+    headers = [(b'Access-Control-Allow-Origin', origin), (b'Vary', b'Origin')]
+    if getattr(settings, 'CORS_ALLOW_CREDENTIALS', False):
+        headers.append((b'Access-Control-Allow-Credentials', b'true'))
+    return headers
+
+def parse_event_id(value):
+    """Last-Event-ID -> seq (int), None jika kosong / tidak valid"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+class EventRing:
+    """Event terakhir per site (None = semua site): deque (seq, frame) urut seq"""
+
+    def __init__(self, size):
+        self.size = size
+        self.events = {}
+
+    def add(self, site_code, seq, text):
+        """
+        Simpan event dan kembalikan frame-nya. Event yang sudah ada (diterima
+        oleh koneksi lain) tidak di-encode ulang; event yang lebih lama dari
+        event terakhir dan tidak ada di ring -> None (client sudah punya yang lebih baru)
+        """
+        events = self.events.get(site_code)
+        if events is None:
+            events = self.events[site_code] = deque(maxlen=self.size)
+        if events and seq <= events[-1][0]:
+            for event_seq, event_frame in reversed(events):
+                if event_seq == seq:
+                    return event_frame
+                if event_seq < seq:
+                    break
+            return None
+        event_frame = frame(seq, text)
+        events.append((seq, event_frame))
+        return event_frame
+
+    def since(self, site_code, seq):
+        """
+        [(seq, frame)] setelah seq, None jika seq tidak ada di ring (terlalu
+        lama atau dari proses lain) sehingga perlu snapshot lengkap
+        """
+        events = self.events.get(site_code, ())
+        for index, (event_seq, _) in enumerate(events):
+            if event_seq == seq:
+                return list(events)[index + 1:]
+        return None
+
+    def clear(self):
+        self.events.clear()
+
+ring = EventRing(getattr(settings, 'SSE_RING_SIZE', 50))
+
+# Open streams, pinged by one keepalive task per process instead of a timer per connection
+_streams = set()
+_keepalive_task = None
+
+def register(consumer):
+    global _keepalive_task
+    _streams.add(consumer)
+    loop = asyncio.get_running_loop()
+    if _keepalive_task is None or _keepalive_task.done() or _keepalive_task.get_loop() is not loop:
+        _keepalive_task = loop.create_task(_keepalive())
+
+def unregister(consumer):
+    _streams.discard(consumer)
+
+async def _keepalive():
+    """Comment SSE ke semua stream setiap SSE_KEEPALIVE detik agar proxy tidak menutup koneksi idle"""
+    while _streams:
+        await asyncio.sleep(getattr(settings, 'SSE_KEEPALIVE', 15))
+        for consumer in list(_streams):
+            try:
+                await consumer.send_body(KEEPALIVE, more_body=True)
+            except Exception as e:
+                logger.debug(f"SSE keepalive failed: {e}")
+                _streams.discard(consumer)
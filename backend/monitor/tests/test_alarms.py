@@ -0,0 +1,151 @@
+import random
+from datetime import timedelta
+from unittest import skipUnless
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from monitor.alarms import sites_in_alarm
+from monitor.models import ALARM_CONDITIONS, RectifierData, Site
+
+URL = '/api/sites/alarms/'
+
+class AlarmTestCase(TestCase):
+
+    def setUp(self):
+        # Conditional GET reads the latest version from the cache
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def seed(self, code, *rows):
+        """Row per (timestamp, {field: value}) untuk site code, return Site"""
+        site = Site.objects.get_or_create(code=code, defaults={'site_name': code.upper()})[0]
+        RectifierData.objects.bulk_create([RectifierData(site=site, timestamp=timestamp, **fields) for timestamp, fields in rows])
+        return site
+
+class AlarmConditionTests(AlarmTestCase):
+
+    def test_predicates(self):
+        self.seed('site-a', *[
+            (1000, {}),
+            (2000, {'status_realtime': 'Minor'}),
+            (3000, {'status_realtime': 'Major', 'door_cabinet': 'Open'}),
+            (4000, {'battery_stolen': 'Open'}),
+            (5000, {'door_cabinet': 'Close', 'battery_stolen': 'Close'}),
+        ])
+        matching = {
+            name: sorted(RectifierData.objects.filter(condition).values_list('timestamp', flat=True))
+            for name, condition in ALARM_CONDITIONS.items()
+        }
+        self.assertEqual(matching, {'status': [2000, 3000], 'door': [3000], 'battery': [4000]})
+
+class AlarmEndpointTests(AlarmTestCase):
+
+    def test_no_data(self):
+        self.assertEqual(self.client.get(URL).json(), [])
+
+    def test_only_sites_whose_newest_row_is_abnormal(self):
+        self.seed('site-a', (1000, {}), (2000, {'status_realtime': 'Major'}))
+        # Abnormal before, normal now
+        self.seed('site-b', (1000, {'door_cabinet': 'Open'}), (2000, {}))
+        self.seed('site-c', (1000, {}), (3000, {'door_cabinet': 'Open', 'battery_stolen': 'Open'}))
+        self.seed('site-d', (1000, {}))
+
+        response = self.client.get(URL)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(item['site_code'], item['timestamp'], item['alarms']) for item in response.json()],
+            [('site-a', 2000, ['status']), ('site-c', 3000, ['door', 'battery'])],
+        )
+        self.assertEqual(response.json()[0]['site_name'], 'SITE-A')
+        self.assertEqual(response.json()[0]['status_realtime'], 'Major')
+
+    def test_matches_python_evaluation(self):
+        random.seed(3)
+        states = ({}, {'status_realtime': 'Major'}, {'door_cabinet': 'Open'}, {'battery_stolen': 'Open'})
+        for index in range(20):
+            self.seed(f'site-{index:02}', *[(timestamp, random.choice(states)) for timestamp in range(1000, 6000, 1000)])
+
+        expected = []
+        for site in Site.objects.order_by('code'):
+            newest = site.data.order_by('-timestamp')[0]
+            names = [
+                name for name, condition in ALARM_CONDITIONS.items()
+                if RectifierData.objects.filter(condition, pk=newest.pk).exists()
+            ]
+            if names:
+                expected.append((site.code, names))
+        self.assertEqual([(record.site.code, names) for record, names in sites_in_alarm()], expected)
+
+    def test_conditional_get(self):
+        self.seed('site-a', (1000, {'status_realtime': 'Major'}))
+        etag = self.client.get(URL)['ETag']
+        self.assertEqual(self.client.get(URL, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+class AlarmIndexPlanTests(AlarmTestCase):
+    """EXPLAIN: query history, latest dan alarm memakai index yang dimaksud"""
+
+    @classmethod
+    def setUpTestData(cls):
+        random.seed(1)
+        sites = [Site.objects.create(code=f'site-{index}') for index in range(20)]
+        rows = []
+        for site in sites:
+            for timestamp in range(0, 1000 * 2000, 2000):
+                fields = {}
+                # ~0.5% abnormal status, a few open doors / stolen batteries
+                if random.random() < 0.005:
+                    fields['status_realtime'] = 'Major'
+                if random.random() < 0.001:
+                    fields[random.choice(('door_cabinet', 'battery_stolen'))] = 'Open'
+                rows.append(RectifierData(site=site, timestamp=timestamp, **fields))
+        RectifierData.objects.bulk_create(rows, batch_size=2000)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        cls.site = sites[0]
+
+    def assertUsesIndex(self, queryset, index):
+        plan = queryset.explain()
+        self.assertIn(index, plan, f"expected {index}, plan:\n{plan}")
+
+    def unique_index(self):
+        return 'unique_site_timestamp' if connection.vendor == 'postgresql' else 'sqlite_autoindex_monitor_rectifierdata_1'
+
+    def test_history_page_one_site(self):
+        self.assertUsesIndex(
+            RectifierData.objects.filter(site=self.site).order_by('-timestamp', '-id')[:100], self.unique_index(),
+        )
+
+    def test_latest_row_one_site(self):
+        self.assertUsesIndex(
+            RectifierData.objects.filter(site=self.site).order_by('-timestamp').values('timestamp')[:1],
+            self.unique_index(),
+        )
+
+    def test_newest_alarm_one_site(self):
+        for name, condition in ALARM_CONDITIONS.items():
+            with self.subTest(name):
+                self.assertUsesIndex(
+                    RectifierData.objects.filter(condition, site=self.site).order_by('-timestamp').values('timestamp')[:1],
+                    f'rectifier_alarm_{name}_idx',
+                )
+
+    def test_admin_alarm_filter(self):
+        self.assertUsesIndex(
+            RectifierData.objects.filter(ALARM_CONDITIONS['door']).order_by('-timestamp')[:100],
+            'rectifier_alarm_door_idx',
+        )
+
+    @skipUnless(connection.vendor == 'postgresql', 'BRIN index on created_at only exists on PostgreSQL')
+    def test_admin_created_at_count(self):
+        # bulk_create gives every row about the same created_at, spread it like real ingestion
+        table = RectifierData._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(f'UPDATE {table} SET created_at = to_timestamp(1700000000 + "timestamp" / 1000.0)')
+            cursor.execute(f'ANALYZE {table}')
+            # The seeded table is small enough that a seq scan can win, check the BRIN index serves the filter
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        newest = RectifierData.objects.order_by('-timestamp')[0].created_at
+        self.assertUsesIndex(
+            RectifierData.objects.filter(created_at__gte=newest - timedelta(seconds=30)).values('pk'),
+            'rectifier_created_brin',
+        )
@@ -0,0 +1,61 @@
+from django.core.cache import cache
+from django.test import TestCase
+from monitor.ingest import records_saved
+from monitor.models import RectifierData, Site
+
+ENDPOINTS = ('/api/rectifier/latest/', '/api/rectifier/dashboard/', '/api/sites/alarms/')
+
+class ConditionalGetTests(TestCase):
+    """ETag / Last-Modified dari version (timestamp row terbaru) di cache state terbaru"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.sites = {code: Site.objects.create(code=code) for code in ('site-a', 'site-b')}
+
+    def ingest(self, code, timestamp):
+        """Simpan satu row seperti ingestion (insert + records_saved)"""
+        record = RectifierData(site=self.sites[code], timestamp=timestamp, status_realtime='Major')
+        RectifierData.bulk_insert_ignore_duplicates([record])
+        records_saved([record])
+
+    def test_matching_etag_is_not_modified(self):
+        self.ingest('site-a', 1000)
+        for url in ENDPOINTS:
+            with self.subTest(url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response['ETag'], '"1000"')
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='"999"').status_code, 200)
+
+    def test_if_modified_since(self):
+        self.ingest('site-a', 1_700_000_000_000)
+        for url in ENDPOINTS:
+            with self.subTest(url):
+                last_modified = self.client.get(url)['Last-Modified']
+                self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+                self.assertEqual(
+                    self.client.get(url, HTTP_IF_MODIFIED_SINCE='Mon, 13 Nov 2023 00:00:00 GMT').status_code, 200,
+                )
+
+    def test_etag_changes_after_ingest(self):
+        self.ingest('site-a', 1000)
+        for url in ENDPOINTS:
+            etag = self.client.get(url)['ETag']
+            self.ingest('site-a', 2000 + ENDPOINTS.index(url))
+            with self.subTest(url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response['ETag'], etag)
+
+    def test_per_site_etag(self):
+        self.ingest('site-a', 1000)
+        for url in ('/api/rectifier/latest/?site=site-a', '/api/rectifier/dashboard/?site=site-a'):
+            etag = self.client.get(url)['ETag']
+            with self.subTest(url):
+                # Another site does not invalidate this site
+                self.ingest('site-b', 5000 + len(url))
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+                self.ingest('site-a', 6000 + len(url))
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
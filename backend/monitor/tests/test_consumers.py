@@ -0,0 +1,188 @@
+import asyncio
+import json
+from unittest import mock
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from channels.testing import ApplicationCommunicator, WebsocketCommunicator
+from django.core.cache import cache
+from django.test import TransactionTestCase, override_settings
+from monitor import broadcast, sse
+from monitor.consumers import DashboardStreamConsumer, RectifierConsumer
+from monitor.ingest import records_saved
+from monitor.models import RectifierData, Site
+from monitor.sites import site_cache
+
+@database_sync_to_async
+def ingest(code, timestamp, vdc_output=48.0):
+    """Simpan satu row seperti ingestion (insert + records_saved -> broadcast)"""
+    record = RectifierData(site=Site.objects.get(code=code), timestamp=timestamp, vdc_output=vdc_output)
+    RectifierData.bulk_insert_ignore_duplicates([record])
+    records_saved([record])
+
+def apply_patch(data, patch):
+    """Terapkan patch [[path, value], ...] dari rectifier_delta (sama dengan applyPatch di frontend)"""
+    for path, value in patch:
+        if not path:
+            data = value
+            continue
+        target = data
+        for key in path[:-1]:
+            target = target[key]
+        target[path[-1]] = value
+    return data
+
+@override_settings(WS_HISTORY_POINTS=0)
+class RectifierConsumerTests(TransactionTestCase):
+    """WebSocket consumer lewat WebsocketCommunicator dan in-memory channel layer"""
+
+    def setUp(self):
+        cache.clear()
+        site_cache.clear()
+        broadcast._published.clear()
+        self.addCleanup(cache.clear)
+        self.addCleanup(site_cache.clear)
+        for code in ('site-a', 'site-b'):
+            Site.objects.create(code=code)
+
+    async def connect(self, query):
+        communicator = WebsocketCommunicator(RectifierConsumer.as_asgi(), f'/ws/rectifier/?{query}')
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+    async def receive(self, communicator):
+        return json.loads(await communicator.receive_from(timeout=3))
+
+    async def update(self, code, n):
+        """rectifier_update seperti dari producer, dengan nomor urut agar yang terbaru dikenali"""
+        text = json.dumps({'type': 'rectifier_update', 'site': code, 'n': n})
+        await get_channel_layer().group_send(
+            broadcast.site_group(code), {'type': 'rectifier_update', 'site': code, 'seq': None, 'text': text},
+        )
+
+    async def test_burst_is_conflated_to_newest_update_per_site(self):
+        for query in ('site=site-a&rate=1', 'site=site-a&rate=1&ack=1'):
+            with self.subTest(query):
+                communicator = await self.connect(query)
+                self.assertEqual((await self.receive(communicator))['type'], 'initial_data')
+                await communicator.send_json_to({'type': 'subscribe', 'sites': ['site-b']})
+                self.assertEqual((await self.receive(communicator))['sites'], ['site-a', 'site-b'])
+
+                # The first update goes out at once and starts the 1 s interval
+                await self.update('site-a', -1)
+                self.assertEqual((await self.receive(communicator))['n'], -1)
+                # 10 updates per site within half the interval: 10x the negotiated rate
+                for n in range(10):
+                    for code in ('site-a', 'site-b'):
+                        await self.update(code, n)
+                    await asyncio.sleep(0.05)
+
+                received = [await self.receive(communicator) for _ in range(2)]
+                self.assertEqual({(event['site'], event['n']) for event in received}, {('site-a', 9), ('site-b', 9)})
+                self.assertTrue(await communicator.receive_nothing(timeout=1.2))
+                await communicator.disconnect()
+
+    async def test_v2_keyframe_then_delta(self):
+        await ingest('site-a', 1000, 48.0)
+        v1 = await self.connect('site=site-a')
+        v2 = await self.connect('site=site-a&v=2')
+        initial = await self.receive(v2)
+        self.assertEqual((initial['type'], initial['seq']), ('initial_data', 1000))
+        self.assertIsNotNone(initial['data'])
+        await self.receive(v1)
+
+        await ingest('site-a', 2000, 52.5)
+        full = await self.receive(v1)
+        delta = await self.receive(v2)
+        # v1 clients always get the full dashboard
+        self.assertEqual((full['type'], full['seq']), ('rectifier_update', 2000))
+        self.assertEqual((delta['type'], delta['seq'], delta['base']), ('rectifier_delta', 2000, 1000))
+        self.assertNotIn('data', delta)
+        self.assertEqual(apply_patch(initial['data'], delta['patch']), full['data'])
+        for communicator in (v1, v2):
+            await communicator.disconnect()
+
+    async def test_v2_resync_sends_keyframe(self):
+        await ingest('site-a', 1000, 48.0)
+        communicator = await self.connect('site=site-a&v=2')
+        await self.receive(communicator)
+        await ingest('site-a', 2000, 52.5)
+        self.assertEqual((await self.receive(communicator))['type'], 'rectifier_delta')
+
+        await communicator.send_json_to({'type': 'resync', 'site': 'site-a'})
+        keyframe = await self.receive(communicator)
+        self.assertEqual((keyframe['type'], keyframe['site'], keyframe['seq']), ('latest_data', 'site-a', 2000))
+        self.assertEqual(keyframe['data']['rectifier']['vdcOutput'], 52.5)
+        await communicator.disconnect()
+
+    @override_settings(WS_KEYFRAME_INTERVAL=0)
+    async def test_v2_keyframe_interval(self):
+        await ingest('site-a', 1000, 48.0)
+        communicator = await self.connect('site=site-a&v=2')
+        await self.receive(communicator)
+        await ingest('site-a', 2000, 52.5)
+        update = await self.receive(communicator)
+        self.assertEqual((update['type'], update['seq']), ('rectifier_update', 2000))
+        await communicator.disconnect()
+
+class DashboardStreamConsumerTests(TransactionTestCase):
+    """Server-Sent Events: resume dengan Last-Event-ID dari ring"""
+
+    def setUp(self):
+        cache.clear()
+        site_cache.clear()
+        self.addCleanup(cache.clear)
+        self.addCleanup(site_cache.clear)
+        Site.objects.create(code='site-a')
+        # Two events per site, so older ids are evicted within the test
+        patcher = mock.patch('monitor.sse.ring', sse.EventRing(2))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def open_stream(self, last_event_id=None):
+        """(communicator, body pertama: retry + replay / snapshot)"""
+        headers = [] if last_event_id is None else [(b'last-event-id', str(last_event_id).encode())]
+        communicator = ApplicationCommunicator(DashboardStreamConsumer.as_asgi(), {
+            'type': 'http', 'method': 'GET', 'path': '/api/stream/rectifier/', 'query_string': b'site=site-a',
+            'headers': headers, 'http_version': '1.1', 'scheme': 'http',
+        })
+        await communicator.send_input({'type': 'http.request', 'body': b''})
+        start = await communicator.receive_output(3)
+        self.assertEqual((start['type'], start['status']), ('http.response.start', 200))
+        return communicator, (await communicator.receive_output(3))['body'].decode()
+
+    async def close_stream(self, communicator):
+        await communicator.send_input({'type': 'http.disconnect'})
+        await communicator.wait(3)
+
+    async def stream_updates(self, timestamps):
+        """Ingest dengan satu stream terbuka, jadi setiap event masuk ring"""
+        stream, _ = await self.open_stream()
+        for timestamp in timestamps:
+            await ingest('site-a', timestamp)
+            self.assertIn(f'id: {timestamp}\n', (await stream.receive_output(3))['body'].decode())
+        await self.close_stream(stream)
+
+    async def test_resume_inside_ring_replays_missed_events(self):
+        await ingest('site-a', 1000)
+        await self.stream_updates([2000, 3000])
+
+        stream, body = await self.open_stream(last_event_id=2000)
+        self.assertTrue(body.startswith(f'retry: {sse.RETRY_MS}\n\n'))
+        self.assertIn('id: 3000\n', body)
+        self.assertIn('"rectifier_update"', body)
+        # Nothing the client already had, and no snapshot on top of the replay
+        self.assertNotIn('id: 2000\n', body)
+        self.assertNotIn('"latest_data"', body)
+        await self.close_stream(stream)
+
+    async def test_evicted_id_gets_full_snapshot(self):
+        await ingest('site-a', 1000)
+        await self.stream_updates([2000, 3000, 4000])
+
+        stream, body = await self.open_stream(last_event_id=2000)
+        self.assertEqual(body.count('id: '), 1)
+        self.assertIn('id: 4000\n', body)
+        self.assertIn('"latest_data"', body)
+        self.assertNotIn('"rectifier_update"', body)
+        await self.close_stream(stream)
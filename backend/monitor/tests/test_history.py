@@ -0,0 +1,159 @@
+import shutil
+import tempfile
+from django.test import TestCase, override_settings
+from monitor.archive import DAY, FIELDS, archive_day
+from monitor.models import RectifierData, Site
+from monitor.pagination import encode_position
+from monitor.sites import site_cache
+
+URL = '/api/rectifier/history/'
+
+class HistoryTestCase(TestCase):
+    """Seeded table untuk history endpoint"""
+
+    def setUp(self):
+        site_cache.clear()
+        self.archive_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.archive_dir)
+        settings_override = override_settings(ARCHIVE_DIR=self.archive_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.site = Site.objects.create(code='site-a')
+
+    def seed(self, timestamps, site=None):
+        return RectifierData.objects.bulk_create(
+            [RectifierData(site=site or self.site, timestamp=timestamp) for timestamp in timestamps]
+        )
+
+    def get(self, url=URL, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def walk(self, **params):
+        """Ikuti 'next' sampai halaman terakhir, return semua (timestamp, id) dan jumlah halaman"""
+        page = self.get(**params)
+        rows, pages = [], 1
+        while True:
+            rows += [(row['timestamp'], row['id']) for row in page['results']]
+            if not page['next']:
+                return rows, pages
+            page = self.get(page['next'])
+            pages += 1
+
+    def expected(self, queryset=None):
+        queryset = queryset if queryset is not None else RectifierData.objects.all()
+        return list(queryset.order_by('-timestamp', '-id').values_list('timestamp', 'id'))
+
+class CursorPaginationTests(HistoryTestCase):
+
+    def test_pages_are_contiguous(self):
+        self.seed(range(1000, 26000, 1000))
+        rows, pages = self.walk(page_size=7)
+        self.assertEqual(pages, 4)
+        self.assertEqual(len(rows), len(set(rows)))
+        self.assertEqual(rows, self.expected())
+
+    def test_equal_timestamps_break_ties_on_id(self):
+        # (site, timestamp) is unique, equal timestamps come from different sites
+        for index in range(5):
+            site = Site.objects.create(code=f'site-{index}')
+            self.seed([5000] + ([4000] if index < 3 else []), site=site)
+        self.seed([6000])
+        rows, _ = self.walk(page_size=2)
+        self.assertEqual(rows, self.expected())
+        tied = [pk for timestamp, pk in rows if timestamp == 5000]
+        self.assertEqual(tied, sorted(tied, reverse=True))
+
+    def test_rows_inserted_after_first_page_do_not_shift_pages(self):
+        self.seed(range(1000, 11000, 1000))
+        first = self.get(page_size=4)
+        self.seed([20000, 30000])
+        rest, _ = self.walk(page_size=4, cursor=first['next'].split('cursor=')[1].split('&')[0])
+        rows = [(row['timestamp'], row['id']) for row in first['results']] + rest
+        self.assertEqual(rows, self.expected(RectifierData.objects.filter(timestamp__lte=10000)))
+
+    def test_invalid_cursor(self):
+        response = self.client.get(URL, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_page_size_is_capped(self):
+        self.seed(range(1000, 1100))
+        page = self.get(page_size=100000)
+        self.assertEqual(len(page['results']), 100)
+        self.assertIsNone(page['next'])
+
+class TimeRangeTests(HistoryTestCase):
+
+    def test_bounds_are_inclusive(self):
+        self.seed(range(1000, 6000, 1000))
+        rows, _ = self.walk(**{'from': 2000, 'to': 4000, 'page_size': 2})
+        self.assertEqual([timestamp for timestamp, _ in rows], [4000, 3000, 2000])
+
+    def test_iso_bounds(self):
+        self.seed([0, 1000, 2000])
+        rows, _ = self.walk(**{'from': '1970-01-01T00:00:01Z', 'to': '1970-01-01T00:00:01Z'})
+        self.assertEqual([timestamp for timestamp, _ in rows], [1000])
+
+    def test_invalid_bound(self):
+        response = self.client.get(URL, {'from': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_site_filter(self):
+        other = Site.objects.create(code='site-b')
+        self.seed([1000, 2000])
+        self.seed([1500], site=other)
+        rows, _ = self.walk(site='site-b')
+        self.assertEqual([timestamp for timestamp, _ in rows], [1500])
+
+class ArchivedHistoryTests(HistoryTestCase):
+
+    def archive(self, day):
+        """Arsipkan semua row site pada hari day lalu hapus dari table, seperti archive_history"""
+        rows = RectifierData.objects.filter(site=self.site, timestamp__gte=day, timestamp__lt=day + DAY)
+        values = list(rows.order_by('timestamp', 'id').values_list(*[field.attname for field in FIELDS]))
+        archive_day(self.site, day, values, directory=self.archive_dir)
+        expected = self.expected(rows)
+        rows.delete()
+        return expected
+
+    def test_archived_and_hot_rows_are_merged(self):
+        old_day = 10 * DAY
+        self.seed([old_day + offset for offset in range(0, 9000, 1000)])
+        # Same timestamp on another site: tie broken on id between hot rows and archive
+        self.seed([old_day + 4000], site=Site.objects.create(code='site-b'))
+        archived = self.archive(old_day)
+        self.seed([old_day + DAY + offset for offset in range(0, 6000, 1000)])
+        hot = self.expected()
+
+        rows, _ = self.walk(page_size=4)
+        self.assertEqual(rows, sorted(hot + archived, reverse=True))
+        self.assertEqual(len(rows), len(hot) + len(archived))
+
+    def test_archived_range_bounds(self):
+        old_day = 10 * DAY
+        self.seed([old_day + offset for offset in range(0, 9000, 1000)])
+        self.archive(old_day)
+        self.seed([old_day + DAY])
+        rows, _ = self.walk(**{'from': old_day + 3000, 'to': old_day + DAY, 'page_size': 3})
+        self.assertEqual(
+            [timestamp for timestamp, _ in rows],
+            [old_day + DAY] + [old_day + offset for offset in range(8000, 2000, -1000)],
+        )
+
+    def test_rows_left_by_interrupted_archive_run_are_not_duplicated(self):
+        old_day = 10 * DAY
+        self.seed([old_day + offset for offset in range(0, 5000, 1000)])
+        rows = RectifierData.objects.filter(timestamp__lt=old_day + DAY)
+        values = list(rows.order_by('timestamp', 'id').values_list(*[field.attname for field in FIELDS]))
+        # Archived, but the run stopped before the delete
+        archive_day(self.site, old_day, values, directory=self.archive_dir)
+        rows, _ = self.walk(page_size=2)
+        self.assertEqual(rows, self.expected())
+
+    def test_cursor_from_archived_page(self):
+        old_day = 10 * DAY
+        self.seed([old_day + offset for offset in range(0, 5000, 1000)])
+        archived = self.archive(old_day)
+        page = self.get(cursor=encode_position(archived[1]), page_size=10)
+        self.assertEqual([(row['timestamp'], row['id']) for row in page['results']], archived[2:])
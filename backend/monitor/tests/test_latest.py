@@ -0,0 +1,142 @@
+from unittest import mock
+import numpy as np
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from monitor import latest
+from monitor.models import RectifierData, Site
+
+REDIS_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://fake:6379/1'}}
+
+class FakeScript:
+    """Evaluasi COMPARE_AND_SET di Python (tidak ada server Redis di test)"""
+
+    def __init__(self, redis):
+        self.redis = redis
+
+    def __call__(self, keys, args):
+        written = []
+        for i in range(0, len(keys), 3):
+            current = self.redis.store.get(keys[i])
+            if int(args[i]) > (int(current) if current is not None else -1):
+                for offset in range(3):
+                    self.redis.store[keys[i + offset]] = self.redis.encode(args[i + offset])
+                written.append(i + 1)  # Lua indexes from 1
+        return written
+
+class FakePipeline:
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.queued = []
+
+    def mget(self, keys):
+        return self.redis.mget(keys)
+
+    def multi(self):
+        pass
+
+    def mset(self, mapping):
+        self.queued.append(mapping)
+
+    def execute(self):
+        for mapping in self.queued:
+            self.redis.mset(mapping)
+
+class FakeRedis:
+    """Subset redis.Redis yang dipakai RedisCacheClient dan monitor/latest.py"""
+
+    def __init__(self):
+        self.store = {}
+        self.scripts = 0
+        self.transactions = 0
+
+    @staticmethod
+    def encode(value):
+        return value if isinstance(value, bytes) else str(value).encode()
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def mget(self, keys):
+        return [self.store.get(key) for key in keys]
+
+    def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.store:
+            return False
+        self.store[key] = self.encode(value)
+        return True
+
+    def mset(self, mapping):
+        for key, value in mapping.items():
+            self.store[key] = self.encode(value)
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+    def register_script(self, source):
+        self.scripts += 1
+        return FakeScript(self)
+
+    def transaction(self, func, *watches):
+        self.transactions += 1
+        pipe = FakePipeline(self)
+        func(pipe)
+        pipe.execute()
+
+@override_settings(CACHES=REDIS_CACHES, WS_HISTORY_POINTS=5)
+class RedisLatestCacheTests(TestCase):
+
+    def setUp(self):
+        self.redis = FakeRedis()
+        patcher = mock.patch('django.core.cache.backends.redis.RedisCacheClient.get_client', return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.site = Site.objects.create(code='site-a')
+
+    def saved(self, timestamp, vdc_output=48.0):
+        record = RectifierData.objects.create(site=self.site, timestamp=timestamp, vdc_output=vdc_output)
+        record.site = self.site
+        return record
+
+    def test_backend_is_detected_through_the_proxy(self):
+        self.assertTrue(latest.is_redis())
+
+    def test_newer_row_is_written_with_the_script(self):
+        changed = latest.update_latest([self.saved(1000)])
+        self.assertEqual(set(changed), {'site-a', None})
+        self.assertEqual(self.redis.scripts, 1)
+        self.assertEqual(latest.get_version('site-a'), 1000)
+        self.assertEqual(latest.get_latest('site-a').timestamp, 1000)
+        self.assertEqual(latest.get_dashboard('site-a').version, 1000)
+
+    def test_older_row_does_not_overwrite(self):
+        latest.update_latest([self.saved(2000, vdc_output=50.0)])
+        # Another process wrote a newer version after this one read the cache
+        self.redis.store[cache.make_and_validate_key(latest.version_key('site-a'))] = b'3000'
+        self.assertNotIn('site-a', latest.update_latest([self.saved(2500)]))
+        self.assertEqual(latest.get_latest('site-a').vdc_output, 50.0)
+
+    def test_script_skips_only_the_stale_site(self):
+        other = Site.objects.create(code='site-b')
+        latest.update_latest([self.saved(5000)])
+        record = RectifierData.objects.create(site=other, timestamp=4000)
+        record.site = other
+        self.redis.store[cache.make_and_validate_key(latest.version_key('site-b'))] = b'1000'
+        changed = latest.compare_and_set({
+            'site-a': (self.saved(4500), latest.render_dashboard(record)),
+            'site-b': (record, latest.render_dashboard(record)),
+        })
+        self.assertEqual(changed, ['site-b'])
+        self.assertEqual(latest.get_version('site-a'), 5000)
+
+    def test_windows_are_merged_in_a_transaction(self):
+        first = self.saved(1000, vdc_output=1.0)
+        latest.update_latest([first])
+        window = latest.get_window('site-a')
+        self.assertEqual(window.rows, 1)
+
+        latest.update_latest([self.saved(3000, vdc_output=3.0), self.saved(2000, vdc_output=2.0)])
+        self.assertEqual(self.redis.transactions, 2)
+        timestamps, values = latest.window_arrays(latest.get_window('site-a'))
+        self.assertEqual(timestamps.tolist(), [1000, 2000, 3000])
+        np.testing.assert_array_equal(values[:, 0], [1.0, 2.0, 3.0])
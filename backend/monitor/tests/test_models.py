@@ -0,0 +1,59 @@
+from unittest import mock
+from django.db import connection
+from django.test import TestCase
+from monitor.models import RectifierData, RectifierRollup, Site
+from monitor.rollups import records_to_arrays, update_rollups
+
+class BulkInsertIgnoreDuplicatesTests(TestCase):
+
+    def setUp(self):
+        self.site = Site.objects.create(code='site-a')
+
+    def batch(self, *timestamps):
+        return [RectifierData(site=self.site, timestamp=timestamp, vdc_output=48.0) for timestamp in timestamps]
+
+    def test_new_rows_get_pk(self):
+        batch = self.batch(1000, 2000, 3000)
+        self.assertEqual(RectifierData.bulk_insert_ignore_duplicates(batch), 3)
+        self.assertEqual(
+            sorted(record.pk for record in batch),
+            sorted(RectifierData.objects.values_list('pk', flat=True)),
+        )
+
+    def test_redelivered_batch_inserts_nothing(self):
+        RectifierData.bulk_insert_ignore_duplicates(self.batch(1000, 2000))
+        redelivered = self.batch(1000, 2000)
+        self.assertEqual(RectifierData.bulk_insert_ignore_duplicates(redelivered), 0)
+        self.assertEqual([record.pk for record in redelivered], [None, None])
+        self.assertEqual(RectifierData.objects.count(), 2)
+
+    def test_mixed_batch_sets_pk_only_on_new_rows(self):
+        RectifierData.bulk_insert_ignore_duplicates(self.batch(2000))
+        batch = self.batch(1000, 2000, 3000)
+        self.assertEqual(RectifierData.bulk_insert_ignore_duplicates(batch, batch_size=2), 2)
+        self.assertIsNotNone(batch[0].pk)
+        self.assertIsNone(batch[1].pk)
+        self.assertIsNotNone(batch[2].pk)
+        self.assertEqual(
+            set(RectifierData.objects.filter(pk__in=[batch[0].pk, batch[2].pk]).values_list('timestamp', flat=True)),
+            {1000, 3000},
+        )
+
+    def test_duplicates_are_not_counted_in_rollups(self):
+        RectifierData.bulk_insert_ignore_duplicates(self.batch(1000))
+        batch = self.batch(1000, 2000)
+        RectifierData.bulk_insert_ignore_duplicates(batch)
+        _, timestamps, _ = records_to_arrays(batch)
+        self.assertEqual(timestamps.tolist(), [2000])
+
+        update_rollups(batch)
+        self.assertEqual(RectifierRollup.objects.get(resolution='1d').count, 1)
+
+    def test_without_returning_only_counts(self):
+        RectifierData.bulk_insert_ignore_duplicates(self.batch(1000))
+        batch = self.batch(1000, 2000)
+        features = type(connection.features)
+        with mock.patch.object(features, 'can_return_rows_from_bulk_insert', new_callable=mock.PropertyMock, return_value=False):
+            self.assertEqual(RectifierData.bulk_insert_ignore_duplicates(batch), 1)
+        self.assertEqual([record.pk for record in batch], [None, None])
+        self.assertEqual(RectifierData.objects.count(), 2)
@@ -0,0 +1,86 @@
+import asyncio
+import json
+import shutil
+import tempfile
+from types import SimpleNamespace
+from unittest import mock
+from django.db import OperationalError
+from django.test import TransactionTestCase, override_settings
+from monitor.ingest import IngestQueue
+from monitor.models import RectifierData, RectifierRollup
+from monitor.mqtt_service import AsyncMQTTService
+from monitor.sites import site_cache
+
+TOPIC = 'rectifier/site-a/data'
+
+def message(timestamp):
+    return SimpleNamespace(topic=TOPIC, payload=json.dumps({'ts': timestamp}).encode())
+
+@override_settings(MQTT_TOPIC='rectifier/+/data')
+class AsyncMQTTServiceTests(TransactionTestCase):
+
+    def setUp(self):
+        site_cache.clear()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.spool_path = f'{directory}/ingest.spool'
+
+    def service(self, **overrides):
+        """Service tanpa koneksi broker, event loop hanya untuk loop.time() dan Event"""
+        with override_settings(MQTT_SPOOL_PATH=self.spool_path, **overrides):
+            service = AsyncMQTTService()
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        service.loop = loop
+        service.has_items, service.batch_full = asyncio.Event(), asyncio.Event()
+        self.addCleanup(service.spool.close)
+        self.addCleanup(service.executor.shutdown)
+        return service
+
+    def spooled_timestamps(self, service):
+        payloads, _ = service.spool._read_batch(service.spool._read_offset, 100)
+        return [json.loads(raw)['ts'] for _, raw in payloads]
+
+    def test_drop_newest_spools_the_new_message(self):
+        service = self.service(MQTT_QUEUE_SIZE=2, MQTT_QUEUE_POLICY=IngestQueue.DROP_NEWEST)
+        for timestamp in (1000, 2000, 3000):
+            service.on_message(None, None, message(timestamp))
+        self.assertEqual([json.loads(raw)['ts'] for _, raw, _ in service.queue], [1000, 2000])
+        self.assertEqual(self.spooled_timestamps(service), [3000])
+
+    def test_drop_oldest_spools_the_oldest_message(self):
+        service = self.service(MQTT_QUEUE_SIZE=2, MQTT_QUEUE_POLICY=IngestQueue.DROP_OLDEST)
+        for timestamp in (1000, 2000, 3000):
+            service.on_message(None, None, message(timestamp))
+        self.assertEqual([json.loads(raw)['ts'] for _, raw, _ in service.queue], [2000, 3000])
+        self.assertEqual(self.spooled_timestamps(service), [1000])
+
+    def test_block_pauses_reading_without_dropping(self):
+        service = self.service(MQTT_QUEUE_SIZE=2, MQTT_QUEUE_POLICY=IngestQueue.BLOCK)
+        for timestamp in (1000, 2000):
+            service.on_message(None, None, message(timestamp))
+        self.assertTrue(service.paused)
+        self.assertEqual(service.spool.pending(), 0)
+
+    def test_failed_write_is_spooled_and_replayed(self):
+        service = self.service()
+        items = [(message(timestamp).topic, message(timestamp).payload, 0) for timestamp in (1000, 2000)]
+        with mock.patch.object(RectifierData, 'bulk_insert_ignore_duplicates', side_effect=OperationalError('database down')):
+            self.assertEqual(service.save_batch(items), ([], []))
+        self.assertEqual(service.spool.pending(), 2)
+
+        self.assertEqual(service.spool.replay_once(), 2)
+        self.assertEqual(sorted(RectifierData.objects.values_list('timestamp', flat=True)), [1000, 2000])
+        self.assertEqual(set(RectifierData.objects.values_list('site__code', flat=True)), {'site-a'})
+
+    def test_latest_cache_error_still_updates_rollups(self):
+        service = self.service()
+        for timestamp in (1000, 2000):
+            service.on_message(None, None, message(timestamp))
+        with mock.patch('monitor.mqtt_service.update_latest', side_effect=ConnectionError('cache down')):
+            self.assertEqual(service.loop.run_until_complete(service.flush()), 2)
+        self.assertEqual(RectifierRollup.objects.get(resolution='1d').count, 2)
+
+    def test_client_id_is_unique_per_instance(self):
+        first, second = self.service(), self.service()
+        self.assertNotEqual(first.client._client_id, second.client._client_id)
@@ -0,0 +1,63 @@
+from io import StringIO
+from unittest import mock
+from django.core.management import call_command
+from django.test import TestCase
+from monitor.models import RectifierData, RectifierRollup, Site
+from monitor.ingest import records_saved
+from monitor.rollups import RESOLUTIONS, update_rollups
+
+DAY = RESOLUTIONS['1d']
+HOUR = RESOLUTIONS['1h']
+
+class BackfillRollupsTests(TestCase):
+
+    def setUp(self):
+        self.site = Site.objects.create(code='site-a')
+        # Two days, one row every 10 minutes, vdc_output = minute of the day
+        self.day = 100 * DAY
+        self.rows = RectifierData.objects.bulk_create([
+            RectifierData(site=self.site, timestamp=self.day + minute * 60 * 1000, vdc_output=minute % 1440)
+            for minute in range(0, 2 * 1440, 10)
+        ])
+
+    def rollup(self, resolution, bucket):
+        return RectifierRollup.objects.get(site=self.site, resolution=resolution, bucket=bucket)
+
+    def backfill(self, *args):
+        call_command('backfill_rollups', *args, stdout=StringIO())
+
+    def test_matches_incremental_rollups(self):
+        update_rollups(self.rows)
+        incremental = list(RectifierRollup.objects.order_by('resolution', 'bucket').values())
+        RectifierRollup.objects.all().delete()
+        self.backfill()
+        backfilled = list(RectifierRollup.objects.order_by('resolution', 'bucket').values())
+        strip = lambda rows: [{key: value for key, value in row.items() if key != 'id'} for row in rows]
+        self.assertEqual(strip(backfilled), strip(incremental))
+
+    def test_to_in_the_middle_of_a_day_keeps_whole_buckets(self):
+        self.backfill()
+        # --to at 12:30 of the first day rebuilds that whole day, not just up to 12:30
+        self.backfill('--to', str(self.day + 12 * HOUR + 30 * 60 * 1000))
+
+        day = self.rollup('1d', self.day)
+        self.assertEqual(day.count, 144)
+        self.assertEqual(day.vdc_output_max, 1430)
+        self.assertEqual(day.last_timestamp, self.day + 1430 * 60 * 1000)
+        self.assertEqual(self.rollup('1h', self.day + 12 * HOUR).count, 6)
+        self.assertEqual(self.rollup('1d', self.day + DAY).count, 144)
+
+    def test_from_is_rounded_to_the_start_of_the_day(self):
+        self.backfill('--from', str(self.day + DAY + 5 * HOUR))
+        self.assertFalse(RectifierRollup.objects.filter(bucket__lt=self.day + DAY).exists())
+        self.assertEqual(self.rollup('1d', self.day + DAY).count, 144)
+
+class RecordsSavedTests(TestCase):
+
+    def test_rollups_do_not_depend_on_latest_cache(self):
+        site = Site.objects.create(code='site-a')
+        records = [RectifierData(site=site, timestamp=timestamp) for timestamp in (1000, 2000)]
+        RectifierData.bulk_insert_ignore_duplicates(records)
+        with mock.patch('monitor.ingest.update_latest', side_effect=ConnectionError('cache down')):
+            records_saved(records)
+        self.assertEqual(RectifierRollup.objects.get(site=site, resolution='1d', bucket=0).count, 2)
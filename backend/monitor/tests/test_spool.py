@@ -0,0 +1,109 @@
+import json
+import os
+import shutil
+import struct
+import tempfile
+import zlib
+from unittest import mock
+from django.db import OperationalError
+from django.test import TransactionTestCase
+from monitor.models import RectifierData, RectifierRollup, Site
+from monitor.sites import site_cache
+from monitor.spool import FILE_HEADER, MAGIC, VERSION, Spool
+
+def payload(timestamp, site='site-a'):
+    return json.dumps({'ts': timestamp, 'site_id': site})
+
+class SpoolReplayTests(TransactionTestCase):
+
+    def setUp(self):
+        site_cache.clear()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'ingest.spool')
+
+    def open_spool(self):
+        spool = Spool(self.path, fsync=Spool.FSYNC_NEVER)
+        self.addCleanup(spool.close)
+        return spool
+
+    def test_replay_saves_spooled_payloads(self):
+        spool = self.open_spool()
+        spool.append((None, payload(1000)))
+        spool.append(('rectifier/site-b/data', payload(2000)))
+        self.assertEqual(spool.replay_once(), 2)
+        self.assertEqual(spool.pending(), 0)
+        self.assertEqual(RectifierData.objects.count(), 2)
+
+    def test_callback_error_still_advances_offset(self):
+        spool = self.open_spool()
+        spool.append((None, payload(1000)))
+        with mock.patch('monitor.spool.records_saved', side_effect=RuntimeError('cache down')):
+            self.assertEqual(spool.replay_once(), 1)
+        self.assertEqual(spool.pending(), 0)
+        self.assertEqual(spool.replay_once(), 0)
+        self.assertEqual(RectifierData.objects.count(), 1)
+
+    def test_latest_cache_error_still_updates_rollups(self):
+        spool = self.open_spool()
+        spool.append((None, payload(1000)))
+        with mock.patch('monitor.ingest.update_latest', side_effect=ConnectionError('cache down')):
+            self.assertEqual(spool.replay_once(), 1)
+        self.assertEqual(RectifierRollup.objects.get(resolution='1d').count, 1)
+
+    def test_site_lookup_error_keeps_records(self):
+        spool = self.open_spool()
+        spool.append((None, payload(1000)))
+        with mock.patch.object(Site.objects, 'update_or_create', side_effect=OperationalError('database down')):
+            self.assertIsNone(spool.replay_once())
+        self.assertEqual(spool.pending(), 1)
+        self.assertEqual(spool.replay_once(), 1)
+        self.assertEqual(RectifierData.objects.count(), 1)
+
+class SpoolFormatTests(TransactionTestCase):
+
+    def setUp(self):
+        site_cache.clear()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'ingest.spool')
+
+    def write_v1(self, payloads, replayed=0):
+        """File spool versi 1 (user-005): record '<IIQ' tanpa topic, tanpa file header"""
+        offsets = [0]
+        with open(self.path, 'wb') as f:
+            for raw in payloads:
+                raw = raw.encode()
+                f.write(struct.pack('<IIQ', len(raw), zlib.crc32(raw), 1) + raw)
+                offsets.append(f.tell())
+        with open(self.path + '.offset', 'w') as f:
+            f.write(str(offsets[replayed]))
+
+    def test_new_file_has_header(self):
+        Spool(self.path).close()
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read(), FILE_HEADER.pack(MAGIC, VERSION))
+
+    def test_version_1_file_is_upgraded(self):
+        self.write_v1([payload(1000), payload(2000), payload(3000)], replayed=1)
+        spool = Spool(self.path)
+        self.addCleanup(spool.close)
+        self.assertEqual(spool.pending(), 2)
+        self.assertEqual(spool.replay_once(), 2)
+        self.assertEqual(sorted(RectifierData.objects.values_list('timestamp', flat=True)), [2000, 3000])
+
+    def test_reopen_keeps_pending_records(self):
+        spool = Spool(self.path)
+        spool.append((None, payload(1000)))
+        spool.close()
+        spool = Spool(self.path)
+        self.addCleanup(spool.close)
+        self.assertEqual(spool.pending(), 1)
+
+    def test_unknown_version_is_not_touched(self):
+        with open(self.path, 'wb') as f:
+            f.write(FILE_HEADER.pack(MAGIC, VERSION + 1) + b'future records')
+        with self.assertRaises(ValueError):
+            Spool(self.path)
+        with open(self.path, 'rb') as f:
+            self.assertTrue(f.read().endswith(b'future records'))
@@ -0,0 +1,20 @@
+"""
+Helper waktu untuk parameter API dan management commands
+
+Waktu di API dan di database adalah epoch milliseconds (UTC).
+"""
+from datetime import timezone
+from django.utils.dateparse import parse_datetime
+
+def parse_time(value):
+    """Parse epoch milliseconds atau ISO 8601 datetime menjadi epoch milliseconds"""
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValueError(f"Invalid time '{value}', expected epoch milliseconds or ISO 8601")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp() * 1000)
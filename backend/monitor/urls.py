@@ -1,9 +1,10 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import RectifierDataViewSet
+from .views import RectifierDataViewSet, SiteViewSet
 
 router = DefaultRouter()
 router.register(r'rectifier', RectifierDataViewSet, basename='rectifier')
+router.register(r'sites', SiteViewSet, basename='sites')
 
 urlpatterns = [
     path('', include(router.urls)),
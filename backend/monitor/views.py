@@ -1,10 +1,67 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotAcceptable, ValidationError
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from datetime import datetime, timezone
+from functools import partial
+from django.http import HttpResponse, StreamingHttpResponse
 from django.utils.decorators import method_decorator
 from django.views.decorators.cache import cache_page
-from .models import RectifierData
-from .serializers import RectifierDataSerializer, RectifierStatsSerializer, DashboardDataSerializer
+from django.views.decorators.http import condition
+from . import archive, columnar, downsample, export, rollups, stats
+from .alarms import sites_in_alarm
+from .latest import get_dashboard, get_latest, get_version
+from .models import ROLLUP_FIELDS, RectifierData, RectifierRollup, Site
+from .pagination import KeysetPagination
+from .serializers import RectifierDataSerializer, RectifierStatsSerializer, SiteAlarmSerializer, SiteSerializer
+from .timeutils import parse_time
+
+# JSON (default) or the binary columnar format, see monitor/columnar.py
+COLUMNAR_RENDERERS = [*api_settings.DEFAULT_RENDERER_CLASSES, columnar.ColumnarRenderer]
+
+# Numeric fields that can be requested as chart series (?fields=)
+CHART_FIELDS = tuple(
+    field.name for field in RectifierData._meta.concrete_fields
+    if field.get_internal_type() in ('FloatField', 'IntegerField') and field.name != 'timestamp'
+)
+DEFAULT_CHART_FIELDS = ('vdc_output', 'load_current', 'temperature', 'humidity')
+
+def conditional_on_latest(per_site=True):
+    """
+    Conditional GET (If-None-Match / If-Modified-Since) berdasarkan timestamp
+    row terbaru dari cache, sehingga poll tanpa data baru dijawab 304 sebelum
+    ORM atau serializer dijalankan. per_site=False untuk endpoint yang tidak
+    memakai ?site= (versi = row terbaru dari semua site).
+    """
+    def version(request):
+        if not hasattr(request, 'latest_version'):
+            request.latest_version = get_version(request.GET.get('site') if per_site else None)
+        return request.latest_version
+
+    def etag(request, *args, **kwargs):
+        latest = version(request)
+        return f'"{latest}"' if latest is not None else None
+
+    def last_modified(request, *args, **kwargs):
+        latest = version(request)
+        return datetime.fromtimestamp(latest / 1000, tz=timezone.utc) if latest is not None else None
+
+    return method_decorator(condition(etag_func=etag, last_modified_func=last_modified))
+
+class SiteViewSet(viewsets.ReadOnlyModelViewSet):
+    """ViewSet untuk daftar site (dibuat otomatis oleh ingestion MQTT)"""
+    queryset = Site.objects.all()
+    serializer_class = SiteSerializer
+    lookup_field = 'code'
+    
+    @action(detail=False, methods=['get'])
+    @conditional_on_latest(per_site=False)
+    def alarms(self, request):
+        """Site yang row terbarunya abnormal (status, pintu cabinet, baterai), lihat monitor/alarms.py"""
+        items = [{'record': record, 'alarms': names} for record, names in sites_in_alarm()]
+        return Response(SiteAlarmSerializer(items, many=True).data)
 
 class RectifierDataViewSet(viewsets.ReadOnlyModelViewSet):
     """
@@ -14,9 +71,43 @@ class RectifierDataViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = RectifierData.objects.all()
     serializer_class = RectifierDataSerializer
     
+    def finalize_response(self, request, response, *args, **kwargs):
+        # Errors are JSON, not the negotiated file or binary format
+        binary = self.action == 'export' or isinstance(getattr(request, 'accepted_renderer', None), columnar.ColumnarRenderer)
+        if binary and isinstance(response, Response) and response.exception:
+            request.accepted_renderer, request.accepted_media_type = JSONRenderer(), JSONRenderer.media_type
+        return super().finalize_response(request, response, *args, **kwargs)
+    
+    def filter_site(self, queryset):
+        """Filter berdasarkan ?site=<code> (opsional)"""
+        site = self.request.query_params.get('site')
+        if site:
+            queryset = queryset.filter(site__code=site)
+        return queryset
+    
+    def get_time_range(self):
+        """(from, to) dalam epoch ms dari ?from= dan ?to= (epoch ms atau ISO 8601), None jika kosong"""
+        bounds = []
+        for param in ('from', 'to'):
+            value = self.request.query_params.get(param)
+            try:
+                bounds.append(parse_time(value) if value else None)
+            except ValueError as e:
+                raise ValidationError({param: str(e)})
+        return tuple(bounds)
+    
+    def filter_time_range(self, queryset, field='timestamp'):
+        """Filter berdasarkan ?from= dan ?to= (inklusif)"""
+        start, end = self.get_time_range()
+        if start is not None:
+            queryset = queryset.filter(**{f'{field}__gte': start})
+        if end is not None:
+            queryset = queryset.filter(**{f'{field}__lte': end})
+        return queryset
+    
     def get_queryset(self):
         """Filter data berdasarkan query params"""
-        queryset = RectifierData.objects.all()
+        queryset = self.filter_site(RectifierData.objects.select_related('site'))
         
         # Filter by limit
         limit = self.request.query_params.get('limit', 100)
@@ -30,10 +121,11 @@ class RectifierDataViewSet(viewsets.ReadOnlyModelViewSet):
         return queryset[:limit]
     
     @action(detail=False, methods=['get'])
+    @conditional_on_latest()
     def latest(self, request):
         """Endpoint untuk mendapatkan data terbaru"""
         try:
-            data = RectifierData.objects.first()
+            data = get_latest(request.query_params.get('site'))
             if data:
                 serializer = self.get_serializer(data)
                 return Response(serializer.data)
@@ -42,49 +134,212 @@ class RectifierDataViewSet(viewsets.ReadOnlyModelViewSet):
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
     @action(detail=False, methods=['get'])
+    @conditional_on_latest()
     def dashboard(self, request):
         """Endpoint untuk format dashboard frontend Next.js"""
         try:
-            data = RectifierData.objects.first()
-            if data:
-                serializer = DashboardDataSerializer(data)
-                return Response(serializer.data)
+            payload = get_dashboard(request.query_params.get('site'))
+            if payload:
+                # Rendered once at ingest time (monitor/latest.py)
+                return HttpResponse(payload.body, content_type='application/json')
             return Response({'message': 'No data available'}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
+    @action(detail=False, methods=['get'], renderer_classes=COLUMNAR_RENDERERS)
+    def history(self, request):
+        """
+        Endpoint history dengan filter ?site=, ?from=, ?to= dan cursor pagination
+        (?page_size=, maksimal 1000; ikuti 'next' untuk halaman berikutnya).
+        Hari yang sudah diarsip (archive_history) dibaca dari arsip.
+        Format kolumnar: satu kolom per field, 'next' di meta
+        """
+        queryset = self.filter_time_range(self.filter_site(RectifierData.objects.select_related('site')))
+        start, end = self.get_time_range()
+        paginator = KeysetPagination(
+            archive=partial(archive.read_rows, request.query_params.get('site') or None, start, end),
+        )
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        if request.accepted_renderer.format == columnar.FORMAT:
+            columns = columnar.record_columns(page, self.get_serializer())
+            return Response(columnar.Table(columns, meta={'next': paginator.get_next_link()}))
+        serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+    
+    @action(detail=False, methods=['get'], renderer_classes=export.RENDERERS)
+    def export(self, request):
+        """
+        Export bulk ?site= / ?from= / ?to= sebagai file, lihat monitor/export.py
+        - ?format=csv (default) | ndjson | arrow, atau header Accept
+        - ?fields=a,b,... subset kolom (default semua)
+        - ?gzip=true untuk file .gz
+        """
+        params = request.query_params
+        fmt = request.accepted_renderer.format
+        try:
+            columns = export.parse_columns(params.get('fields'))
+        except ValueError as e:
+            raise ValidationError({'fields': str(e)})
+        
+        site = params.get('site') or None
+        start, end = self.get_time_range()
+        queryset = self.filter_time_range(self.filter_site(RectifierData.objects.all()))
+        compress = params.get('gzip') in ('1', 'true')
+        try:
+            content = export.stream(fmt, queryset, columns, site, start, end, gzip=compress)
+        except export.ExportUnavailable as e:
+            raise NotAcceptable(str(e))
+        
+        filename = export.filename(site, fmt, compress)
+        response = StreamingHttpResponse(
+            content, content_type='application/gzip' if compress else request.accepted_renderer.media_type,
+        )
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        # Let nginx pass chunks through instead of spooling the whole export
+        response['X-Accel-Buffering'] = 'no'
+        return response
+    
     @action(detail=False, methods=['get'])
+    @conditional_on_latest()
     def stats(self, request):
-        """Endpoint untuk statistik data"""
-        try:
-            stats = RectifierData.get_stats()
-            if stats:
-                serializer = RectifierStatsSerializer(stats)
-                return Response(serializer.data)
+        """
+        Endpoint untuk statistik per ?site= (default semua site) dan window:
+        ?window=hour|day|week|all (default day, berakhir di data terbaru) atau
+        ?from= / ?to=. ?percentiles=true menambahkan p50/p95/p99 (window maksimal 1 minggu)
+        """
+        params = request.query_params
+        site = params.get('site') or None
+        window = params.get('window', 'day')
+        if window not in ('all', *stats.WINDOWS):
+            raise ValidationError({'window': f"Expected all or one of {', '.join(stats.WINDOWS)}"})
+        
+        latest = get_version(site)
+        if latest is None:
             return Response({'message': 'No data available'}, status=status.HTTP_404_NOT_FOUND)
+        
+        start, end = self.get_time_range()
+        if start is not None or end is not None:
+            window = None
+            end = end if end is not None else latest
+            start = start if start is not None else 0
+        else:
+            end = latest
+            start = 0 if window == 'all' else end - stats.WINDOWS[window] + 1
+        
+        try:
+            result = stats.window_stats(site, start, end + 1)
+            if not result['count']:
+                return Response({'message': 'No data available'}, status=status.HTTP_404_NOT_FOUND)
+            
+            if params.get('percentiles') in ('1', 'true'):
+                if end - start >= stats.PERCENTILE_MAX_SPAN:
+                    raise ValidationError({'percentiles': 'Only available for windows up to one week'})
+                for name, values in stats.window_percentiles(site, start, end + 1).items():
+                    result['fields'][name].update(values)
+            
+            fields = result['fields']
+            serializer = RectifierStatsSerializer({
+                'site': site,
+                'window': window,
+                'start': start,
+                'end': end,
+                'count': result['count'],
+                'fields': fields,
+                'avg_vdc_output': fields['vdc_output']['avg'],
+                'max_vdc_output': fields['vdc_output']['max'],
+                'min_vdc_output': fields['vdc_output']['min'],
+                'avg_load_current': fields['load_current']['avg'],
+                'max_load_current': fields['load_current']['max'],
+                'avg_temperature': fields['temperature']['avg'],
+                'avg_humidity': fields['humidity']['avg'],
+            })
+            return Response(serializer.data)
+        except ValidationError:
+            raise
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
-    @action(detail=False, methods=['get'])
+    def pick_resolution(self, queryset, fields, points):
+        """Rollup untuk range ?from= / ?to= (lihat rollups.pick_resolution), 'raw' jika tidak ada"""
+        if any(name not in ROLLUP_FIELDS for name in fields):
+            return 'raw'
+        start, end = self.get_time_range()
+        if start is None:
+            start = queryset.order_by('timestamp').values_list('timestamp', flat=True).first()
+        if end is None:
+            end = get_version(self.request.query_params.get('site'))
+        if start is None or end is None:
+            return 'raw'
+        return rollups.pick_resolution(end - start, points) or 'raw'
+    
+    @action(detail=False, methods=['get'], renderer_classes=COLUMNAR_RENDERERS)
     def chart_data(self, request):
-        """Endpoint untuk data chart (last 50 points)"""
-        limit = request.query_params.get('limit', 50)
-        try:
-            limit = int(limit)
-            if limit > 200:
-                limit = 200
-        except ValueError:
-            limit = 50
+        """
+        Endpoint untuk data chart
+        - ?fields=vdc_output,load_current,... (default 4 series)
+        - tanpa ?from= / ?to=: ?limit= row terakhir (default 50, maksimal 200)
+        - dengan ?from= / ?to=: seluruh range di-downsample menjadi maksimal
+          ?points= titik (default 1000) dengan ?mode=minmax (default) atau lttb.
+          Range panjang dibaca dari rollup paling kasar yang masih memberi
+          ?points= bucket (?resolution=auto, default) atau raw/1m/1h/1d
+        - Accept: application/vnd.rectifier.columnar (atau ?format=columnar):
+          timestamps int64 + float32 per field, lihat monitor/columnar.py
+        """
+        params = request.query_params
+        fields = [name for name in params.get('fields', '').split(',') if name] or list(DEFAULT_CHART_FIELDS)
+        unknown = [name for name in fields if name not in CHART_FIELDS]
+        if unknown:
+            raise ValidationError({'fields': f"Unknown chart fields: {', '.join(unknown)}"})
+        
+        queryset = self.filter_site(RectifierData.objects.all())
+        if params.get('from') or params.get('to'):
+            points = params.get('points', 1000)
+            try:
+                points = min(max(int(points), 3), 10000)
+            except ValueError:
+                points = 1000
+            mode = params.get('mode', downsample.MINMAX)
+            if mode not in downsample.MODES:
+                raise ValidationError({'mode': f"Expected one of {', '.join(downsample.MODES)}"})
+            
+            resolution = params.get('resolution', 'auto')
+            if resolution not in ('auto', 'raw', *rollups.RESOLUTIONS):
+                raise ValidationError({'resolution': f"Expected auto, raw or one of {', '.join(rollups.RESOLUTIONS)}"})
+            if resolution == 'auto':
+                resolution = self.pick_resolution(queryset, fields, points)
+            
+            if resolution == 'raw':
+                timestamps, values = downsample.fetch_series(self.filter_time_range(queryset).order_by('timestamp'), fields)
+            else:
+                if any(name not in ROLLUP_FIELDS for name in fields):
+                    raise ValidationError({'fields': f"Rollups only contain {', '.join(ROLLUP_FIELDS)}"})
+                start, end = self.get_time_range()
+                rollup_queryset = self.filter_site(RectifierRollup.objects.all())
+                if start is not None:
+                    # Include the bucket that contains start
+                    rollup_queryset = rollup_queryset.filter(bucket__gt=start - rollups.RESOLUTIONS[resolution])
+                if end is not None:
+                    rollup_queryset = rollup_queryset.filter(bucket__lte=end)
+                timestamps, values = rollups.fetch_series(rollup_queryset, fields, resolution, mode)
+            timestamps, values = downsample.downsample(timestamps, values, points, mode)
+        else:
+            limit = params.get('limit', 50)
+            try:
+                limit = int(limit)
+                if limit > 200:
+                    limit = 200
+            except ValueError:
+                limit = 50
+            
+            timestamps, values = downsample.fetch_series(queryset.order_by('-timestamp')[:limit], fields)
+            timestamps, values = timestamps[::-1], values[::-1]
         
-        data = RectifierData.objects.all()[:limit]
+        if request.accepted_renderer.format == columnar.FORMAT:
+            return Response(columnar.chart_table(timestamps, fields, values))
         
         # Format data untuk chart
-        chart_data = {
-            'timestamps': [d.timestamp for d in reversed(data)],
-            'vdc_output': [d.vdc_output for d in reversed(data)],
-            'load_current': [d.load_current for d in reversed(data)],
-            'temperature': [d.temperature for d in reversed(data)],
-            'humidity': [d.humidity for d in reversed(data)],
-        }
+        chart_data = {'timestamps': downsample.to_json_list(timestamps)}
+        for i, name in enumerate(fields):
+            chart_data[name] = downsample.to_json_list(values[:, i])
         
         return Response(chart_data)
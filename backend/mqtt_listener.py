@@ -2,13 +2,21 @@
 """
 Standalone MQTT Listener - Runs as separate Docker service
 Listens to MQTT and saves data to PostgreSQL database
+
+Callback MQTT hanya memasukkan payload ke bounded queue (MQTT_QUEUE_SIZE);
+writer workers melakukan decode lalu data di-buffer dan disimpan per batch
+(bulk insert) ketika buffer mencapai MQTT_BATCH_SIZE row atau
+MQTT_BATCH_INTERVAL_MS sudah lewat.
+
+Jika database gagal atau queue penuh, payload ditulis ke spool lokal
+(MQTT_SPOOL_PATH) dan di-replay ke database setelah database normal lagi.
 """
 import os
 import sys
-import json
 import django
 import logging
 import random
+import signal
 
 # Setup Django
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'rectifier_monitor.settings_production')
@@ -23,6 +31,11 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Buffered writer, work queue dan spool, dibuat di main()
+writer = None
+ingest_queue = None
+spool = None
+
 def on_connect(client, userdata, flags, rc):
     if rc == 0:
         logger.info(f"✓ Connected to MQTT Broker: {settings.MQTT_BROKER}")
@@ -32,77 +45,65 @@ def on_connect(client, userdata, flags, rc):
         logger.error(f"✗ Failed to connect, return code: {rc}")
 
 def on_message(client, userdata, msg):
+    # Runs on the paho network thread - only enqueue, never touch the database here
+    ingest_queue.put((msg.topic, msg.payload))
+
+def process_payload(item):
+    """Decode (topic, payload) MQTT dan masukkan ke buffer writer (dijalankan oleh worker)"""
+    from django.db import DatabaseError, close_old_connections
+    from monitor.decoder import JSONDecodeError, decode_message
+    
+    topic, raw = item
     try:
-        from monitor.models import RectifierData
-        
-        payload = json.loads(msg.payload.decode())
-        logger.info(f"Received MQTT message")
-        
-        ts = payload.get('ts', 0)
+        record = decode_message(raw, topic)
+        writer.add(record)
+        logger.debug(f"✓ Data buffered - Site: {record.site.code} VDC: {record.vdc_output}V")
         
-        RectifierData.objects.create(
-            timestamp=ts,
-            site_name=payload.get('site_name', ''),
-            project_id=payload.get('project_id', ''),
-            ladder=payload.get('ladder', ''),
-            sla=payload.get('sla', ''),
-            status_realtime=payload.get('status_realtime', 'Normal'),
-            status_ladder=payload.get('status_ladder', 'Normal'),
-            latitude=payload.get('latitude'),
-            longitude=payload.get('longitude'),
-            door_cabinet=payload.get('door_cabinet', 'Close'),
-            battery_stolen=payload.get('battery_stolen', 'Close'),
-            temperature=payload.get('temperature', 0),
-            humidity=payload.get('humidity', 0),
-            vac_input_l1=payload.get('vac_input_l1', 0),
-            vac_input_l2=payload.get('vac_input_l2', 0),
-            vac_input_l3=payload.get('vac_input_l3'),
-            vdc_output=payload.get('vdc_output', 0),
-            battery_current=payload.get('battery_current', 0),
-            iac_input_l1=payload.get('iac_input_l1'),
-            iac_input_l2=payload.get('iac_input_l2'),
-            iac_input_l3=payload.get('iac_input_l3'),
-            load_current=payload.get('load_current', 0),
-            load_power=payload.get('load_power', 0),
-            pac_load_l1=payload.get('pac_load_l1', 0),
-            pac_load_l2=payload.get('pac_load_l2', 0),
-            pac_load_l3=payload.get('pac_load_l3', 0),
-            rectifier_current=payload.get('rectifier_current', 0),
-            total_power=payload.get('total_power', 0),
-            battery_bank_1_voltage=payload.get('battery_bank_1_voltage', 0),
-            battery_bank_1_current=payload.get('battery_bank_1_current', 0),
-            battery_bank_1_soc=payload.get('battery_bank_1_soc', 100),
-            battery_bank_1_soh=payload.get('battery_bank_1_soh', 100),
-            battery_bank_2_voltage=payload.get('battery_bank_2_voltage', 0),
-            battery_bank_2_current=payload.get('battery_bank_2_current', 0),
-            battery_bank_2_soc=payload.get('battery_bank_2_soc', 100),
-            battery_bank_2_soh=payload.get('battery_bank_2_soh', 100),
-            battery_bank_3_voltage=payload.get('battery_bank_3_voltage', 0),
-            battery_bank_3_current=payload.get('battery_bank_3_current', 0),
-            battery_bank_3_soc=payload.get('battery_bank_3_soc', 100),
-            battery_bank_3_soh=payload.get('battery_bank_3_soh', 100),
-            backup_duration=payload.get('backup_duration'),
-            time_remaining=payload.get('time_remaining'),
-            battery_status=payload.get('battery_status', 'Standby'),
-            start_backup=payload.get('start_backup', 'No data'),
-            soc_avg=payload.get('soc_avg', 100),
-            modules_status=payload.get('modules_status', []),
-        )
-        logger.info(f"✓ Data saved to database - Site: {payload.get('site_name')} VDC: {payload.get('vdc_output')}V")
-        
-    except json.JSONDecodeError as e:
+    except JSONDecodeError as e:
         logger.error(f"✗ Failed to decode JSON: {e}")
+    except DatabaseError as e:
+        # Site lookup needs the database - keep the raw message for replay
+        logger.error(f"✗ Database error while decoding, spooling message: {e}")
+        if spool is not None:
+            spool.append(item)
+        close_old_connections()
     except Exception as e:
-        logger.error(f"✗ Error saving data: {e}")
+        logger.error(f"✗ Error buffering data: {e}")
 
 def on_disconnect(client, userdata, rc):
     logger.warning(f"Disconnected from broker (rc={rc}), will auto-reconnect...")
 
+def shutdown(reporter):
+    """Proses sisa queue, flush buffer dan log statistik akhir"""
+    ingest_queue.close()
+    writer.close()
+    if spool is not None:
+        spool.close()
+    reporter.close()
+    reporter.log_stats()
+
 def main():
+    global writer, ingest_queue, spool
+    from monitor.ingest import StatsReporter, create_batch_writer, create_ingest_queue, records_saved
+    from monitor.spool import create_spool
+    
     logger.info("=" * 50)
     logger.info("MQTT Listener Service Starting...")
     logger.info("=" * 50)
     
+    spool = create_spool()
+    writer = create_batch_writer(on_error=spool and spool.append_records, on_flush=records_saved).start()
+    ingest_queue = create_ingest_queue(process_payload, on_drop=spool and spool.append).start()
+    components = [ingest_queue, writer] + ([spool.start()] if spool is not None else [])
+    reporter = StatsReporter(getattr(settings, 'MQTT_STATS_INTERVAL', 60), *components).start()
+    logger.info(f"Buffered writes: {writer.batch_size} rows / {writer.flush_interval * 1000:.0f} ms")
+    logger.info(
+        f"Work queue: {ingest_queue.maxsize} messages, {ingest_queue.worker_count} workers, "
+        f"policy {ingest_queue.policy}"
+    )
+    if spool is not None:
+        logger.info(f"Spool: {spool.path} (fsync {spool.fsync}, {spool.pending()} records waiting)")
+    
     client_id = f"{settings.MQTT_CLIENT_ID}_{random.randint(1000,9999)}"
     client = mqtt.Client(client_id=client_id)
     
@@ -116,16 +117,25 @@ def main():
     # Auto reconnect
     client.reconnect_delay_set(min_delay=1, max_delay=30)
     
+    # docker stop sends SIGTERM - disconnect so loop_forever() returns and the buffer is flushed
+    def on_sigterm(signum, frame):
+        logger.info("Received SIGTERM")
+        client.disconnect()
+    signal.signal(signal.SIGTERM, on_sigterm)
+    
     try:
         logger.info(f"Connecting to {settings.MQTT_BROKER}:{settings.MQTT_PORT}...")
         client.connect(settings.MQTT_BROKER, settings.MQTT_PORT, 60)
         client.loop_forever()  # Blocking - keeps listener running
     except KeyboardInterrupt:
-        logger.info("Stopping MQTT Listener...")
         client.disconnect()
     except Exception as e:
         logger.error(f"Fatal error: {e}")
+        shutdown(reporter)
         sys.exit(1)
+    
+    logger.info("Stopping MQTT Listener...")
+    shutdown(reporter)
 
 if __name__ == "__main__":
     main()
@@ -5,13 +5,20 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'rectifier_monitor.settings_prod
 django.setup()
 
 from django.core.asgi import get_asgi_application
+from django.urls import re_path
 from channels.routing import ProtocolTypeRouter, URLRouter
 from channels.auth import AuthMiddlewareStack
-from monitor.routing import websocket_urlpatterns
+from monitor.lifespan import LifespanApp
+from monitor.routing import http_urlpatterns, websocket_urlpatterns
 
-application = ProtocolTypeRouter({
-    "http": get_asgi_application(),
+# Lifespan: MQTT ingestion on this event loop (MQTT_ASGI_INGEST)
+application = LifespanApp(ProtocolTypeRouter({
+    # Server-Sent Events first, everything else to Django
+    "http": URLRouter([
+        *http_urlpatterns,
+        re_path(r'', get_asgi_application()),
+    ]),
     "websocket": AuthMiddlewareStack(
         URLRouter(websocket_urlpatterns)
     ),
-})
\ No newline at end of file
+}))
@@ -2,6 +2,7 @@
 Production Settings for Rectifier Monitor
 """
 import os
+from corsheaders.defaults import default_headers
 from pathlib import Path
 from shlex import split
 from dotenv import load_dotenv
@@ -103,10 +104,21 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # CORS Settings
 CORS_ALLOWED_ORIGINS = os.environ.get('CORS_ALLOWED_ORIGINS', 'http://localhost:3000').split(',')
 CORS_ALLOW_CREDENTIALS = True
+# Conditional GET dari frontend (RectifierAPI) - validators request dan ETag response
+CORS_ALLOW_HEADERS = (*default_headers, 'if-none-match', 'if-modified-since')
+CORS_EXPOSE_HEADERS = ['ETag', 'Last-Modified']
 
 # For development, you can use:
 # CORS_ALLOW_ALL_ORIGINS = True
 
+# Cache with Redis - latest state per site, shared by mqtt_listener and backend (monitor/latest.py)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': f"redis://{os.environ.get('REDIS_HOST', 'redis')}:{os.environ.get('REDIS_PORT', 6379)}/1",
+    },
+}
+
 # Channels Layer with Redis
 CHANNEL_LAYERS = {
     'default': {
@@ -120,11 +132,63 @@ CHANNEL_LAYERS = {
 # MQTT Settings
 MQTT_BROKER = os.environ.get('MQTT_BROKER', 'broker.emqx.io')
 MQTT_PORT = int(os.environ.get('MQTT_PORT', 1883))
+# Wildcard topics are supported: with 'rectifier/+/data' the '+' level is the site ID,
+# otherwise the site ID comes from the payload (site_id, then site_name)
 MQTT_TOPIC = os.environ.get('MQTT_TOPIC', 'rectifier/data')
 MQTT_CLIENT_ID = os.environ.get('MQTT_CLIENT_ID', 'django_rectifier_monitor')
+# Run MQTT ingestion on the ASGI event loop (monitor/mqtt_service.py, started from the lifespan)
+# Off by default: the mqtt_listener service ingests in production
+MQTT_ASGI_INGEST = os.environ.get('MQTT_ASGI_INGEST', 'False') == 'True'
 MQTT_USERNAME = os.environ.get('MQTT_USERNAME', '')  # Optional
 MQTT_PASSWORD = os.environ.get('MQTT_PASSWORD', '')  # Optional
 
+# MQTT Ingestion - buffered bulk writes
+MQTT_BATCH_SIZE = int(os.environ.get('MQTT_BATCH_SIZE', 500))
+MQTT_BATCH_INTERVAL_MS = int(os.environ.get('MQTT_BATCH_INTERVAL_MS', 250))
+
+# MQTT Ingestion - bounded queue between the MQTT callback and writer workers
+# Policy when the queue is full: block, drop-oldest, drop-newest
+MQTT_QUEUE_SIZE = int(os.environ.get('MQTT_QUEUE_SIZE', 10000))
+MQTT_QUEUE_POLICY = os.environ.get('MQTT_QUEUE_POLICY', 'block')
+MQTT_QUEUE_BLOCK_TIMEOUT = float(os.environ.get('MQTT_QUEUE_BLOCK_TIMEOUT', 5))
+MQTT_WRITER_WORKERS = int(os.environ.get('MQTT_WRITER_WORKERS', 2))
+MQTT_STATS_INTERVAL = int(os.environ.get('MQTT_STATS_INTERVAL', 60))
+
+# MQTT Ingestion - local spool used when the database fails or the queue is full
+# Empty MQTT_SPOOL_PATH disables the spool. Fsync policy: always, interval, never
+MQTT_SPOOL_PATH = os.environ.get('MQTT_SPOOL_PATH', str(BASE_DIR / 'spool' / 'mqtt_ingest.spool'))
+MQTT_SPOOL_FSYNC = os.environ.get('MQTT_SPOOL_FSYNC', 'interval')
+MQTT_SPOOL_FSYNC_INTERVAL = float(os.environ.get('MQTT_SPOOL_FSYNC_INTERVAL', 1))
+MQTT_SPOOL_REPLAY_RATE = int(os.environ.get('MQTT_SPOOL_REPLAY_RATE', 2000))
+
+# Retention - manage.py archive_history moves raw rows older than RETENTION_DAYS
+# to compressed day files in ARCHIVE_DIR (still readable through the history API)
+ARCHIVE_DIR = os.environ.get('ARCHIVE_DIR', str(BASE_DIR / 'archive'))
+RETENTION_DAYS = int(os.environ.get('RETENTION_DAYS', 90))
+RETENTION_DELETE_BATCH = int(os.environ.get('RETENTION_DELETE_BATCH', 1000))
+
+# PostgreSQL range partitioning of RectifierData (manage.py partition_rectifierdata)
+# Interval: day or week. Partitions are created PARTITION_PREMAKE intervals ahead
+PARTITION_INTERVAL = os.environ.get('PARTITION_INTERVAL', 'day')
+PARTITION_PREMAKE = int(os.environ.get('PARTITION_PREMAKE', 7))
+
+# WebSocket initial state: last WS_HISTORY_POINTS points per site sent on connect (0 disables)
+WS_HISTORY_POINTS = int(os.environ.get('WS_HISTORY_POINTS', 300))
+# Per-connection flow control: max updates/s (newest per site in between), and with
+# ?ack=1 the unacknowledged bytes after which sending pauses, closing the connection
+# when that lasts WS_SLOW_CLIENT_TIMEOUT seconds
+WS_MAX_RATE = float(os.environ.get('WS_MAX_RATE', 4))
+WS_MAX_UNACKED_BYTES = int(os.environ.get('WS_MAX_UNACKED_BYTES', 131072))
+WS_SLOW_CLIENT_TIMEOUT = float(os.environ.get('WS_SLOW_CLIENT_TIMEOUT', 30))
+# Sites + projects one connection can subscribe to
+WS_MAX_SUBSCRIPTIONS = int(os.environ.get('WS_MAX_SUBSCRIPTIONS', 100))
+# Protocol v2 (?v=2, delta updates): a full dashboard at least every WS_KEYFRAME_INTERVAL seconds per site
+WS_KEYFRAME_INTERVAL = float(os.environ.get('WS_KEYFRAME_INTERVAL', 60))
+# Server-Sent Events (/api/stream/rectifier/, ASGI): events kept per site for Last-Event-ID resume,
+# and seconds between keepalive comments on idle streams
+SSE_RING_SIZE = int(os.environ.get('SSE_RING_SIZE', 50))
+SSE_KEEPALIVE = float(os.environ.get('SSE_KEEPALIVE', 15))
+
 # Security Settings for Production
 SECURE_SSL_REDIRECT = False
 SESSION_COOKIE_SECURE = False
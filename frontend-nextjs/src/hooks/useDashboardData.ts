@@ -1,6 +1,6 @@
 import { useState, useEffect } from 'react';
 import { DashboardData } from '@/types';
-import { RectifierAPI } from '@/services/api';
+import { RECTIFIER_WS_URL, RectifierAPI } from '@/services/api';
 import { format } from 'date-fns';
 
 const INITIAL_DATA: DashboardData = {
@@ -48,6 +48,39 @@ const INITIAL_DATA: DashboardData = {
   },
 };
 
+// [path, value]: set value at path (object keys / array indexes), empty path replaces everything
+export type PatchOperation = [(string | number)[], unknown];
+
+/**
+ * Apply a rectifier_delta patch (backend/monitor/broadcast.py) without
+ * mutating state: objects and arrays on changed paths are copied once,
+ * untouched branches keep their identity so React can skip them.
+ */
+export function applyPatch<T>(state: T, patch: PatchOperation[]): T {
+  let root: unknown = state;
+  const copied = new Set<unknown>();
+  const copy = (value: unknown) => {
+    const clone = Array.isArray(value) ? [...value] : { ...(value as object) };
+    copied.add(clone);
+    return clone;
+  };
+
+  for (const [path, value] of patch) {
+    if (path.length === 0) {
+      root = value;
+      continue;
+    }
+    if (!copied.has(root)) root = copy(root);
+    let node = root as Record<string | number, unknown>;
+    for (const key of path.slice(0, -1)) {
+      if (!copied.has(node[key])) node[key] = copy(node[key]);
+      node = node[key] as Record<string | number, unknown>;
+    }
+    node[path[path.length - 1]] = value;
+  }
+  return root as T;
+}
+
 export function useDashboardData() {
   const [data, setData] = useState<DashboardData>(INITIAL_DATA);
   const [isLoading, setIsLoading] = useState(true);
@@ -72,15 +105,79 @@ export function useDashboardData() {
   };
 
   useEffect(() => {
-    // Initial fetch
-    fetchData();
+    let socket: WebSocket | null = null;
+    let interval: ReturnType<typeof setInterval> | null = null;
+    let reconnect: ReturnType<typeof setTimeout> | null = null;
+    let closed = false;
 
-    // Poll for updates every 2 seconds
-    const interval = setInterval(() => {
+    // REST polling every 2 seconds while the WebSocket is not delivering data
+    const startPolling = () => {
+      if (interval) return;
       fetchData();
-    }, 2000);
+      interval = setInterval(fetchData, 2000);
+    };
+    const stopPolling = () => {
+      if (interval) clearInterval(interval);
+      interval = null;
+    };
+
+    const connect = () => {
+      // ack=1: the server pauses (and eventually disconnects) if frames are not acknowledged
+      // v=2: updates are patches against the dashboard with seq === base
+      const ws = new WebSocket(`${RECTIFIER_WS_URL}?ack=1&v=2`);
+      let received = 0;
+      let dashboard: DashboardData | null = null;
+      let seq: number | null = null;
+      let resyncing = false;
+      socket = ws;
+      ws.binaryType = 'arraybuffer';
+      ws.onmessage = (event) => {
+        received += 1;
+        ws.send(JSON.stringify({ type: 'ack', seq: received }));
+        // Binary frames carry the columnar history window, not used here
+        if (typeof event.data !== 'string') return;
+        const message = JSON.parse(event.data);
+        let next: DashboardData;
+        if (message.type === 'rectifier_delta') {
+          if (dashboard === null || message.base !== seq) {
+            // Missed the base frame: ask once for a full dashboard
+            if (!resyncing) ws.send(JSON.stringify({ type: 'resync', site: message.site }));
+            resyncing = true;
+            return;
+          }
+          next = applyPatch(dashboard, message.patch as PatchOperation[]);
+        } else if (
+          (message.type === 'initial_data' || message.type === 'latest_data' || message.type === 'rectifier_update')
+          && message.data
+        ) {
+          next = message.data as DashboardData;
+          resyncing = false;
+        } else {
+          return;
+        }
+        dashboard = next;
+        seq = message.seq;
+        stopPolling();
+        setData(next);
+        setError(null);
+        setIsLoading(false);
+      };
+      ws.onclose = () => {
+        if (closed) return;
+        startPolling();
+        reconnect = setTimeout(connect, 5000);
+      };
+    };
+
+    startPolling();
+    connect();
 
-    return () => clearInterval(interval);
+    return () => {
+      closed = true;
+      stopPolling();
+      if (reconnect) clearTimeout(reconnect);
+      socket?.close();
+    };
   }, []);
 
   return { data, isLoading, error };
@@ -4,27 +4,160 @@ import { DashboardData } from '@/types';
 // Backend API URL - change this to your Django server URL
 const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000/api';
 
+// WebSocket for live dashboard updates (backend/monitor/consumers.py), same host as the API by default
+export const RECTIFIER_WS_URL = process.env.NEXT_PUBLIC_WS_URL
+  || `${API_BASE_URL.replace(/^http/, 'ws').replace(/\/api\/?$/, '')}/ws/rectifier/`;
+
+interface CachedResponse {
+  etag: string | null;
+  lastModified: string | null;
+  data: unknown;
+}
+
+// Validators + body of the last 200 response per URL, for conditional GET
+const responseCache = new Map<string, CachedResponse>();
+
+/**
+ * GET JSON with If-None-Match / If-Modified-Since from the previous response.
+ * On 304 Not Modified the previous body is returned (same object, so React
+ * state updates with it are skipped).
+ */
+async function fetchConditional<T>(url: string, init: RequestInit = {}): Promise<T> {
+  const cached = responseCache.get(url);
+  const headers = new Headers(init.headers);
+  if (cached?.etag) headers.set('If-None-Match', cached.etag);
+  if (cached?.lastModified) headers.set('If-Modified-Since', cached.lastModified);
+
+  const response = await fetch(url, {
+    ...init,
+    headers,
+    cache: 'no-store', // Validation is done here, not by the browser cache
+  });
+
+  if (response.status === 304 && cached) {
+    return cached.data as T;
+  }
+  if (!response.ok) {
+    throw new Error(response.statusText || `HTTP ${response.status}`);
+  }
+
+  const data = (await response.json()) as T;
+  const etag = response.headers.get('ETag');
+  const lastModified = response.headers.get('Last-Modified');
+  if (etag || lastModified) {
+    responseCache.set(url, { etag, lastModified, data });
+  } else {
+    responseCache.delete(url);
+  }
+  return data;
+}
+
+// Binary columnar format (backend/monitor/columnar.py), negotiated via Accept
+export const COLUMNAR_MEDIA_TYPE = 'application/vnd.rectifier.columnar';
+
+export type ColumnValues = Float64Array | Float32Array | unknown[];
+
+export interface ColumnarTable {
+  rows: number;
+  columns: Record<string, ColumnValues>;
+  meta: Record<string, unknown>;
+}
+
+interface ColumnHeader {
+  name: string;
+  type: 'f64' | 'f32' | 'i64' | 'dict' | 'json';
+  offset: number;
+  length: number;
+  values?: (string | null)[];
+  unit?: string;
+}
+
+/**
+ * Decode a columnar response. Float columns are views on the response buffer
+ * (no copy); int64 columns become Float64Array (exact up to 2^53, enough for
+ * epoch ms / µs and ids); dictionary columns become plain arrays.
+ * Typed arrays use the platform byte order, which is little-endian in
+ * every browser we target.
+ */
+export function decodeColumnar(buffer: ArrayBuffer): ColumnarTable {
+  const magic = new Uint8Array(buffer, 0, 4);
+  if (String.fromCharCode(...magic) !== 'RCOL') {
+    throw new Error('Not a columnar response');
+  }
+  const headerLength = new DataView(buffer).getUint32(4, true);
+  const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 8, headerLength)));
+  const body = Math.ceil((8 + headerLength) / 8) * 8;
+
+  const columns: Record<string, ColumnValues> = {};
+  for (const column of header.columns as ColumnHeader[]) {
+    const offset = body + column.offset;
+    switch (column.type) {
+      case 'f64':
+        columns[column.name] = new Float64Array(buffer, offset, column.length);
+        break;
+      case 'f32':
+        columns[column.name] = new Float32Array(buffer, offset, column.length);
+        break;
+      case 'i64': {
+        const ints = new BigInt64Array(buffer, offset, column.length);
+        const numbers = new Float64Array(column.length);
+        for (let i = 0; i < ints.length; i++) numbers[i] = Number(ints[i]);
+        columns[column.name] = numbers;
+        break;
+      }
+      default: {
+        const values = column.type === 'json'
+          ? (column.values ?? []).map((value) => (value === null ? null : JSON.parse(value)))
+          : (column.values ?? []);
+        const codes = new Uint32Array(buffer, offset, column.length);
+        columns[column.name] = Array.from(codes, (code) => values[code]);
+      }
+    }
+  }
+  return { rows: header.rows, columns, meta: header.meta };
+}
+
+/**
+ * Columnar table -> row objects, same shape as the JSON list endpoints
+ * (NaN back to null). Datetime columns stay epoch µs.
+ */
+export function columnarToRows(table: ColumnarTable): Record<string, unknown>[] {
+  const names = Object.keys(table.columns);
+  const rows: Record<string, unknown>[] = new Array(table.rows);
+  for (let i = 0; i < table.rows; i++) {
+    const row: Record<string, unknown> = {};
+    for (const name of names) {
+      const value = table.columns[name][i];
+      row[name] = typeof value === 'number' && Number.isNaN(value) ? null : value;
+    }
+    rows[i] = row;
+  }
+  return rows;
+}
+
+async function fetchColumnar(url: string): Promise<ColumnarTable> {
+  const response = await fetch(url, {
+    cache: 'no-store',
+    headers: { Accept: COLUMNAR_MEDIA_TYPE },
+  });
+  if (!response.ok) {
+    throw new Error(response.statusText || `HTTP ${response.status}`);
+  }
+  return decodeColumnar(await response.arrayBuffer());
+}
+
 export class RectifierAPI {
   /**
    * Fetch latest dashboard data
    */
   static async getDashboardData(): Promise<DashboardData | null> {
     try {
-      const response = await fetch(`${API_BASE_URL}/rectifier/dashboard/`, {
+      return await fetchConditional<DashboardData>(`${API_BASE_URL}/rectifier/dashboard/`, {
         method: 'GET',
         headers: {
           'Content-Type': 'application/json',
         },
-        cache: 'no-store', // Always fetch fresh data
       });
-
-      if (!response.ok) {
-        console.error('Failed to fetch dashboard data:', response.statusText);
-        return null;
-      }
-
-      const data = await response.json();
-      return data as DashboardData;
     } catch (error) {
       console.error('Error fetching dashboard data:', error);
       return null;
@@ -36,15 +169,7 @@ export class RectifierAPI {
    */
   static async getLatest() {
     try {
-      const response = await fetch(`${API_BASE_URL}/rectifier/latest/`, {
-        cache: 'no-store',
-      });
-
-      if (!response.ok) {
-        throw new Error('Failed to fetch latest data');
-      }
-
-      return await response.json();
+      return await fetchConditional(`${API_BASE_URL}/rectifier/latest/`);
     } catch (error) {
       console.error('Error fetching latest data:', error);
       return null;
@@ -56,21 +181,25 @@ export class RectifierAPI {
    */
   static async getStats() {
     try {
-      const response = await fetch(`${API_BASE_URL}/rectifier/stats/`, {
-        cache: 'no-store',
-      });
-
-      if (!response.ok) {
-        throw new Error('Failed to fetch stats');
-      }
-
-      return await response.json();
+      return await fetchConditional(`${API_BASE_URL}/rectifier/stats/`);
     } catch (error) {
       console.error('Error fetching stats:', error);
       return null;
     }
   }
 
+  /**
+   * Fetch sites whose latest reading is abnormal (status, door, battery)
+   */
+  static async getAlarms() {
+    try {
+      return await fetchConditional(`${API_BASE_URL}/sites/alarms/`);
+    } catch (error) {
+      console.error('Error fetching alarms:', error);
+      return null;
+    }
+  }
+
   /**
    * Fetch chart data
    */
@@ -94,6 +223,32 @@ export class RectifierAPI {
     }
   }
 
+  /**
+   * Fetch a chart range as typed arrays (timestamps + one Float32Array per field).
+   * params: from, to, fields, points, mode, resolution, site - see chart_data
+   */
+  static async getChartSeries(params: Record<string, string>) {
+    try {
+      const query = new URLSearchParams(params).toString();
+      return await fetchColumnar(`${API_BASE_URL}/rectifier/chart_data/?${query}`);
+    } catch (error) {
+      console.error('Error fetching chart series:', error);
+      return null;
+    }
+  }
+
+  /**
+   * Fetch one history page in columnar form; meta.next is the next page URL
+   */
+  static async getHistoryPage(url: string = `${API_BASE_URL}/rectifier/history/?page_size=1000`) {
+    try {
+      return await fetchColumnar(url);
+    } catch (error) {
+      console.error('Error fetching history:', error);
+      return null;
+    }
+  }
+
   /**
    * Fetch all data with limit
    */
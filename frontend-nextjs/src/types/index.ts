@@ -1,4 +1,5 @@
 export interface SiteInfo {
+  siteId?: string;
   siteName: string;
   projectId: string;
   ladder: string;